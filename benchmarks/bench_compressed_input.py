@@ -0,0 +1,91 @@
+"""
+Benchmarks reading PGN input through pgn_input_streams for plain-text, gzip, bzip2, and xz files.
+
+For each format, reports:
+    (a) the time to read the first game (which is all that pgn4people reads from a user-supplied file), and
+    (b) the time and throughput (in MB/s of decompressed text) to stream every line of the file.
+
+Usage:
+    python benchmarks/bench_compressed_input.py [path/to/file.pgn] [--copies N]
+
+If no PGN file is given, the built-in sample PGN is used. The PGN is repeated N times (default 500) to form a
+multi-game file, which is written, along with its compressed versions, to a temporary directory.
+"""
+
+import argparse
+import bz2
+import gzip
+from importlib.resources import files
+import lzma
+import pathlib
+import tempfile
+import time
+
+from pgn4people_poc import constants
+from pgn4people_poc.pgn_input_streams import (open_pgn_text_stream,
+                                              read_game_1_string_from_text_stream)
+
+
+def write_benchmark_files(pgn_text, copies, directory):
+    """
+    Writes the multi-game PGN (pgn_text repeated copies times) in plain text and in each compressed format. Returns a
+    list of (format_name, path) pairs.
+    """
+    multi_game_text = ("\n\n".join([pgn_text.strip()] * copies) + "\n").encode()
+
+    plain_path = directory / "bench.pgn"
+    plain_path.write_bytes(multi_game_text)
+    list_of_paths = [("plain", plain_path)]
+
+    for format_name, module, suffix in (("gzip", gzip, ".gz"), ("bz2", bz2, ".bz2"), ("xz", lzma, ".xz")):
+        compressed_path = directory / ("bench.pgn" + suffix)
+        compressed_path.write_bytes(module.compress(multi_game_text))
+        list_of_paths.append((format_name, compressed_path))
+    return list_of_paths
+
+
+def time_read_game_1(path):
+    start_time = time.perf_counter()
+    with open_pgn_text_stream(path) as text_stream:
+        read_game_1_string_from_text_stream(text_stream)
+    return time.perf_counter() - start_time
+
+
+def time_stream_all_lines(path):
+    """
+    Returns (elapsed seconds, number of decompressed characters streamed).
+    """
+    number_of_characters = 0
+    start_time = time.perf_counter()
+    with open_pgn_text_stream(path) as text_stream:
+        for line in text_stream:
+            number_of_characters += len(line)
+    return time.perf_counter() - start_time, number_of_characters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark plain vs. compressed PGN input.")
+    parser.add_argument('pgn_path', nargs='?', default=None, type=pathlib.Path)
+    parser.add_argument('--copies', type=int, default=500)
+    args = parser.parse_args()
+
+    if args.pgn_path is None:
+        pgn_text = (files(constants.PACKAGE_FOR_SAMPLE_PGN) / constants.CHOSEN_SAMPLE_PGN_FILE).read_text()
+    else:
+        pgn_text = args.pgn_path.read_text()
+
+    with tempfile.TemporaryDirectory() as directory_name:
+        list_of_paths = write_benchmark_files(pgn_text, args.copies, pathlib.Path(directory_name))
+
+        print(f"{'Format':8}{'File MB':>10}{'Game 1 (ms)':>14}{'All lines (s)':>16}{'MB/s':>10}")
+        for format_name, path in list_of_paths:
+            file_megabytes = path.stat().st_size / 1e6
+            game_1_seconds = time_read_game_1(path)
+            all_lines_seconds, number_of_characters = time_stream_all_lines(path)
+            megabytes_per_second = number_of_characters / 1e6 / all_lines_seconds
+            print(f"{format_name:8}{file_megabytes:10.2f}{game_1_seconds * 1000:14.2f}"
+                  f"{all_lines_seconds:16.3f}{megabytes_per_second:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
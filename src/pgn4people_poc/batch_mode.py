@@ -0,0 +1,217 @@
+"""
+Batch mode: reads navigation commands (e.g., “12 W b”, “goto e4 c5”, “reset”, “report”), one per line, from a file or
+standard input, and writes the result of each to standard output, without prompting, clearing the console, suggesting
+randomly chosen example commands, or waiting for the user. Blank lines and lines beginning with “#” are ignored.
+
+The result of each command (and, first, the table of the main line, before any command) is written either as plain
+text (the table as displayed interactively, but uncolored) or as one JSON object per line (“JSON Lines”). Each result
+records the latency of its command: the time taken to interpret and carry out the command and to compile its table or
+report, excluding the time taken to write it out.
+"""
+
+import contextlib
+import io
+import json
+import sys
+import time
+
+from yachalk import chalk
+
+from . compile_and_output_report import (characterize_gametree,
+                                         output_GameTreeReport,
+                                         output_node_report)
+from . classes_arboreal import GameTreeReport
+from . import constants
+from . construct_output import (format_column_headings,
+                                format_single_node,
+                                variations_line_as_dictionary)
+from . error_processing import fatal_error_exit_without_traceback
+from . get_process_user_CLI_input import (interpret_user_response,
+                                          position_after_navigation_command)
+from . memory_report import (compute_memory_footprint,
+                             output_memory_report)
+from . profiling import profile_stage
+from . render_context import RenderContext
+from . traverse_tree import compile_variations_table_of_context
+
+
+def run_batch_commands(nodedict,
+                       result_counts,
+                       command_lines,
+                       output_format,
+                       output_stream = sys.stdout,
+                       table_cache = None):
+    """
+    Carries out, in order, the commands of the iterable of strings command_lines on the tree nodedict (with
+    result_counts, if not None, and table_cache, if not None, as in the interactive loop), and writes each result to
+    output_stream in output_format (constants.BATCH_OUTPUT_PLAIN or constants.BATCH_OUTPUT_JSON). Stops after the
+    “stop” command, if any.
+
+    A command that can’t be carried out (e.g., a choice not in the current table) is reported as an error in its result,
+    and the remaining commands are carried out from the unchanged position.
+    """
+    # Nothing in batch mode may clear the console or color its output
+    constants.DO_CLEAR_CONSOLE_EACH_TIME = False
+    chalk.disable_all_ansi()
+
+    render_context = RenderContext()
+
+    # The table of the main line, before any command
+    start_time = time.perf_counter()
+    with profile_stage("render table"):
+        variations_table = compile_variations_table_of_context(nodedict, render_context, result_counts, table_cache)
+    latency = time.perf_counter() - start_time
+    write_batch_result(output_stream, output_format, None, render_context, latency,
+                       variations_table=variations_table, result_counts=result_counts)
+
+    for command_line in command_lines:
+        command = command_line.strip()
+        if not command or command.startswith("#"):
+            continue
+
+        start_time = time.perf_counter()
+
+        # Measured, like each command of the interactive loop, as a stage named after the command, which is known only
+        # once the command has been interpreted (an invalid command is measured as “command invalid”)
+        with profile_stage("command invalid") as command_stage:
+            # interpret_user_response() prints its explanation of an invalid command, which is instead kept for the
+            # result
+            with contextlib.redirect_stdout(io.StringIO()) as error_output:
+                interpreted_response = interpret_user_response(command,
+                                                               render_context.fullmovenummber_to_node_id_lookup_table,
+                                                               nodedict)
+            if interpreted_response is None:
+                latency = time.perf_counter() - start_time
+                write_batch_result(output_stream, output_format, command, render_context, latency,
+                                   error=error_output.getvalue().strip())
+                continue
+
+            node_id_chosen, move_choice = interpreted_response
+            if command_stage is not None:
+                name_of_command = node_id_chosen if isinstance(node_id_chosen, str) else "choice"
+                command_stage.name_of_stage = f"command {name_of_command}"
+            if node_id_chosen == constants.STOP_SIGN:
+                break
+
+            if node_id_chosen in (constants.REPORT_COMMAND,
+                                  constants.NODEREPORT_COMMAND,
+                                  constants.MEMREPORT_COMMAND):
+                report = compile_report(nodedict, node_id_chosen, output_format)
+                latency = time.perf_counter() - start_time
+                write_batch_result(output_stream, output_format, command, render_context, latency, report=report)
+                continue
+
+            position_after_navigation_command(nodedict, render_context, node_id_chosen, move_choice)
+            variations_table = compile_variations_table_of_context(nodedict, render_context, result_counts,
+                                                                   table_cache)
+            latency = time.perf_counter() - start_time
+            write_batch_result(output_stream, output_format, command, render_context, latency,
+                               variations_table=variations_table, result_counts=result_counts)
+
+
+def compile_report(nodedict, report_command, output_format):
+    """
+    Returns the report requested by report_command (constants.REPORT_COMMAND, constants.NODEREPORT_COMMAND, or
+    constants.MEMREPORT_COMMAND): in plain format, as the text the interactive version displays; in JSON format, as a
+    dictionary or list.
+    """
+    if output_format == constants.BATCH_OUTPUT_JSON:
+        if report_command == constants.REPORT_COMMAND:
+            characterize_gametree(nodedict)
+            return {"number_of_lines": GameTreeReport.number_of_lines,
+                    "number_of_positions": GameTreeReport.number_of_nodes,
+                    "longest_line_in_halfmoves": GameTreeReport.max_halfmove_length_of_a_line,
+                    "greatest_depth": GameTreeReport.max_depth_of_a_line,
+                    "depth_histogram": {str(depth): GameTreeReport.depth_histogram[depth]
+                                        for depth in sorted(GameTreeReport.depth_histogram)},
+                    "halfmove_length_histogram": {str(length): GameTreeReport.halfmove_length_histogram[length]
+                                                  for length in sorted(GameTreeReport.halfmove_length_histogram)},
+                    "line_length_quantiles": {str(quantile): length
+                                              for quantile, length in GameTreeReport.line_length_quantiles.items()},
+                    "branching_factor_histogram": {str(number_of_edges):
+                                                       GameTreeReport.branching_factor_histogram[number_of_edges]
+                                                   for number_of_edges in
+                                                   sorted(GameTreeReport.branching_factor_histogram)},
+                    "positions_per_depth": {str(depth): GameTreeReport.nodes_per_depth_histogram[depth]
+                                            for depth in sorted(GameTreeReport.nodes_per_depth_histogram)},
+                    "alternatives_per_move_number": {str(fullmovenumber):
+                                                         GameTreeReport.alternatives_per_move_number[fullmovenumber]
+                                                     for fullmovenumber in
+                                                     sorted(GameTreeReport.alternatives_per_move_number)}}
+        if report_command == constants.MEMREPORT_COMMAND:
+            return compute_memory_footprint(nodedict)
+        return [{"node_id": node_id,
+                 "halfmovenumber": nodedict[node_id].halfmovenumber,
+                 "depth": nodedict[node_id].depth,
+                 "edges": [[edge.movetext, edge.destination_node_id] for edge in nodedict[node_id].edgeslist]}
+                for node_id in sorted(nodedict)]
+
+    with contextlib.redirect_stdout(io.StringIO()) as report_output:
+        if report_command == constants.REPORT_COMMAND:
+            characterize_gametree(nodedict)
+            output_GameTreeReport(do_wait_for_user=False)
+        elif report_command == constants.MEMREPORT_COMMAND:
+            output_memory_report(compute_memory_footprint(nodedict))
+        else:
+            output_node_report(nodedict, do_wait_for_user=False)
+    return report_output.getvalue().strip("\n")
+
+
+def write_batch_result(output_stream,
+                       output_format,
+                       command,
+                       render_context,
+                       latency,
+                       variations_table = None,
+                       result_counts = None,
+                       report = None,
+                       error = None):
+    """
+    Writes to output_stream the result of one command (command is None for the table shown before any command), at
+    the position of render_context (an instance of RenderContext): exactly one of variations_table, report, and error
+    is not None. latency is in seconds.
+    """
+    latency_in_ms = round(1000 * latency, 3)
+
+    if output_format == constants.BATCH_OUTPUT_JSON:
+        result = {"command": command,
+                  "target_node_id": render_context.target_node_id,
+                  # JSON keys are strings
+                  "deviation_history": {str(node_id): choice_id
+                                        for node_id, choice_id in render_context.deviation_history.items()},
+                  "latency_ms": latency_in_ms}
+        if variations_table is not None:
+            result["table"] = [variations_line_as_dictionary(variations_line, result_counts)
+                               for variations_line in variations_table]
+        if report is not None:
+            result["report"] = report
+        if error is not None:
+            result["error"] = error
+        output_stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return
+
+    lines = [f"> {'(start)' if command is None else command}    [{latency_in_ms} ms]"]
+    if variations_table is not None:
+        lines.extend(format_column_headings(result_counts))
+        lines.extend(format_single_node(variations_line, result_counts) for variations_line in variations_table)
+    if report is not None:
+        lines.append(report)
+    if error is not None:
+        lines.append(f"ERROR: {error}")
+    output_stream.write("\n".join(lines) + "\n\n")
+
+
+def run_batch_commands_CLI_package(batch_filepath, nodedict, result_counts, output_format, table_cache = None):
+    """
+    Runs batch mode (see run_batch_commands()) on the commands of the file at batch_filepath, or of standard input if
+    batch_filepath is “-”.
+    """
+    if batch_filepath == "-":
+        run_batch_commands(nodedict, result_counts, sys.stdin, output_format, table_cache=table_cache)
+        return
+    try:
+        batch_file = open(batch_filepath, "r", encoding="utf-8")
+    except OSError as err:
+        fatal_error_exit_without_traceback(f"Could not read the batch commands from “{batch_filepath}”.\n{err}")
+    with batch_file:
+        run_batch_commands(nodedict, result_counts, batch_file, output_format, table_cache=table_cache)
@@ -2,22 +2,123 @@
 
 from . classes_arboreal import Edge
 from . classes_arboreal import GameNode
+from . classes_arboreal import VariationSpan
 from . import constants
 from . error_processing import fatal_pgn_error
 from . import pgn_utilities
+from . profiling import profile_each_item
+from . process_pgn_file import (clean_and_parse_string_read_from_file,
+                                get_string_read_from_file_CLI_package)
 
 
-def buildtree(tokenlist):
+def build_gametree_from_pgn_file(user_pgn_filepath):
+    """
+    Reads the PGN file at user_pgn_filepath (or the built-in sample PGN, if user_pgn_filepath is None), and returns the
+    game tree of its first game, as built by buildtree().
+    """
+    string_read_from_file, pgn_source = get_string_read_from_file_CLI_package(user_pgn_filepath)
+    tokenlist = clean_and_parse_string_read_from_file(string_read_from_file, pgn_source)
+    return buildtree(tokenlist)
+
+
+def buildtree(tokenlist, pending_variations_of_node = None):
     """
     Build the game tree—as a dictionary (“gamenodes”) of game nodes—from supplied list of PGN tokens. Return gamenodes.
 
+    pending_variations_of_node is used only when building a tree lazily (see lazy_tree.py), in which case tokenlist
+    may contain, in place of the tokens of a top-level variation, a single VariationSpan placeholder. Each placeholder
+    is then recorded, rather than built, in the dictionary pending_variations_of_node, keyed by the node_id of the node
+    at which the variation is an alternative.
+
     See generally pgn4people-poc/docs/game-tree-concepts.md
     """
 
-    ###############   Initializations  ###############
-    # Initialize empty dictionaries
     # gamenodes is indexed by a node_id
     gamenodes = {}
+
+    # Create the id=constants.INITIAL_NODE_ID=0 node corresponding to the initial position (and to White's first move)
+    # The first movetext token is necessarily the main line and thus depth=0
+    # The first movetext token is White's first move, which has halfmovenumber=1, and depth=0
+    originating_node_id_of_initial_node = constants.UNDEFINED_TREEISH_VALUE
+    newnode = GameNode(depth = 0,
+                       halfmovenumber = 1,
+                       originating_node_id = originating_node_id_of_initial_node,
+                       node_id = constants.INITIAL_NODE_ID)
+    # Adds this new node as the first node in the gamenodes dictionary
+    gamenodes[constants.INITIAL_NODE_ID] = newnode
+
+    # Node_id for the next node to be created is 1
+    grow_tree_from_tokens(gamenodes, tokenlist, constants.INITIAL_NODE_ID, 1, pending_variations_of_node)
+
+    return gamenodes
+
+
+def build_merged_gametree(games_to_merge, result_counts = None, gamenodes = None):
+    """
+    Build a single game tree—as a dictionary (“gamenodes”) of game nodes—into which the games yielded by the iterable
+    games_to_merge, each as the 2-tuple (tokenlist, value of the game’s Result header), are merged, in order. Return
+    gamenodes.
+
+    Games are merged move by move: a move that already exists at a node (e.g., because an earlier game played it) is
+    followed rather than added again, so each node corresponds to a distinct sequence of moves. The first game to
+    play a move at a node determines the order of the alternatives there; in particular, the main line is the first
+    game’s main line.
+
+    If result_counts (an instance of ResultCounts) is supplied, it is updated, as each game is merged, with that game’s
+    result for the initial node and every node of the game’s main line.
+
+    If gamenodes (a tree previously returned by this function) is supplied, the games are merged into it, and it is
+    returned; otherwise a new tree is started.
+    """
+    if gamenodes is None:
+        gamenodes = buildtree([])
+    next_node_id = max(gamenodes) + 1
+    # Each game is a span of the trace, if any, from the reading of its movetext through its merging
+    for tokenlist, result in profile_each_item(games_to_merge, "game"):
+        # (grow_tree_from_tokens() detects a leading parenthesis only in the first game, whose first node_id is 1.)
+        if tokenlist and tokenlist[0] in ("(", ")"):
+            fatal_pgn_error(f"“{tokenlist[0]}” encountered on first token after headers.")
+        mainline_node_ids = [constants.INITIAL_NODE_ID]
+        next_node_id = grow_tree_from_tokens(gamenodes,
+                                             tokenlist,
+                                             constants.INITIAL_NODE_ID,
+                                             next_node_id,
+                                             do_merge_identical_moves = True,
+                                             mainline_node_ids = mainline_node_ids)
+        if result_counts is not None:
+            result_counts.add_game(mainline_node_ids, result)
+    return gamenodes
+
+
+def grow_tree_from_tokens(gamenodes,
+                          tokenlist,
+                          originating_node_id,
+                          next_node_id,
+                          pending_variations_of_node = None,
+                          do_merge_identical_moves = False,
+                          mainline_node_ids = None):
+    """
+    Adds to gamenodes the nodes and edges defined by tokenlist, where the first movetext of tokenlist (or, if
+    tokenlist begins with “(”, the movetext immediately preceding it) is a move played at node originating_node_id.
+    Returns the node_id to be assigned to the next node created.
+
+    buildtree() calls this with the tokens of a whole game and the initial node. lazy_tree.py calls this with the
+    tokens of a single top-level variation, “( … )”, and the node at which that variation is an alternative, in order
+    to graft that variation onto an already built tree.
+
+    See buildtree() for pending_variations_of_node.
+
+    If do_merge_identical_moves is True, a movetext that matches (see GameNode.edge_from_movetext()) an edge already
+    at its originating node follows that edge instead of creating a new one. build_merged_gametree() uses this to
+    merge a game into a tree built from earlier games. The depth of each new node is then computed from its position
+    in the tree (see below), since a game’s main line may be an alternative in the tree.
+
+    If the list mainline_node_ids is supplied, the node_id of the destination of each movetext of tokenlist’s main line
+    (i.e., outside any parentheses), whether created or (when merging) already present, is appended to it.
+    """
+
+    ###############   Initializations  ###############
+    # Initialize empty dictionaries
     # current_halfmovenumber is indexed by depth
     current_halfmovenumber = {}
     # current_originatingnode_id is indexed by depth
@@ -26,26 +127,21 @@ def buildtree(tokenlist):
     latest_mainline_destination = {}
  
     # Initializations to begin the looping through tokens
-    # The first movetext token is necessarily the main line and thus depth=0
+    # depth is measured relative to the originating node; the .depth of each new node is offset by base_depth
+    base_depth = gamenodes[originating_node_id].depth
     depth = 0
-    # The first movetext token is White's first move, which has halfmovenumber=1, and depth=0
-    current_halfmovenumber[depth] = 1
+    current_halfmovenumber[depth] = gamenodes[originating_node_id].halfmovenumber
+    if tokenlist and tokenlist[0] == "(":
+        # The tokens begin with a variation, and thus the movetext to which that variation is an alternative has
+        # already been played (and is already in the tree). Its destination has the next halfmove number.
+        current_halfmovenumber[depth] += 1
 
-    # Create the id=constants.INITIAL_NODE_ID=0 node corresponding to the initial position (and to White's first move)
-    originating_node_id_of_initial_node = constants.UNDEFINED_TREEISH_VALUE
-    newnode = GameNode(depth = depth,
-                       halfmovenumber = current_halfmovenumber[depth],
-                       originating_node_id = originating_node_id_of_initial_node,
-                       node_id = constants.INITIAL_NODE_ID)
-    # Adds this new node as the first node in the gamenodes dictionary
-    gamenodes[constants.INITIAL_NODE_ID] = newnode
-
-    lastcreated_node_id = constants.INITIAL_NODE_ID
+    lastcreated_node_id = originating_node_id
 
-    # The next node at current depth (0) will be spawned from node with id zero.
-    current_originatingnode_id[depth]=constants.INITIAL_NODE_ID
+    # The next node at current depth (0) will be spawned from originating_node_id.
+    current_originatingnode_id[depth] = originating_node_id
     # Node_id for the next node to be created
-    current_node_id = 1
+    current_node_id = next_node_id
 
     # Initializes boolean variables that are meant to be true only if the current movetext was immediately
     # preceded by a closed/open parenthesis, respectively
@@ -53,8 +149,19 @@ def buildtree(tokenlist):
     is_preceded_by_closed_paren = False
 
     for token in tokenlist:
-        # Branches based on whether current token is (a) movetext, (b) “(”, or (c) “)”.
-        if pgn_utilities.ismovetext(token):
+        # Branches based on whether current token is (a) a placeholder for a not-yet-built top-level variation,
+        # (b) movetext, (c) “(”, or (d) “)”.
+        if isinstance(token, VariationSpan):
+            # Check that this isn't the first token (a variation must be an alternative to some earlier movetext).
+            if current_node_id == 1:
+                fatal_pgn_error("“(” encountered on first token after headers.")
+            # The variation is an alternative to the most recent movetext at this depth, and thus is spawned from the
+            # same originating node. Record it, in order, to be built only when that node is first reached.
+            pending_variations_of_node.setdefault(current_originatingnode_id[depth], []).append(token)
+            # Tokens after the variation continue the line, exactly as they would after a “)”.
+            is_preceded_by_closed_paren = True
+
+        elif pgn_utilities.ismovetext(token):
             # Token is movetext, which defines an edge that connects (a) the node with id
             # current_originatingnode_id[depth] to a node about to be created with id current_node_id.
             # Processing now branches based on whether the immediately preceding token was (a) “(’, (b) “)”,
@@ -107,6 +214,16 @@ def buildtree(tokenlist):
             # Update originating node about the existence of this node
             originating_node_id = current_originatingnode_id[depth]
 
+            if do_merge_identical_moves:
+                existing_edge = gamenodes[originating_node_id].edge_from_movetext(token)
+                if existing_edge is not None:
+                    # The move is already in the tree, so the line continues from the existing node
+                    latest_mainline_destination[depth] = existing_edge.destination_node_id
+                    lastcreated_node_id = existing_edge.destination_node_id
+                    if mainline_node_ids is not None and depth == 0:
+                        mainline_node_ids.append(lastcreated_node_id)
+                    continue
+
             # Install new edge on originating node; add originating node to set of nonterminal nodes
             gamenodes[originating_node_id].install_new_edge_on_originating_node(new_edge, originating_node_id)
 
@@ -123,7 +240,14 @@ def buildtree(tokenlist):
 
             # newnode.choice_id_at_originatingnode = index_of_edge_at_originating_node
 
-            newnode = GameNode(depth = depth,
+            if do_merge_identical_moves:
+                # The depth is one more than the originating node’s if the new edge is an alternative there. (This is
+                # equivalent to base_depth + depth when no moves are merged.)
+                depth_of_new_node = gamenodes[originating_node_id].depth + (index_of_edge_at_originating_node > 0)
+            else:
+                depth_of_new_node = base_depth + depth
+
+            newnode = GameNode(depth = depth_of_new_node,
                                halfmovenumber = current_halfmovenumber[depth],
                                originating_node_id = current_originatingnode_id[depth],
                                choice_id_at_originatingnode = index_of_edge_at_originating_node,
@@ -133,6 +257,9 @@ def buildtree(tokenlist):
             # Add node to gamesnodes dictionary
             gamenodes[current_node_id] = newnode
 
+            if mainline_node_ids is not None and depth == 0:
+                mainline_node_ids.append(current_node_id)
+
             # Adjusts current_originatingnode_id[depth] and current_node_id for next node to be created
             lastcreated_node_id = current_node_id
             current_node_id += 1
@@ -180,7 +307,4 @@ def buildtree(tokenlist):
             # by definition movetext.
             fatal_pgn_error(f"First token, “{token}”,  is not movetext.")
 
-    return gamenodes
-
-
-
+    return current_node_id
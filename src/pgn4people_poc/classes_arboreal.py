@@ -5,8 +5,44 @@ See generally pgn4people-poc/docs/game-tree-concepts.md
 """
 
 from . import constants
+from . pgn_utilities import normalized_movetext
 
-class GameNode:
+
+class MovetextLookupMixin:
+    """
+    Provides edge_from_movetext() to a class of node that has the attributes .edgeslist and .edges_by_movetext (None
+    until the node is first looked up by movetext), i.e., to GameNode and StoredNode.
+    """
+
+    __slots__ = ()
+
+
+    def edge_from_movetext(self, movetext):
+        """
+        Returns the edge at this node whose movetext matches `movetext`, or None if there is no such edge.
+
+        The comparison is made on normalized movetext (see pgn_utilities.normalized_movetext()), so that, e.g., “Nf3”
+        matches an edge whose movetext is “Nf3+” or “Nf3!?”.
+
+        The dictionary .edges_by_movetext is built the first time this method is called on the node, so each later
+        lookup is a single dictionary access rather than a linear scan of .edgeslist. If the same movetext occurs more
+        than once at a node, the edge with the lowest index (i.e., the one closest to the main line) wins.
+
+        Building .edges_by_movetext is the only write that reading a tree makes to its nodes, and it is tolerated on a
+        tree shared by several sessions or threads (see render_context.py) because it is idempotent: the dictionary is
+        completely built before it is stored, by a single assignment, so that another thread sees either None (and
+        builds an equal dictionary itself) or the complete dictionary, never one under construction.
+        """
+        edges_by_movetext = self.edges_by_movetext
+        if edges_by_movetext is None:
+            edges_by_movetext = {}
+            for edge in self.edgeslist:
+                edges_by_movetext.setdefault(normalized_movetext(edge.movetext), edge)
+            self.edges_by_movetext = edges_by_movetext
+        return edges_by_movetext.get(normalized_movetext(movetext))
+
+
+class GameNode(MovetextLookupMixin):
     """
     The class of which each node (position) is an instance.
 
@@ -35,8 +71,9 @@ class GameNode:
             "List of edges (of class Edge) attached to this node. (Compiled incrementally as PGN is parsed.)",
         "number_of_edges":
             "Number_of_edges in .edgeslist. (Compiled incrementally as PGN is parsed.)",
-        "display_order_of_edges":
-            "List of indices that point to original index of edges before temporary reordering for display purposes."
+        "edges_by_movetext":
+            "Dictionary of (normalized movetext : edge) pairs, built lazily the first time a child is looked up by its "
+            "movetext. None until then."
     }
 
     
@@ -59,6 +96,9 @@ class GameNode:
         # self.choice_id_at_originatingnode = constants.UNDEFINED_TREEISH_VALUE
         self.choice_id_at_originatingnode = choice_id_at_originatingnode
 
+        # Built only on demand by edge_from_movetext(); most nodes are never looked up by movetext.
+        self.edges_by_movetext = None
+
         # Add node_id, which is NOT an attribute of this instance, to the class attribute .set_of_node_IDs
         self.__class__.set_of_node_IDs.add(node_id)
 
@@ -89,6 +129,10 @@ class GameNode:
         # Add this node to set of nonterminal nodes
         self.set_of_nonterminal_node_IDs.add(originating_node_id)
 
+        # If the movetext lookup dictionary has already been built, keep it in sync with .edgeslist
+        if self.edges_by_movetext is not None:
+            self.edges_by_movetext.setdefault(normalized_movetext(new_edge.movetext), new_edge)
+
 
 class Edge:
     """
@@ -113,6 +157,57 @@ class Edge:
         self.destination_node_id = destination_node_id
 
 
+class StoredNode(MovetextLookupMixin):
+    """
+    Transient stand-in for the GameNode of a node read from a store outside the Python heap: a SQLite database (see
+    sqlite_tree.py) or a frozen tree (see frozen_tree.py). Exposes the same attributes (and edge_from_movetext() method)
+    that traverse_tree and the reports use on a GameNode.
+    """
+
+    __slots__ = ("halfmovenumber",
+                 "depth",
+                 "originatingnode_id",
+                 "choice_id_at_originatingnode",
+                 "edgeslist",
+                 "number_of_edges",
+                 "edges_by_movetext",
+                 "node_id")
+
+
+    def __init__(self, row):
+        (self.node_id,
+         self.halfmovenumber,
+         self.depth,
+         self.originatingnode_id,
+         self.choice_id_at_originatingnode,
+         self.number_of_edges) = row
+        self.edgeslist = []
+        self.edges_by_movetext = None
+
+
+class VariationSpan:
+    """
+    Placeholder, in the token list of a lazily built tree, for a top-level variation “( … )” that has not yet been
+    tokenized. start and end delimit the variation (including its parentheses) as the slice pgnstring[start:end] of
+    the cleaned movetext string.
+
+    See lazy_tree.py.
+    """
+
+
+    __slots__ = {
+        "start":
+            "Index in the cleaned movetext string of the variation’s “(”",
+        "end":
+            "Index in the cleaned movetext string just after the variation’s matching “)”"
+    }
+
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+
 class GameTreeReport:
     """
     Set of data characterizing a game tree in terms of number of lines, length
@@ -128,6 +223,11 @@ class GameTreeReport:
             frequency is the number of terminal nodes with halfmove equal to the given halfmove_length.
         depth_histogram: A collections.Counter dict of {depth: frequency} key:value pairs, where frequency is the number
             of terminal nodes with depth equal to the given depth.
+        line_length_quantiles: A dict of {quantile: halfmove_length}, e.g., {0.5: the median halfmove length of a line}
+        branching_factor_histogram: A collections.Counter dict of {number_of_edges: frequency}, over all nodes
+        nodes_per_depth_histogram: A collections.Counter dict of {depth: frequency}, over all nodes
+        alternatives_per_move_number: A collections.Counter dict of {fullmovenumber: number of non-mainline edges of
+            the nodes at which a move with that move number is made}
     
     Used by characterize_gametree() in compile_and_output_report.py.
     """
@@ -1,8 +1,14 @@
 """
 Construct and output report characterizing the current game tree in terms of
-number of lines, length of lines, and hierarchical depth.
+number of lines, length of lines, hierarchical depth, and branching.
 """
 
+from array import array
+from collections import Counter
+import itertools
+import math
+import operator
+
 from yachalk import chalk
 
 from pgn4people_poc.error_processing import fatal_developer_error
@@ -10,6 +16,7 @@ from pgn4people_poc.error_processing import fatal_developer_error
 from . classes_arboreal import (GameNode,
                                 GameTreeReport)
 from . import constants
+from . sqlite_tree import SQLiteNodeDict
 from . utilities import (conditionally_clear_console,
                          wait_for_any_user_input)
 
@@ -40,59 +47,198 @@ def characterize_gametree(nodedict):
         then .set_of_terminal_nodes would become an instance attribute. (That said, I apparently was getting away with
         it. But since I didn't understand why, I changed it to self.__class__.set_of_terminal_nodes,)
 
-    However, while set_of_nodes and set_of_nonterminal_nodes are both compiled during the buildtree() process, 
-    set_of_terminal_nodes is not and must be derived from set_of_nodes and set_of_nonterminal_nodes.
+    set_of_terminal_nodes is derived from nodedict, by finding the nodes that have no edges.
+
+    Also records, over ALL nodes (not only terminal nodes):
+        branching_factor_histogram: A collections.Counter dict of {number_of_edges: frequency}, where frequency is the
+            number of nodes with that many edges (0 for a terminal node)
+        nodes_per_depth_histogram: A collections.Counter dict of {depth: frequency}, where frequency is the number of
+            nodes at that depth
+        alternatives_per_move_number: A collections.Counter dict of {fullmovenumber: number of alternatives}, where an
+            alternative is any edge, other than the mainline edge, of a node whose moves have that move number
+        line_length_quantiles: Dictionary of {quantile: halfmove length} for each quantile of
+            constants.LINE_LENGTH_QUANTILES (e.g., 0.5: the median halfmove length of a line), by nearest rank
+
+    Rather than visiting the nodes one at a time in a Python loop, the attributes of the nodes are first extracted
+    into columns (arrays, one element per node, in the same order), and each statistic is then a single pass over one
+    or two columns by a function implemented in C: collections.Counter over a column, or over those elements of a
+    column selected by itertools.compress() (e.g., only the terminal nodes). No Python-level loop visits the nodes.
+
+    If identical subtrees of the tree have been shared (see share_subtrees.py), a node stands for every path that
+    reaches it, and the statistics are instead computed by characterize_shared_gametree().
     """
+    number_of_edges_column, depth_column, halfmovenumber_column = columns_of_gametree(nodedict)
 
-    #Derive set_of_terminal_nodes
+    # A tree has one edge fewer than it has nodes; any more, and some nodes are reached by more than one edge
+    if sum(number_of_edges_column) >= len(number_of_edges_column):
+        characterize_shared_gametree(nodedict)
+        return
 
     # Compute number of nodes (i.e., number of positions)
-    GameTreeReport.number_of_nodes = len(nodedict)
+    GameTreeReport.number_of_nodes = len(number_of_edges_column)
+
+    # Selectors for itertools.compress(): one byte per node, 1 if the node is terminal (or branching), otherwise 0
+    is_terminal_selector = bytes(map(operator.not_, number_of_edges_column))
+    is_branching_selector = bytes(map(operator.lt, itertools.repeat(1), number_of_edges_column))
 
-    # Calculates set of terminal nodes from previously calculated set of all nodes and set of all nonterminal nodes
-    GameNode.set_of_terminal_node_IDs = GameNode.set_of_node_IDs.difference(GameNode.set_of_nonterminal_node_IDs)
+    # Calculates set of terminal nodes from nodedict itself, rather than from the class-level sets of all nodes and of
+    # all nonterminal nodes, which also include the nodes of any other tree built in the same session (e.g., one being
+    # rebuilt in the background in watch mode)
+    GameNode.set_of_terminal_node_IDs = set(itertools.compress(nodedict.keys(), is_terminal_selector))
     GameTreeReport.number_of_lines = len(GameNode.set_of_terminal_node_IDs)
 
-    # Initialized counters and histograms
-    GameTreeReport.max_halfmove_length_of_a_line = 0
-    GameTreeReport.max_depth_of_a_line = 0
-    GameTreeReport.depth_histogram = {}
-    GameTreeReport.halfmove_length_histogram = {}
-    
-    # Loops througn terminal nodes
-    for terminal_node_ID in GameNode.set_of_terminal_node_IDs:
+    # Depth of each line (i.e., of its terminal node)
+    depths_of_lines = array("i", itertools.compress(depth_column, is_terminal_selector))
+    GameTreeReport.depth_histogram = Counter(depths_of_lines)
+    GameTreeReport.max_depth_of_a_line = max(depths_of_lines, default=0)
+
+    # The length of a line is the halfmove number associated with the line’s terminal node MINUS 1, because the
+    # halfmove number associated with the terminal node corresponds to a move never made (since it’s a terminal
+    # mode).
+    sorted_halfmove_lengths = sorted(map(operator.sub,
+                                         itertools.compress(halfmovenumber_column, is_terminal_selector),
+                                         itertools.repeat(1)))
+    GameTreeReport.halfmove_length_histogram = Counter(sorted_halfmove_lengths)
+    GameTreeReport.max_halfmove_length_of_a_line = sorted_halfmove_lengths[-1] if sorted_halfmove_lengths else 0
+    GameTreeReport.line_length_quantiles = {
+        quantile: sorted_halfmove_lengths[max(0, math.ceil(quantile * len(sorted_halfmove_lengths)) - 1)]
+        for quantile in constants.LINE_LENGTH_QUANTILES if sorted_halfmove_lengths}
+
+    GameTreeReport.branching_factor_histogram = Counter(number_of_edges_column)
+    GameTreeReport.nodes_per_depth_histogram = Counter(depth_column)
+
+    # Each branching node contributes its move number once per alternative, i.e., (number_of_edges - 1) times. (The
+    # move number is computed as in fullmovenumber_from_halfmove().)
+    fullmovenumbers_of_branching_nodes = map(operator.floordiv,
+                                             map(operator.add,
+                                                 itertools.compress(halfmovenumber_column, is_branching_selector),
+                                                 itertools.repeat(1)),
+                                             itertools.repeat(2))
+    numbers_of_alternatives = map(operator.sub,
+                                  itertools.compress(number_of_edges_column, is_branching_selector),
+                                  itertools.repeat(1))
+    GameTreeReport.alternatives_per_move_number = Counter(itertools.chain.from_iterable(
+        map(itertools.repeat, fullmovenumbers_of_branching_nodes, numbers_of_alternatives)))
+
+
+def characterize_shared_gametree(nodedict):
+    """
+    Records, in the same class attributes of GameTreeReport as characterize_gametree(), the statistics of a tree whose
+    identical subtrees have been shared (see share_subtrees.py), i.e., of a DAG.
 
-        terminal_node = nodedict[terminal_node_ID]
+    The statistics describe the tree as the user explores it, i.e., as if each shared subtree were again copied under
+    each of its originating nodes: each node counts once per path from the initial node that reaches it, and at the
+    depth at which that path reaches it (see numbers_of_paths_by_depth()). They are therefore the same as those of the
+    tree before its subtrees were shared. (E.g., a terminal node shared by three lines counts as three lines, at each
+    line’s own depth, rather than as one line at the .depth of its first originating node.)
 
-        # Process depth
-        depth = terminal_node.depth
+    The nodes are visited once each, by a Python-level loop; the number of paths is never enumerated.
+    """
+    paths_by_depth_of_node = numbers_of_paths_by_depth(nodedict)
+
+    GameNode.set_of_terminal_node_IDs = set()
+    depth_histogram = Counter()
+    halfmove_length_histogram = Counter()
+    branching_factor_histogram = Counter()
+    nodes_per_depth_histogram = Counter()
+    alternatives_per_move_number = Counter()
+    for node_id, node in nodedict.items():
+        paths_by_depth = paths_by_depth_of_node[node_id]
+        number_of_paths = sum(paths_by_depth.values())
+        nodes_per_depth_histogram.update(paths_by_depth)
+        branching_factor_histogram[node.number_of_edges] += number_of_paths
+        if node.number_of_edges == 0:
+            GameNode.set_of_terminal_node_IDs.add(node_id)
+            depth_histogram.update(paths_by_depth)
+            halfmove_length_histogram[node.halfmovenumber - 1] += number_of_paths
+        elif node.number_of_edges > 1:
+            # (The move number is computed as in fullmovenumber_from_halfmove().)
+            fullmovenumber = (node.halfmovenumber + 1) // 2
+            alternatives_per_move_number[fullmovenumber] += number_of_paths * (node.number_of_edges - 1)
+
+    GameTreeReport.number_of_nodes = sum(branching_factor_histogram.values())
+    GameTreeReport.number_of_lines = sum(depth_histogram.values())
+    GameTreeReport.depth_histogram = depth_histogram
+    GameTreeReport.max_depth_of_a_line = max(depth_histogram, default=0)
+    GameTreeReport.halfmove_length_histogram = halfmove_length_histogram
+    GameTreeReport.max_halfmove_length_of_a_line = max(halfmove_length_histogram, default=0)
+    GameTreeReport.line_length_quantiles = {
+        quantile: quantile_of_histogram(halfmove_length_histogram, GameTreeReport.number_of_lines, quantile)
+        for quantile in constants.LINE_LENGTH_QUANTILES if GameTreeReport.number_of_lines}
+    GameTreeReport.branching_factor_histogram = branching_factor_histogram
+    GameTreeReport.nodes_per_depth_histogram = nodes_per_depth_histogram
+    GameTreeReport.alternatives_per_move_number = alternatives_per_move_number
+
+
+def numbers_of_paths_by_depth(nodedict):
+    """
+    Returns a dictionary {node_id: Counter {depth: number of paths}} that counts, for each node of nodedict (a tree or
+    a DAG), the paths from the initial node that reach it, by the depth (the number of deviations from mainline
+    continuations) at which they reach it.
+
+    On a DAG, a shared node’s .depth is that of the path through its first originating node only. The numbers of paths
+    are instead carried forward along each edge (an edge other than a node’s first deviates once more) from a node
+    whose every incoming path has been counted, i.e., in a topological order (by Kahn’s algorithm). Increasing node_id
+    isn’t one, because an edge may have been redirected to a node with a smaller node_id than its originating node.
+    """
+    number_of_uncounted_edges_into_node = Counter(edge.destination_node_id
+                                                  for node in nodedict.values()
+                                                  for edge in node.edgeslist)
+    initial_node = nodedict[constants.INITIAL_NODE_ID]
+    paths_by_depth_of_node = {constants.INITIAL_NODE_ID: Counter({initial_node.depth: 1})}
+    stack_of_counted_node_ids = [constants.INITIAL_NODE_ID]
+    while stack_of_counted_node_ids:
+        node_id = stack_of_counted_node_ids.pop()
+        paths_by_depth = paths_by_depth_of_node[node_id]
+        for choice_id, edge in enumerate(nodedict[node_id].edgeslist):
+            destination_node_id = edge.destination_node_id
+            number_of_deviations = 1 if choice_id > 0 else 0
+            paths_by_depth_of_destination = paths_by_depth_of_node.setdefault(destination_node_id, Counter())
+            for depth, number_of_paths in paths_by_depth.items():
+                paths_by_depth_of_destination[depth + number_of_deviations] += number_of_paths
+            number_of_uncounted_edges_into_node[destination_node_id] -= 1
+            if number_of_uncounted_edges_into_node[destination_node_id] == 0:
+                stack_of_counted_node_ids.append(destination_node_id)
+    return paths_by_depth_of_node
+
+
+def quantile_of_histogram(histogram, total_frequency, quantile):
+    """
+    Returns the quantile (by nearest rank, as in characterize_gametree()) of the values counted by histogram, a
+    Counter {value: frequency} whose frequencies sum to total_frequency.
+    """
+    rank = max(1, math.ceil(quantile * total_frequency))
+    cumulative_frequency = 0
+    for value in sorted(histogram):
+        cumulative_frequency += histogram[value]
+        if cumulative_frequency >= rank:
+            return value
 
-        if depth > GameTreeReport.max_depth_of_a_line:
-            GameTreeReport.max_depth_of_a_line = depth
-        
-        if depth in GameTreeReport.depth_histogram.keys():
-            GameTreeReport.depth_histogram[depth] += 1
-        else:
-            GameTreeReport.depth_histogram[depth] = 1
-    
-        # Process halfmove_length
-        # The length of a line is the halfmove number associated with the line’s terminal node MINUS 1, because the
-        # halfmove number associated with the terminal node corresponds to a move never made (since it’s a terminal
-        # mode).
-        halfmove_length = terminal_node.halfmovenumber - 1
-
-        if halfmove_length > GameTreeReport.max_halfmove_length_of_a_line:
-            GameTreeReport.max_halfmove_length_of_a_line = halfmove_length
-        
-        if halfmove_length in GameTreeReport.halfmove_length_histogram.keys():
-            GameTreeReport.halfmove_length_histogram[halfmove_length] += 1
-        else:
-            GameTreeReport.halfmove_length_histogram[halfmove_length] = 1
-
-
-def output_GameTreeReport():
+
+def columns_of_gametree(nodedict):
+    """
+    Returns the 3-tuple of arrays (number_of_edges, depth, halfmovenumber), each with one element per node of
+    nodedict, in the order of nodedict.keys(): e.g., depth[i] is the .depth of the i-th node.
+
+    Each column is extracted by map() with operator.attrgetter(), i.e., without a Python-level loop. (The columns of a
+    tree stored in a SQLite database are instead read by a single query, without reading any node.)
+    """
+    if isinstance(nodedict, SQLiteNodeDict):
+        return nodedict.columns_of_gametree()
+
+    # (Listing the nodes also builds any pending variations of a lazily built tree, so that nodedict.keys() then lists
+    # the same nodes in the same order.)
+    nodes = list(nodedict.values())
+    return (array("i", map(operator.attrgetter("number_of_edges"), nodes)),
+            array("i", map(operator.attrgetter("depth"), nodes)),
+            array("i", map(operator.attrgetter("halfmovenumber"), nodes)))
+
+
+def output_GameTreeReport(do_wait_for_user = True):
     """
     Outputs the results stored in class attributes of class GameTreeReport
+
+    If do_wait_for_user is False (e.g., in batch mode), returns without waiting for the user to dismiss the report.
     """
     # For formatting with f-strings, see Eric Leung, “Print fixed fields using f-strings in Python,”
     # dev.to, August 18, 2020. https://dev.to/erictleung/print-fixed-fields-using-f-strings-in-python-26ng
@@ -148,14 +294,52 @@ def output_GameTreeReport():
         print_string_2 = f"{GameTreeReport.halfmove_length_histogram[halfmove_length]:{constants.FREQ_WIDTH_IN_CHARACTERS}}"
         print(print_string_1, print_string_2)
 
+    # Print quantiles of halfmove length
+    print("\nLINE-LENGTH QUANTILES")
+    print("Quantile     Length")
+    for quantile, halfmove_length in GameTreeReport.line_length_quantiles.items():
+        print_string_1 = f"{quantile:{constants.KEY_WIDTH_IN_CHARACTERS + 4}.0%} "
+        print_string_2 = f"{halfmove_length:{constants.FREQ_WIDTH_IN_CHARACTERS - 1}}"
+        print(print_string_1, print_string_2)
+
+    print("\n(The following statistics count every position, not only")
+    print("the terminal positions of lines.)")
+
+    # Print branching-factor histogram
+    print("\nBRANCHING-FACTOR HISTOGRAM")
+    print("Moves     Frequency")
+    for number_of_edges in sorted(GameTreeReport.branching_factor_histogram):
+        print_string_1 = f"{number_of_edges:{constants.KEY_WIDTH_IN_CHARACTERS}} "
+        print_string_2 = f"{GameTreeReport.branching_factor_histogram[number_of_edges]:{constants.FREQ_WIDTH_IN_CHARACTERS}}"
+        print(print_string_1, print_string_2)
+
+    # Print positions-per-depth histogram
+    print("\nPOSITIONS PER DEPTH")
+    print("Depth     Frequency")
+    for depth in sorted(GameTreeReport.nodes_per_depth_histogram):
+        print_string_1 = f"{depth:{constants.KEY_WIDTH_IN_CHARACTERS}} "
+        print_string_2 = f"{GameTreeReport.nodes_per_depth_histogram[depth]:{constants.FREQ_WIDTH_IN_CHARACTERS}}"
+        print(print_string_1, print_string_2)
+
+    # Print alternatives per move number
+    print("\nALTERNATIVES PER MOVE NUMBER")
+    print("Move   Alternatives")
+    for fullmovenumber in sorted(GameTreeReport.alternatives_per_move_number):
+        print_string_1 = f"{fullmovenumber:{constants.KEY_WIDTH_IN_CHARACTERS}} "
+        print_string_2 = f"{GameTreeReport.alternatives_per_move_number[fullmovenumber]:{constants.FREQ_WIDTH_IN_CHARACTERS}}"
+        print(print_string_1, print_string_2)
+
     # Wait for user input (of any kind) before dismissing the summary table and moving forward
-    wait_for_any_user_input()
+    if do_wait_for_user:
+        wait_for_any_user_input()
 
 
-def output_node_report(nodedict):
+def output_node_report(nodedict, do_wait_for_user = True):
     """
     For testing/debug purposes: output each node and selected of its attributes.
     Typically, only for SMALL trees, because otherwise the number of nodes printed is very large.
+
+    See output_GameTreeReport() for do_wait_for_user.
     """
 
     conditionally_clear_console()
@@ -178,7 +362,7 @@ def output_node_report(nodedict):
     print("reached if that move were played.")
     print("\nNode #   ½#   Depth  #edges   Edges")
 
-    sorted_node_ids = sorted(GameNode.set_of_node_IDs)
+    sorted_node_ids = sorted(nodedict)
     for node_id in sorted_node_ids:
         node = nodedict[node_id]
         value_list = [
@@ -197,4 +381,5 @@ def output_node_report(nodedict):
 
 
     # Wait for user input (of any kind) before dismissing the summary table and moving forward
-    wait_for_any_user_input()
+    if do_wait_for_user:
+        wait_for_any_user_input()
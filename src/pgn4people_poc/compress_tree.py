@@ -0,0 +1,249 @@
+"""
+Optional compressed layout of the game tree in which each maximal chain of single-edge (“unary”) nodes is stored as one
+record holding a packed move sequence.
+
+Long stretches of a deep repertoire (e.g., forced main-line sequences) consist of nodes that each have exactly one edge.
+In the ordinary layout produced by buildtree(), each such node costs a full GameNode, an Edge, and a list. In the
+compressed layout:
+    (a) every node with zero or two-or-more edges (i.e., every terminal or branching node) is kept as its original
+        GameNode, and
+    (b) every unary node belongs to a UnaryChain, which stores the movetexts of the whole chain in a single string and
+        the node_ids of its members in an array.
+
+Node IDs are unchanged by compression. CompressedNodeDict behaves as a read-only {node_id: node} dictionary: indexing it
+with the node_id of a unary node returns a transient ExpandedUnaryNode that has the same attributes as the GameNode it
+replaces. Thus the reports, and anything else that reads nodes, work on a CompressedNodeDict unchanged.
+
+Reconstructing a node costs more than a dictionary lookup, though, so traverse_tree doesn’t step through a chain one
+node at a time: it finds the chain (see CompressedNodeDict.chain_and_position_of()) and passes the whole chain in one
+step, reading its node_ids and packed movetexts directly. (A line can’t deviate within a chain, because each member has
+only its mainline edge.)
+
+See generally pgn4people-poc/docs/game-tree-concepts.md
+"""
+
+from array import array
+from collections.abc import Mapping
+
+from . classes_arboreal import Edge
+from . import constants
+from . pgn_utilities import normalized_movetext
+
+# Marks, in CompressedNodeDict.chain_index_of_node, a node that is kept as its original GameNode
+NOT_IN_A_CHAIN = -1
+
+
+class UnaryChain:
+    """
+    A maximal sequence of unary nodes u_0 → u_1 → … → u_(k-1), where each u_i has exactly one edge and u_(i+1) is the
+    destination of u_i’s edge. The edge of the last member leads to exit_node_id, which is not unary.
+
+    Within a chain, the depth is constant, the halfmove number increases by one at each step, and every member after
+    the first was reached via the mainline (index 0) edge of its predecessor.
+    """
+
+    __slots__ = {
+        "node_ids":
+            "array of the node_ids of the chain’s members, in order of play",
+        "packed_movetexts":
+            "Movetexts of the members’ edges, joined by single spaces",
+        "movetext_offsets":
+            "array of k+1 offsets into packed_movetexts; movetext i is packed_movetexts[offsets[i]:offsets[i+1]-1]",
+        "exit_node_id":
+            "node_id of the destination of the last member’s edge",
+        "depth":
+            "Depth shared by every member of the chain",
+        "first_halfmovenumber":
+            "halfmovenumber of the first member",
+        "first_originatingnode_id":
+            "originatingnode_id of the first member",
+        "first_choice_id_at_originatingnode":
+            "choice_id_at_originatingnode of the first member"
+    }
+
+
+    def __init__(self, first_node_id, first_node):
+        self.node_ids = array('q', [first_node_id])
+        self.depth = first_node.depth
+        self.first_halfmovenumber = first_node.halfmovenumber
+        self.first_originatingnode_id = first_node.originatingnode_id
+        self.first_choice_id_at_originatingnode = first_node.choice_id_at_originatingnode
+        # packed_movetexts, movetext_offsets, and exit_node_id are assigned by pack()
+        self.packed_movetexts = None
+        self.movetext_offsets = None
+        self.exit_node_id = constants.UNDEFINED_TREEISH_VALUE
+
+
+    def pack(self, list_of_movetexts, exit_node_id):
+        """
+        Stores the movetexts of the chain’s edges as one string plus an array of offsets.
+        """
+        self.packed_movetexts = " ".join(list_of_movetexts)
+        offsets = array('I', [0])
+        for movetext in list_of_movetexts:
+            offsets.append(offsets[-1] + len(movetext) + 1)
+        self.movetext_offsets = offsets
+        self.exit_node_id = exit_node_id
+
+
+    def movetext_at(self, position):
+        """
+        Returns the movetext of the edge of the member at the given position within the chain.
+        """
+        return self.packed_movetexts[self.movetext_offsets[position]:self.movetext_offsets[position + 1] - 1]
+
+
+    def movetexts_between(self, start_position, stop_position):
+        """
+        Returns the list of the movetexts of the edges of the members at positions start_position (inclusive) through
+        stop_position (exclusive), sliced from packed_movetexts at once.
+        """
+        if stop_position <= start_position:
+            return []
+        return self.packed_movetexts[self.movetext_offsets[start_position]:
+                                     self.movetext_offsets[stop_position] - 1].split(" ")
+
+
+    def destination_at(self, position):
+        """
+        Returns the node_id of the destination of the edge of the member at the given position within the chain.
+        """
+        if position + 1 < len(self.node_ids):
+            return self.node_ids[position + 1]
+        return self.exit_node_id
+
+
+class ExpandedUnaryNode:
+    """
+    Transient stand-in for the GameNode of a unary node, reconstructed on demand from its UnaryChain. Exposes the same
+    attributes (and edge_from_movetext() method) that traverse_tree and the reports use on a GameNode.
+    """
+
+    __slots__ = ("halfmovenumber",
+                 "depth",
+                 "originatingnode_id",
+                 "choice_id_at_originatingnode",
+                 "edgeslist",
+                 "number_of_edges")
+
+
+    def __init__(self, chain, position):
+        self.depth = chain.depth
+        self.halfmovenumber = chain.first_halfmovenumber + position
+        if position == 0:
+            self.originatingnode_id = chain.first_originatingnode_id
+            self.choice_id_at_originatingnode = chain.first_choice_id_at_originatingnode
+        else:
+            self.originatingnode_id = chain.node_ids[position - 1]
+            self.choice_id_at_originatingnode = constants.INDEX_MAINLINE
+
+        edge = Edge(chain.movetext_at(position), chain.destination_at(position))
+        edge.reference_index = constants.INDEX_MAINLINE
+        self.edgeslist = [edge]
+        self.number_of_edges = 1
+
+
+    def edge_from_movetext(self, movetext):
+        """
+        Returns the node’s only edge if its movetext matches `movetext` (see GameNode.edge_from_movetext()); else None.
+        """
+        edge = self.edgeslist[0]
+        if normalized_movetext(edge.movetext) == normalized_movetext(movetext):
+            return edge
+        return None
+
+
+class CompressedNodeDict(Mapping):
+    """
+    Read-only {node_id: node} mapping over the compressed layout. See the module docstring.
+    """
+
+
+    def __init__(self, explicit_nodes, chains, chain_index_of_node, position_in_chain):
+        # {node_id: GameNode} for every terminal or branching node
+        self.explicit_nodes = explicit_nodes
+        # List of UnaryChain instances
+        self.chains = chains
+        # Both arrays are indexed by node_id. chain_index_of_node is NOT_IN_A_CHAIN for explicit nodes.
+        self.chain_index_of_node = chain_index_of_node
+        self.position_in_chain = position_in_chain
+
+
+    def __getitem__(self, node_id):
+        if not 0 <= node_id < len(self.chain_index_of_node):
+            raise KeyError(node_id)
+        chain_index = self.chain_index_of_node[node_id]
+        if chain_index == NOT_IN_A_CHAIN:
+            return self.explicit_nodes[node_id]
+        return ExpandedUnaryNode(self.chains[chain_index], self.position_in_chain[node_id])
+
+
+    def chain_and_position_of(self, node_id):
+        """
+        Returns the 2-tuple (UnaryChain, position in it) of the unary node node_id, or None if the node is kept as its
+        original GameNode.
+        """
+        chain_index = self.chain_index_of_node[node_id]
+        if chain_index == NOT_IN_A_CHAIN:
+            return None
+        return self.chains[chain_index], self.position_in_chain[node_id]
+
+
+    def __iter__(self):
+        for node_id, chain_index in enumerate(self.chain_index_of_node):
+            if chain_index != NOT_IN_A_CHAIN or node_id in self.explicit_nodes:
+                yield node_id
+
+
+    def __len__(self):
+        return len(self.explicit_nodes) + sum(len(chain.node_ids) for chain in self.chains)
+
+
+def compress_gametree(nodedict):
+    """
+    Returns a CompressedNodeDict equivalent to nodedict (a {node_id: GameNode} dictionary built by buildtree()).
+
+    Makes a single pass over the nodes in increasing order of node_id. This suffices because buildtree() always assigns
+    a node a larger node_id than its originating node, so a unary node’s predecessor has already been assigned to its
+    chain by the time the node itself is reached.
+
+    nodedict itself is not modified; the caller should drop its reference to nodedict to realize the memory savings.
+    """
+    array_length = max(nodedict) + 1
+    chain_index_of_node = array('q', [NOT_IN_A_CHAIN]) * array_length
+    position_in_chain = array('l', [0]) * array_length
+
+    explicit_nodes = {}
+    chains = []
+    # Movetexts of each chain’s edges, accumulated in parallel with chains and packed at the end
+    movetexts_of_chains = []
+
+    for node_id in sorted(nodedict):
+        node = nodedict[node_id]
+        if node.number_of_edges != 1:
+            # Terminal or branching node: kept as is
+            explicit_nodes[node_id] = node
+            continue
+
+        # A unary node extends its predecessor’s chain if the predecessor is itself unary (in which case this node is
+        # necessarily the destination of the predecessor’s only edge). Otherwise it begins a new chain.
+        originating_node_id = node.originatingnode_id
+        is_predecessor_unary = ((node_id != constants.INITIAL_NODE_ID)
+                                and (chain_index_of_node[originating_node_id] != NOT_IN_A_CHAIN))
+        if is_predecessor_unary:
+            chain_index = chain_index_of_node[originating_node_id]
+            chain = chains[chain_index]
+            position_in_chain[node_id] = len(chain.node_ids)
+            chain.node_ids.append(node_id)
+        else:
+            chain_index = len(chains)
+            chains.append(UnaryChain(node_id, node))
+            movetexts_of_chains.append([])
+        chain_index_of_node[node_id] = chain_index
+        movetexts_of_chains[chain_index].append(node.edgeslist[0].movetext)
+
+    for chain, list_of_movetexts in zip(chains, movetexts_of_chains):
+        last_member = nodedict[chain.node_ids[-1]]
+        chain.pack(list_of_movetexts, last_member.edgeslist[0].destination_node_id)
+
+    return CompressedNodeDict(explicit_nodes, chains, chain_index_of_node, position_in_chain)
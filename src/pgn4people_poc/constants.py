@@ -39,6 +39,59 @@ CHOSEN_SAMPLE_PGN_FILE = PGNFILE1
 PUBLIC_BASENAME_SAMPLE_PGN = f"Built-in sample PGN: {CHOSEN_SAMPLE_PGN_FILE}"
 VERSION_SAMPLE_PGN = "1.0.0"
 
+# GAME-INDEX CONSTANTS
+# The sidecar game index of, e.g., “games.pgn” is saved as “games.pgn.p4pidx”
+GAME_INDEX_SUFFIX = ".p4pidx"
+# First line of a sidecar game index; the number identifies the version of the layout
+GAME_INDEX_MAGIC = b"PGN4PEOPLE-GAME-INDEX 5\n"
+# Size of the chunks in which the indexed text is read when it is hashed to detect whether a file has changed other than
+# by having text appended
+PREFIX_FINGERPRINT_CHUNK_SIZE = 1024 * 1024
+# Header fields whose values are recorded in the game index (the Seven Tag Roster, plus ECO)
+INDEXED_HEADER_FIELDS = ("Event", "Site", "Date", "Round", "White", "Black", "Result", "ECO")
+
+# The saved merged tree of, e.g., “games.pgn” is saved as “games.pgn.p4ptree”
+MERGED_TREE_SUFFIX = ".p4ptree"
+# Version of the layout of a saved merged tree; a tree saved with a different version is rebuilt
+MERGED_TREE_VERSION = 2
+
+# SQLITE CONSTANTS
+# Version of the layout of a tree written to a SQLite database; a database with a different version isn’t read
+SQLITE_TREE_LAYOUT_VERSION = 1
+# Number of rows inserted by each executemany() when a tree is written to a database
+SQLITE_INSERT_BATCH_SIZE = 50000
+# Number of consecutive node_ids read from the database at a time
+SQLITE_PAGE_SIZE_IN_NODES = 1024
+# Maximum number of pages of nodes held in memory at a time
+SQLITE_PAGE_CACHE_SIZE = 256
+
+# FROZEN-TREE CONSTANTS
+# First bytes of a block of shared memory that holds a frozen tree (see frozen_tree.py); the number identifies the
+# version of the layout
+FROZEN_TREE_MAGIC = b"P4PFRZ01"
+# Number of nodes reconstructed from a frozen tree that each thread keeps, to spare reconstructing them again
+FROZEN_TREE_NODE_CACHE_SIZE = 4096
+
+# TABLE-CACHE CONSTANTS
+# Default bounds of the cache of compiled variations tables (see table_cache.py): the number of tables, and their total
+# estimated size
+TABLE_CACHE_MAX_ENTRIES = 256
+TABLE_CACHE_MAX_MEBIBYTES = 64
+TABLE_CACHE_MAX_BYTES = TABLE_CACHE_MAX_MEBIBYTES * 1024 * 1024
+# Maximum number of tables of the alternatives on screen compiled in the background after each table is shown (see
+# prefetch_tables.py)
+PREFETCH_MAX_TABLES = 64
+
+# RESULT-COUNT CONSTANTS
+RESULT_HEADER_FIELD = "Result"
+RESULT_WHITE_WINS = "1-0"
+RESULT_DRAW = "1/2-1/2"
+RESULT_BLACK_WINS = "0-1"
+RESULT_UNKNOWN = "*"
+# Values of --sort-alternatives
+SORT_BY_GAMES = "games"
+SORT_BY_SCORE = "score"
+
 # ARBOREAL CONSTANTS
 
 UNDEFINED_TREEISH_VALUE = -1
@@ -64,6 +117,8 @@ BLACK_MOVE_DEFERRED = "... "
 BLACK_MOVE_PREFIX = "…"
 
 MOVETEXT_WIDTH_IN_CHARACTERS = 11
+# Width of a score shown after a movetext, e.g., “ 62%/134”, when games have been merged
+SCORE_WIDTH_IN_CHARACTERS = 10
 
 # String constants for testing validity of user input
 WHITE_PLAYER_COLOR_STRING = "W"
@@ -75,6 +130,50 @@ STOP_SIGN = "stop"
 RESET_COMMAND = "reset"
 REPORT_COMMAND = "report"
 NODEREPORT_COMMAND = "nodereport"
+MEMREPORT_COMMAND = "memreport"
+GOTO_COMMAND = "goto"
+REFRESH_COMMAND = "refresh"
+# Commands that don’t change the line being viewed
+NON_NAVIGATION_COMMANDS = (STOP_SIGN, REPORT_COMMAND, NODEREPORT_COMMAND, MEMREPORT_COMMAND, REFRESH_COMMAND)
+
+# Formats of the output of batch mode
+BATCH_OUTPUT_PLAIN = "plain"
+BATCH_OUTPUT_JSON = "json"
+
+# Formats of the export of every line of the tree
+EXPORT_FORMAT_TEXT = "text"
+EXPORT_FORMAT_JSONL = "jsonl"
+
+# Rendering of the variations table of each line to its own file
+RENDERED_TABLE_FILENAME_FORMAT = "line-{:07}.txt"
+# Number of consecutive lines handed to a worker process at a time
+RENDER_CHUNK_SIZE = 256
+# Number of chunks per worker process submitted but not yet finished
+RENDER_CHUNKS_IN_FLIGHT_PER_WORKER = 4
+
+# PROFILING CONSTANTS
+# Environment variable that, if set to anything other than “0”, switches on profiling (like --profile)
+PROFILE_ENVIRONMENT_VARIABLE = "PGN4PEOPLE_PROFILE"
+# Width of the column of stage names in the profile summary
+PROFILE_STAGE_NAME_WIDTH = 36
+
+# Writing the tree as PGN
+# Maximum length of a line of movetext, per the PGN standard’s export format
+PGN_EXPORT_LINE_LENGTH = 79
+# Header of a written PGN game: the Seven Tag Roster, with unknown values
+DEFAULT_PGN_HEADERS = {"Event": "?",
+                       "Site": "?",
+                       "Date": "????.??.??",
+                       "Round": "?",
+                       "White": "?",
+                       "Black": "?",
+                       "Result": RESULT_UNKNOWN}
+
+# Seconds between checks of the PGN file for changes in watch mode
+WATCH_POLL_INTERVAL_SECONDS = 1.0
+
+# Command-line subcommands
+DIFF_COMMAND = "diff"
 
 # CONSTANTS FOR GameTreeReport
 # Width for (a) depth or (b) halfmove-length
@@ -85,6 +184,14 @@ FREQ_WIDTH_IN_CHARACTERS = 11
 KEY_STAT_DESCRIPTION_WIDTH = 27
 KEY_STAT_VALUE_WIDTH = 5
 
+# Quantiles of the halfmove length of a line reported by GameTreeReport
+LINE_LENGTH_QUANTILES = (0.10, 0.25, 0.50, 0.75, 0.90, 0.99)
+
+# Width of the column of categories (and of modules) in the memory report
+MEMORY_REPORT_CATEGORY_WIDTH = 30
+# Number of modules, those with the most memory allocated first, listed in the memory report under --profile
+MEMORY_REPORT_NUMBER_OF_MODULES = 10
+
 # ARGPARSER CONSTANTS
 # Help text if `pgn4people --help`
 # Note that argparser appears to ignore newline characters
@@ -95,11 +202,7 @@ HELP_DESCRIPTION = ("A proof-of-concept demonstration of a better way to view de
                     "or (b) “cd” (change directory) to the directory with your PGN file; then just type the "
                     "file *name* (e.g., “mygame.pgn”); no path necessary.)")
 
-HELP_EPILOG = "For more on PGN4people, see github.com/jimratliff/pgn4people-poc "
-
-
-# WARNING: FIRST_NODE_TO_BE_PRINTED is NOT a constant, despite being defined in the constants.py file. This value
-# needs to be referred to from two modules (construct_output.py and traverse_tree.py) and I didn't want to pass it as
-# an argument.
-FIRST_NODE_TO_BE_PRINTED = True
+HELP_DESCRIPTION_DIFF = ("Compares the game trees of two versions of a PGN file and lists the lines added and removed, "
+                         "and the positions at which the order of the alternatives changed.")
 
+HELP_EPILOG = "For more on PGN4people, see github.com/jimratliff/pgn4people-poc "
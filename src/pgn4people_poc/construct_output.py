@@ -25,23 +25,50 @@ def print_header_for_variations_table(target_node_id, deviation_history, pgn_sou
         pgn_source_string = f"{constants.PUBLIC_BASENAME_SAMPLE_PGN}, v{constants.VERSION_SAMPLE_PGN}"
     else:
         pgn_source_string = pgn_source.filename_of_pgnfile
+        if pgn_source.selection_description is not None:
+            pgn_source_string += f", {pgn_source.selection_description}"
     
     print(f"PGN analyzed: {pgn_source_string}")
     print(f"Target node: {target_node_id}")
     print(f"Deviation history required to achieve the specified target node: {deviation_history}")
 
 
-def print_single_node_to_console(variations_line):
+def print_variations_table_to_console(variations_table, result_counts = None):
     """
-    Print a single line of the variations table, where the line corresponds to a single node.
+    Print the variations table (a list of Variations_Table_Line, as returned by compile_variations_table()): the column
+    headings, then one line per node.
+
+    If result_counts (an instance of ResultCounts) is not None, each move is followed by the score, for the player who
+    made it, of the games that played it, and the number of those games.
     """
+    if not variations_table:
+        return
+
+    print("\n")
+    for column_heading in format_column_headings(result_counts):
+        print(column_heading)
+
+    for variations_line in variations_table:
+        print(format_single_node(variations_line, result_counts))
+
 
-    # If first node, print column headings
-    if constants.FIRST_NODE_TO_BE_PRINTED:
-        print("\n")
-        print(7*" ", "MAIN LINE", 8*" ", "ALTERNATIVES")
-        print(4*" ", "WHITE", 4*" ", "BLACK")
-    constants.FIRST_NODE_TO_BE_PRINTED = False
+def format_column_headings(result_counts = None):
+    """
+    Returns the list of the lines of the column headings of the variations table. (See
+    print_variations_table_to_console() for result_counts.)
+    """
+    if result_counts is None:
+        return [" ".join([7*" ", "MAIN LINE", 8*" ", "ALTERNATIVES"]),
+                " ".join([4*" ", "WHITE", 4*" ", "BLACK"])]
+    return [" ".join([7*" ", "MAIN LINE", (8 + 2*constants.SCORE_WIDTH_IN_CHARACTERS)*" ", "ALTERNATIVES"]),
+            " ".join([4*" ", "WHITE", (4 + constants.SCORE_WIDTH_IN_CHARACTERS)*" ", "BLACK"])]
+
+
+def format_single_node(variations_line, result_counts = None):
+    """
+    Returns, as a string, a single line of the variations table, where the line corresponds to a single node. (See
+    print_variations_table_to_console() for result_counts.)
+    """
 
 
     output_string_for_node = ""
@@ -50,8 +77,12 @@ def print_single_node_to_console(variations_line):
     fullmovenumber = variations_line.fullmovenumber
     fullmovenumber_string = '{:3}. '.format(fullmovenumber)
 
-    formatted_mainline_movetext_white = format_mainline_edge(variations_line.mainline_edge_white, is_white=True)
-    formatted_mainline_movetext_black = format_mainline_edge(variations_line.mainline_edge_black, is_white=False)
+    formatted_mainline_movetext_white = format_mainline_edge(variations_line.mainline_edge_white,
+                                                             is_white=True,
+                                                             result_counts=result_counts)
+    formatted_mainline_movetext_black = format_mainline_edge(variations_line.mainline_edge_black,
+                                                             is_white=False,
+                                                             result_counts=result_counts)
 
     output_string_for_node += fullmovenumber_string
     output_string_for_node += formatted_mainline_movetext_white
@@ -63,22 +94,55 @@ def print_single_node_to_console(variations_line):
 
     list_of_alternative_edges_to_display = variations_line.list_of_alternative_edges_to_display
 
+    # As in format_mainline_edge(), a move followed by its score gets a correspondingly wider field
+    width = constants.MOVETEXT_WIDTH_IN_CHARACTERS
+    if result_counts is not None:
+        width += constants.SCORE_WIDTH_IN_CHARACTERS
+
     if list_of_alternative_edges_to_display:
         for index, edge in enumerate(list_of_alternative_edges_to_display):
             index_of_alternative = index + 1
             prefixed_movetext = prefix_black_alternative_with_ellipsis(edge.movetext, is_black_move)
+            if result_counts is not None:
+                prefixed_movetext += " " + result_counts.score_string(edge.destination_node_id, not is_black_move)
             original_index = edge.reference_index
-            formatted_movetext = format_movetext_based_on_original_index(prefixed_movetext, original_index)
+            formatted_movetext = format_movetext_based_on_original_index(prefixed_movetext, original_index, width)
             if constants.DO_PREFIX_MOVETEXT_WITH_ALPHA:
                 alphacharacter = (format_label_of_alternative_halfmoves(lowercase_alpha_from_num(index_of_alternative)))
                 labeled_movetext = f"{alphacharacter}: " + formatted_movetext
                 output_string_for_node += labeled_movetext
             else:
                 output_string_for_node += formatted_movetext
-    print(output_string_for_node)
+    return output_string_for_node
 
 
-def format_mainline_edge(edge, is_white):
+def variations_line_as_dictionary(variations_line, result_counts = None):
+    """
+    Returns a dictionary, suitable for JSON, describing one line of the variations table.
+    """
+    def edge_as_dictionary(edge, is_white):
+        if edge is None:
+            return None
+        edge_dictionary = {"movetext": edge.movetext,
+                           "original_index": edge.reference_index,
+                           "destination_node_id": edge.destination_node_id}
+        if result_counts is not None:
+            edge_dictionary["games"] = result_counts.number_of_games(edge.destination_node_id)
+            edge_dictionary["score"] = result_counts.score(edge.destination_node_id, is_white)
+        return edge_dictionary
+
+    is_player_white = variations_line.is_player_white
+    return {"fullmovenumber": variations_line.fullmovenumber,
+            "player": (None if is_player_white is None
+                       else constants.WHITE_PLAYER_COLOR_STRING if is_player_white
+                       else constants.BLACK_PLAYER_COLOR_STRING),
+            "white": edge_as_dictionary(variations_line.mainline_edge_white, True),
+            "black": edge_as_dictionary(variations_line.mainline_edge_black, False),
+            "alternatives": [edge_as_dictionary(edge, is_player_white)
+                             for edge in variations_line.list_of_alternative_edges_to_display or []]}
+
+
+def format_mainline_edge(edge, is_white, result_counts = None):
     """
     Formats movetext for an edge. If the edge exists, format (color) depends on the original
     reference index of the edge at its edge (edge.reference_index), as given by
@@ -87,6 +151,9 @@ def format_mainline_edge(edge, is_white):
     If the edge is empty, its movetext is replaced by some form of ellipsis, which can depend on the color
     of the player, as specified by argument is_white.
 
+    If result_counts is not None, the movetext is followed by the score of the edge (see
+    print_variations_table_to_console()), within a correspondingly wider field.
+
     Returns formatted movetext as string.
     """
 
@@ -94,15 +161,23 @@ def format_mainline_edge(edge, is_white):
     if edge:
         movetext_string = edge.movetext
         reference_index = edge.reference_index
+        if result_counts is not None:
+            movetext_string += " " + result_counts.score_string(edge.destination_node_id, is_white)
     else:
         movetext_string = constants.WHITE_MOVE_ELLIPSIS if is_white else constants.BLACK_MOVE_DEFERRED
         # The “-1” says: “I’m not a real move. Don’t try to format me as if I were.’
         reference_index = -1
-    formatted_movetext = format_movetext_based_on_original_index(movetext_string, reference_index)
+
+    width = constants.MOVETEXT_WIDTH_IN_CHARACTERS
+    if result_counts is not None:
+        width += constants.SCORE_WIDTH_IN_CHARACTERS
+    formatted_movetext = format_movetext_based_on_original_index(movetext_string, reference_index, width)
     return formatted_movetext
         
 
-def format_movetext_based_on_original_index(movetext_to_print,  id_of_original_edge):
+def format_movetext_based_on_original_index(movetext_to_print,
+                                            id_of_original_edge,
+                                            width = constants.MOVETEXT_WIDTH_IN_CHARACTERS):
     """
     Formats movetext_to_print both (a) as to a given fixed width and (b) color.
     """
@@ -110,7 +185,7 @@ def format_movetext_based_on_original_index(movetext_to_print,  id_of_original_e
 
     # Applies fixed-width formatting to all movetext_to_print regardless whether it’s a “real” move or instead
     # an ellipsis placeholder.
-    string_of_formatting_instruction = f"{{:{constants.MOVETEXT_WIDTH_IN_CHARACTERS}}}"
+    string_of_formatting_instruction = f"{{:{width}}}"
     formatted_string = string_of_formatting_instruction.format(movetext_to_print)
 
     # Applies color formatting to all “real” moves
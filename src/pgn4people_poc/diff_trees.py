@@ -0,0 +1,156 @@
+"""
+Structural diff between the game trees of two versions of a PGN file (e.g., yesterday’s and today’s version of a
+repertoire), invoked as:
+
+    pgn4people diff old.pgn new.pgn
+
+The two trees are matched by movetext paths from the initial position. Subtree hashes (see share_subtrees.py) let the
+comparison skip every pair of matched subtrees that are identical, so the walk visits only the parts of the trees that
+changed.
+
+See generally pgn4people-poc/docs/game-tree-concepts.md
+"""
+
+from yachalk import chalk
+
+from . build_tree import build_gametree_from_pgn_file
+from . import constants
+from . pgn_utilities import (format_movetext_path,
+                             normalized_movetext)
+from . share_subtrees import compute_subtree_hashes
+
+# Kinds of TreeDifference
+ADDED = "added"
+REMOVED = "removed"
+REORDERED = "reordered"
+
+
+class TreeDifference:
+    """
+    One difference between an old and a new game tree.
+
+    Object attributes:
+        kind: ADDED, REMOVED, or REORDERED
+        movetext_path: Tuple of the movetexts from the initial position to the node at which the difference occurs.
+            For ADDED and REMOVED, the last movetext is the added/removed move itself.
+        number_of_lines: For ADDED and REMOVED, the number of lines (terminal nodes) in the added/removed subtree.
+        old_order, new_order: For REORDERED, the movetexts available at the node in the old and the new tree,
+            respectively, in order (the first being the main line).
+    """
+
+    __slots__ = ("kind", "movetext_path", "number_of_lines", "old_order", "new_order")
+
+
+    def __init__(self, kind, movetext_path, number_of_lines = None, old_order = None, new_order = None):
+        self.kind = kind
+        self.movetext_path = movetext_path
+        self.number_of_lines = number_of_lines
+        self.old_order = old_order
+        self.new_order = new_order
+
+
+def diff_gametrees(old_nodedict, new_nodedict, old_subtree_hashes = None, new_subtree_hashes = None):
+    """
+    Generator that yields a TreeDifference for each difference between old_nodedict and new_nodedict, in depth-first
+    order of the movetext paths at which they occur.
+
+    At each pair of matched nodes (i.e., nodes reached by the same movetext path in both trees):
+        (a) each move present only in the old tree is REMOVED,
+        (b) each move present only in the new tree is ADDED,
+        (c) if the moves present in both trees appear in a different order (e.g., a new main line), the node is
+            REORDERED, and
+        (d) each move present in both trees is followed, unless its destination subtrees have equal hashes.
+
+    Moves are matched by normalized movetext (see pgn_utilities.normalized_movetext()).
+
+    The subtree hashes (see compute_subtree_hashes()) are computed if not supplied.
+    """
+    if old_subtree_hashes is None:
+        old_subtree_hashes = compute_subtree_hashes(old_nodedict)
+    if new_subtree_hashes is None:
+        new_subtree_hashes = compute_subtree_hashes(new_nodedict)
+
+    # Explicit stack of (old_node_id, new_node_id, movetext_path) for matched nodes still to be compared
+    stack = [(constants.INITIAL_NODE_ID, constants.INITIAL_NODE_ID, ())]
+    while stack:
+        old_node_id, new_node_id, movetext_path = stack.pop()
+        if old_subtree_hashes[old_node_id] == new_subtree_hashes[new_node_id]:
+            continue
+
+        old_node = old_nodedict[old_node_id]
+        new_node = new_nodedict[new_node_id]
+
+        common_old_order = []
+        for edge in old_node.edgeslist:
+            if new_node.edge_from_movetext(edge.movetext) is None:
+                yield TreeDifference(REMOVED,
+                                     movetext_path + (edge.movetext,),
+                                     number_of_lines = count_lines_in_subtree(old_nodedict, edge.destination_node_id))
+            else:
+                common_old_order.append(normalized_movetext(edge.movetext))
+
+        common_new_order = []
+        for edge in new_node.edgeslist:
+            if old_node.edge_from_movetext(edge.movetext) is None:
+                yield TreeDifference(ADDED,
+                                     movetext_path + (edge.movetext,),
+                                     number_of_lines = count_lines_in_subtree(new_nodedict, edge.destination_node_id))
+            else:
+                common_new_order.append(normalized_movetext(edge.movetext))
+
+        if common_old_order != common_new_order:
+            yield TreeDifference(REORDERED,
+                                 movetext_path,
+                                 old_order = [edge.movetext for edge in old_node.edgeslist],
+                                 new_order = [edge.movetext for edge in new_node.edgeslist])
+
+        # Pushed in reverse so that the main line is compared first
+        for edge in reversed(new_node.edgeslist):
+            old_edge = old_node.edge_from_movetext(edge.movetext)
+            if old_edge is not None:
+                stack.append((old_edge.destination_node_id, edge.destination_node_id, movetext_path + (edge.movetext,)))
+
+
+def count_lines_in_subtree(nodedict, root_node_id):
+    """
+    Returns the number of lines (terminal nodes) in the subtree of nodedict rooted at root_node_id.
+    """
+    number_of_lines = 0
+    stack_of_node_ids = [root_node_id]
+    while stack_of_node_ids:
+        node = nodedict[stack_of_node_ids.pop()]
+        if node.number_of_edges == 0:
+            number_of_lines += 1
+        else:
+            stack_of_node_ids.extend(edge.destination_node_id for edge in node.edgeslist)
+    return number_of_lines
+
+
+def output_diff_of_pgn_files(old_pgn_filepath, new_pgn_filepath):
+    """
+    Builds the game trees of the two PGN files, and prints to the console each difference between them, followed by a
+    count of each kind of difference.
+    """
+    old_nodedict = build_gametree_from_pgn_file(old_pgn_filepath)
+    new_nodedict = build_gametree_from_pgn_file(new_pgn_filepath)
+
+    print(chalk.magenta(f"\nDIFFERENCES FROM {old_pgn_filepath.name} TO {new_pgn_filepath.name}\n"))
+
+    number_of_differences_of_kind = {ADDED: 0, REMOVED: 0, REORDERED: 0}
+    for difference in diff_gametrees(old_nodedict, new_nodedict):
+        number_of_differences_of_kind[difference.kind] += 1
+        if difference.kind == REORDERED:
+            where_string = format_movetext_path(difference.movetext_path) or "Initial position"
+            print(chalk.yellow(f"~ {where_string}: "
+                               f"{' '.join(difference.old_order)} → {' '.join(difference.new_order)}"))
+        else:
+            good_grammar_string = "line" if difference.number_of_lines == 1 else "lines"
+            line_string = f"{format_movetext_path(difference.movetext_path)} ({difference.number_of_lines} " \
+                          f"{good_grammar_string})"
+            if difference.kind == ADDED:
+                print(chalk.green("+ " + line_string))
+            else:
+                print(chalk.red_bright("- " + line_string))
+
+    print(f"\n{number_of_differences_of_kind[ADDED]} added, {number_of_differences_of_kind[REMOVED]} removed, "
+          f"{number_of_differences_of_kind[REORDERED]} reordered.")
@@ -0,0 +1,137 @@
+"""
+Enumerates every line of the game tree, i.e., every path from the initial node to a terminal node, and exports the
+lines in bulk, as text or as JSON Lines.
+
+The lines are generated one at a time by an iterative depth-first walk that needs no stack: from a terminal node, it
+climbs via .originatingnode_id until it reaches a node with an edge not yet explored (the next one after
+.choice_id_at_originatingnode), and then descends via main-line edges to the next terminal node. Apart from the moves of
+the current line, which are pushed and popped as the walk descends and climbs, the walk holds only the current node_id,
+so even a tree with millions of lines is exported without building a list of them.
+
+Lines are generated in the order in which the variations table presents them: the main line first, and, at each node,
+the alternatives in their original order.
+
+Because the walk climbs via .originatingnode_id, it requires a tree in which each node has exactly one originating node,
+i.e., not one whose identical subtrees have been shared (see share_subtrees.py).
+"""
+
+import json
+import sys
+
+from yachalk import chalk
+
+from . import constants
+from . construct_output import (format_column_headings,
+                                format_single_node,
+                                variations_line_as_dictionary)
+from . error_processing import fatal_error_exit_without_traceback
+from . pgn_utilities import format_movetext_path
+from . traverse_tree import (compile_variations_table,
+                             deviation_history_of_node)
+
+
+def generate_lines(nodedict, starting_node_id = constants.INITIAL_NODE_ID):
+    """
+    Generator that yields, for each terminal node reached from starting_node_id (by default, the initial node), in
+    depth-first order, the 2-tuple:
+        (terminal_node_id, movetext_path)
+    where movetext_path is the tuple of the movetexts of the line from starting_node_id to the terminal node.
+
+    See the module docstring.
+    """
+    movetext_path = []
+    node_id = starting_node_id
+
+    while True:
+        # Descends via main-line edges to a terminal node
+        node = nodedict[node_id]
+        while node.number_of_edges > 0:
+            edge = node.edgeslist[constants.INDEX_MAINLINE]
+            movetext_path.append(edge.movetext)
+            node_id = edge.destination_node_id
+            node = nodedict[node_id]
+
+        yield node_id, tuple(movetext_path)
+
+        # Climbs until some node on the path has an edge after the one just explored, and takes that edge
+        while True:
+            if node_id == starting_node_id:
+                return
+            choice_id = node.choice_id_at_originatingnode
+            node_id = node.originatingnode_id
+            node = nodedict[node_id]
+            movetext_path.pop()
+            if choice_id + 1 < node.number_of_edges:
+                edge = node.edgeslist[choice_id + 1]
+                movetext_path.append(edge.movetext)
+                node_id = edge.destination_node_id
+                break
+
+
+def variations_table_of_line(nodedict, terminal_node_id, result_counts = None):
+    """
+    Returns the 2-tuple (deviation_history, variations_table) of the line ending at terminal_node_id, where
+    variations_table is as returned by compile_variations_table(), i.e., the table the user would see after navigating
+    to that line.
+    """
+    deviation_history = deviation_history_of_node(nodedict, terminal_node_id)
+    return deviation_history, compile_variations_table(nodedict, deviation_history, result_counts=result_counts)
+
+
+def export_lines(nodedict, output_stream, export_format, do_include_tables = False, result_counts = None):
+    """
+    Writes every line of nodedict (see generate_lines()) to output_stream, in export_format:
+        constants.EXPORT_FORMAT_TEXT: one line of text per line of the tree, e.g., “1.e4 c5 2.Nf3 d6”, followed, if
+            do_include_tables, by that line’s variations table and a blank line
+        constants.EXPORT_FORMAT_JSONL: one JSON object per line of the tree, with the keys line_number,
+            terminal_node_id, moves, and, if do_include_tables, deviation_history and table
+
+    Returns the number of lines written.
+    """
+    number_of_lines = 0
+    for line_number, (terminal_node_id, movetext_path) in enumerate(generate_lines(nodedict), start=1):
+        number_of_lines = line_number
+        if do_include_tables:
+            deviation_history, variations_table = variations_table_of_line(nodedict, terminal_node_id, result_counts)
+
+        if export_format == constants.EXPORT_FORMAT_JSONL:
+            exported_line = {"line_number": line_number,
+                             "terminal_node_id": terminal_node_id,
+                             "moves": movetext_path}
+            if do_include_tables:
+                # JSON keys are strings
+                exported_line["deviation_history"] = {str(node_id): choice_id
+                                                      for node_id, choice_id in deviation_history.items()}
+                exported_line["table"] = [variations_line_as_dictionary(variations_line, result_counts)
+                                          for variations_line in variations_table]
+            output_stream.write(json.dumps(exported_line, ensure_ascii=False) + "\n")
+            continue
+
+        output_stream.write(format_movetext_path(movetext_path) + "\n")
+        if do_include_tables:
+            lines_of_table = format_column_headings(result_counts)
+            lines_of_table.extend(format_single_node(variations_line, result_counts)
+                                  for variations_line in variations_table)
+            output_stream.write("\n".join(lines_of_table) + "\n\n")
+
+    return number_of_lines
+
+
+def export_lines_CLI_package(export_filepath, nodedict, export_format, do_include_tables, result_counts = None):
+    """
+    Exports every line of nodedict (see export_lines()) to the file at export_filepath, or to standard output if
+    export_filepath is “-”.
+    """
+    if do_include_tables:
+        # The exported tables are plain text
+        chalk.disable_all_ansi()
+    if export_filepath == "-":
+        export_lines(nodedict, sys.stdout, export_format, do_include_tables, result_counts)
+        return
+    try:
+        export_file = open(export_filepath, "w", encoding="utf-8")
+    except OSError as err:
+        fatal_error_exit_without_traceback(f"Could not write the lines to “{export_filepath}”.\n{err}")
+    with export_file:
+        number_of_lines = export_lines(nodedict, export_file, export_format, do_include_tables, result_counts)
+    print(f"Exported {number_of_lines} lines to {export_filepath}.")
@@ -0,0 +1,246 @@
+"""
+Frozen (read-only) game tree in a flat block of shared memory, which other processes attach to without copying it.
+
+Each process that holds its own nodedict (e.g., each worker of render_tables.py) holds a full copy of the tree: hundreds
+of bytes per node, in objects that, even in a forked process, are soon copied page by page as their reference counts
+change. freeze_gametree() instead lays the tree out once, in a multiprocessing.shared_memory block, as flat arrays in
+compressed sparse row (CSR) form:
+    header: constants.FROZEN_TREE_MAGIC, then the number of node slots N (the largest node_id plus one), the number of
+        nodes, the number of edges E, and the number of bytes of movetext, as little-endian 64-bit integers
+    halfmovenumber: N 32-bit integers (0 for a node_id that isn’t in the tree)
+    depth: N 32-bit integers
+    choice_id_at_originatingnode: N 32-bit integers (constants.UNDEFINED_TREEISH_VALUE for the initial node)
+    originatingnode_id: N 64-bit integers
+    first_edge: N+1 64-bit integers; the edges of node n are edges first_edge[n] through first_edge[n+1] - 1
+    destination_node_id: E 64-bit integers
+    movetext_offset: E+1 64-bit integers; the movetext of edge e is bytes movetext_offset[e] through
+        movetext_offset[e+1] - 1 of movetexts
+    movetexts: the UTF-8 movetexts of all edges, concatenated
+
+FrozenNodeDict is a read-only {node_id: node} mapping over such a block, so that traverse_tree (e.g.,
+deviation_history_of_node() and compile_variations_table()) runs on it unchanged. Each array is a memoryview of the
+block, so a lookup copies nothing but the one node it reconstructs (as a StoredNode). Because consecutive lookups (e.g.,
+of the lines of render_tables.py, in depth-first order) mostly revisit the same nodes, the last
+constants.FROZEN_TREE_NODE_CACHE_SIZE nodes reconstructed by each thread are kept, least recently used first. Pickling a
+FrozenNodeDict (e.g., to hand it to a worker process) pickles only the name of the block; unpickling attaches to the
+block.
+
+Nothing in the block is ever written after the tree is frozen, and each thread keeps its own cache of reconstructed
+nodes, so any number of threads may read the same FrozenNodeDict at once, without locks, each keeping the state of its
+own view (e.g., in a RenderContext; see render_context.py).
+
+The process that froze the tree owns the block and must release it with unlink() when its workers are done.
+"""
+
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+import struct
+import threading
+
+from . classes_arboreal import (Edge,
+                                StoredNode)
+from . import constants
+
+# The header that precedes the arrays: the magic bytes, then the four counts
+FROZEN_TREE_HEADER = struct.Struct("<8sqqqq")
+
+# Item formats (for memoryview.cast()) of the arrays, in the order in which they are laid out
+INT32 = "i"
+INT64 = "q"
+
+
+def layout_of_frozen_tree(number_of_node_slots, number_of_edges, number_of_movetext_bytes):
+    """
+    Returns the 2-tuple (list of (name, offset, item format, number of items) of each array of the block, total size in
+    bytes of the block) for the given counts. Each array begins at a multiple of 8 bytes.
+    """
+    arrays = (("halfmovenumber", INT32, number_of_node_slots),
+              ("depth", INT32, number_of_node_slots),
+              ("choice_id_at_originatingnode", INT32, number_of_node_slots),
+              ("originatingnode_id", INT64, number_of_node_slots),
+              ("first_edge", INT64, number_of_node_slots + 1),
+              ("destination_node_id", INT64, number_of_edges),
+              ("movetext_offset", INT64, number_of_edges + 1),
+              ("movetexts", "B", number_of_movetext_bytes))
+    layout = []
+    offset = FROZEN_TREE_HEADER.size
+    for name, item_format, number_of_items in arrays:
+        offset = (offset + 7) // 8 * 8
+        layout.append((name, offset, item_format, number_of_items))
+        offset += number_of_items * struct.calcsize(item_format)
+    return layout, max(offset, 1)
+
+
+class FrozenNodeDict(Mapping):
+    """
+    Read-only {node_id: node} mapping over a frozen tree in shared memory. See the module docstring.
+
+    Object attributes:
+        shared_memory: The multiprocessing.shared_memory.SharedMemory block of the tree
+        is_owner: Whether this process created the block (and so must unlink it)
+        number_of_nodes: Number of nodes of the tree
+        views: List of every memoryview of the block held by this object
+        halfmovenumber, depth, choice_id_at_originatingnode, originatingnode_id, first_edge, destination_node_id,
+            movetext_offset, movetexts: memoryviews of the arrays of the block
+        thread_state: threading.local() whose attribute cached_nodes is the {node_id: StoredNode} of the nodes most
+            recently reconstructed by that thread, least recently used first
+    """
+
+
+    def __init__(self, shared_memory_block, is_owner = False):
+        self.shared_memory = shared_memory_block
+        self.is_owner = is_owner
+        buffer = shared_memory_block.buf
+        magic, number_of_node_slots, self.number_of_nodes, number_of_edges, number_of_movetext_bytes = \
+            FROZEN_TREE_HEADER.unpack_from(buffer)
+        if magic != constants.FROZEN_TREE_MAGIC:
+            raise ValueError(f"Shared memory “{shared_memory_block.name}” doesn’t hold a frozen tree.")
+        layout, _ = layout_of_frozen_tree(number_of_node_slots, number_of_edges, number_of_movetext_bytes)
+        # Every memoryview of the block, which must all be released before the block can be closed
+        self.views = []
+        for name, offset, item_format, number_of_items in layout:
+            view = buffer[offset:offset + number_of_items * struct.calcsize(item_format)]
+            self.views.append(view)
+            if item_format != "B":
+                view = view.cast(item_format)
+                self.views.append(view)
+            setattr(self, name, view)
+        self.thread_state = threading.local()
+
+
+    def __reduce__(self):
+        return (attach_frozen_gametree, (self.shared_memory.name,))
+
+
+    def __getitem__(self, node_id):
+        cached_nodes = self.cached_nodes_of_this_thread()
+        node = cached_nodes.get(node_id)
+        if node is not None:
+            cached_nodes.move_to_end(node_id)
+            return node
+        node = self.reconstruct_node(node_id)
+        cached_nodes[node_id] = node
+        if len(cached_nodes) > constants.FROZEN_TREE_NODE_CACHE_SIZE:
+            cached_nodes.popitem(last=False)
+        return node
+
+
+    def cached_nodes_of_this_thread(self):
+        try:
+            return self.thread_state.cached_nodes
+        except AttributeError:
+            self.thread_state.cached_nodes = OrderedDict()
+            return self.thread_state.cached_nodes
+
+
+    def reconstruct_node(self, node_id):
+        """
+        Returns a new StoredNode, with its edges, of node node_id, read from the arrays of the block.
+        """
+        if not 0 <= node_id < len(self.halfmovenumber) or self.halfmovenumber[node_id] == 0:
+            raise KeyError(node_id)
+        choice_id_at_originatingnode = self.choice_id_at_originatingnode[node_id]
+        first_edge = self.first_edge[node_id]
+        end_of_edges = self.first_edge[node_id + 1]
+        node = StoredNode((node_id,
+                           self.halfmovenumber[node_id],
+                           self.depth[node_id],
+                           self.originatingnode_id[node_id],
+                           (None if choice_id_at_originatingnode == constants.UNDEFINED_TREEISH_VALUE
+                            else choice_id_at_originatingnode),
+                           end_of_edges - first_edge))
+        movetext_offset = self.movetext_offset
+        for edge_index in range(first_edge, end_of_edges):
+            edge = Edge(str(self.movetexts[movetext_offset[edge_index]:movetext_offset[edge_index + 1]], "utf-8"),
+                        self.destination_node_id[edge_index])
+            edge.reference_index = edge_index - first_edge
+            node.edgeslist.append(edge)
+        return node
+
+
+    def __iter__(self):
+        for node_id, halfmovenumber in enumerate(self.halfmovenumber):
+            if halfmovenumber != 0:
+                yield node_id
+
+
+    def __len__(self):
+        return self.number_of_nodes
+
+
+    def close(self):
+        """
+        Detaches this process from the block, after releasing every memoryview of it.
+        """
+        # The views derived from others (by cast()) are released first
+        for view in reversed(self.views):
+            view.release()
+        self.shared_memory.close()
+
+
+    def unlink(self):
+        """
+        Detaches from, and (if this process created it) frees, the block.
+        """
+        self.close()
+        if self.is_owner:
+            self.shared_memory.unlink()
+
+
+def freeze_gametree(nodedict):
+    """
+    Returns a FrozenNodeDict, owned by this process, of the tree nodedict, laid out in a new block of shared memory.
+    See the module docstring.
+    """
+    number_of_node_slots = max(nodedict) + 1
+    halfmovenumber = array(INT32, bytes(4 * number_of_node_slots))
+    depth = array(INT32, bytes(4 * number_of_node_slots))
+    choice_id_at_originatingnode = array(INT32, [constants.UNDEFINED_TREEISH_VALUE]) * number_of_node_slots
+    originatingnode_id = array(INT64, [constants.UNDEFINED_TREEISH_VALUE]) * number_of_node_slots
+    first_edge = array(INT64, [0])
+    destination_node_id = array(INT64)
+    movetext_offset = array(INT64, [0])
+    movetexts = bytearray()
+
+    # The arrays are built in one pass, in order of node_id; a node_id that isn’t in the tree keeps halfmovenumber 0
+    number_of_nodes = 0
+    for node_id in range(number_of_node_slots):
+        node = nodedict.get(node_id)
+        if node is not None:
+            number_of_nodes += 1
+            halfmovenumber[node_id] = node.halfmovenumber
+            depth[node_id] = node.depth
+            if node.choice_id_at_originatingnode is not None:
+                choice_id_at_originatingnode[node_id] = node.choice_id_at_originatingnode
+            originatingnode_id[node_id] = node.originatingnode_id
+            for edge in node.edgeslist:
+                destination_node_id.append(edge.destination_node_id)
+                movetexts += edge.movetext.encode()
+                movetext_offset.append(len(movetexts))
+        first_edge.append(len(destination_node_id))
+
+    layout, size_in_bytes = layout_of_frozen_tree(number_of_node_slots, len(destination_node_id), len(movetexts))
+    shared_memory_block = shared_memory.SharedMemory(create=True, size=size_in_bytes)
+    FROZEN_TREE_HEADER.pack_into(shared_memory_block.buf, 0, constants.FROZEN_TREE_MAGIC,
+                                 number_of_node_slots, number_of_nodes, len(destination_node_id), len(movetexts))
+    contents = {"halfmovenumber": halfmovenumber,
+                "depth": depth,
+                "choice_id_at_originatingnode": choice_id_at_originatingnode,
+                "originatingnode_id": originatingnode_id,
+                "first_edge": first_edge,
+                "destination_node_id": destination_node_id,
+                "movetext_offset": movetext_offset,
+                "movetexts": movetexts}
+    for name, offset, item_format, number_of_items in layout:
+        with memoryview(contents[name]) as contents_view, contents_view.cast("B") as contents_in_bytes:
+            shared_memory_block.buf[offset:offset + len(contents_in_bytes)] = contents_in_bytes
+    return FrozenNodeDict(shared_memory_block, is_owner=True)
+
+
+def attach_frozen_gametree(name_of_shared_memory):
+    """
+    Returns a FrozenNodeDict of the frozen tree in the existing block of shared memory name_of_shared_memory.
+    """
+    return FrozenNodeDict(shared_memory.SharedMemory(name=name_of_shared_memory))
@@ -0,0 +1,559 @@
+"""
+Persistent sidecar index of the games in a (possibly very large, possibly compressed) PGN database, for random access
+to any game without scanning the file from the start.
+
+The index is built in one streaming pass over the file and records, for every game:
+    (a) the byte offset at which the game (i.e., its first header line) begins,
+    (b) the byte offset at which its movetext begins,
+    (c) the byte offset at which it ends (i.e., at which the next game begins, or the end of the file), and
+    (d) the values of the key header fields (constants.INDEXED_HEADER_FIELDS), kept in dictionary-encoded columns
+        (see header_columns.py).
+Offsets are into the decompressed text if the file is compressed.
+
+The index is saved next to the PGN file, as <name of PGN file> + constants.GAME_INDEX_SUFFIX, together with the size and
+modification time of the PGN file. A saved index is reused as is only if those still match. If instead the file has
+only grown (as a game collection to which new games are appended does), the saved index is extended by scanning only
+the appended text. The file is deemed to have only grown if the fingerprint (see fingerprint_of_prefix()) of the
+previously indexed text is unchanged. Computing it reads that whole text (without parsing it), and so is done only when
+the file’s size or modification time has changed. (The fingerprint of newly scanned text is computed during the scan
+itself; see extend_game_index().)
+
+The sidecar file is written to a temporary file that then replaces it, so that an interrupted save never leaves a
+partly written index. A sidecar file that is nonetheless malformed (e.g., truncated) is treated as missing, so that the
+index is rebuilt.
+
+Sidecar file layout:
+    line 1:   constants.GAME_INDEX_MAGIC
+    line 2:   JSON object of metadata (file size, modification time, length and fingerprint of the indexed text,
+              number of games, header fields, length of the rest of the sidecar file)
+    then:     for each game, three little-endian 64-bit integers: game offset, movetext offset, end offset
+    then:     for each header field, one line holding the JSON list of the field’s distinct values, followed by the
+              field’s code for each game, as little-endian unsigned 32-bit integers
+Because the offsets have fixed width, the offsets of game N are read with a single seek, without reading the rest of
+the index.
+"""
+
+from array import array
+from hashlib import blake2b
+import json
+import os
+import re
+import struct
+import sys
+
+from . import constants
+from . error_processing import (fatal_error_exit_without_traceback,
+                                print_nonfatal_error)
+from . header_columns import (DictionaryEncodedColumn,
+                              HeaderColumns)
+from . pgn_input_streams import open_pgn_binary_stream
+
+# A header (tag-pair) line, e.g., [White "Carlsen, Magnus"]
+HEADER_LINE_REGEX = re.compile(rb'^\s*\[\s*(\w+)\s+"(.*)"\s*\]')
+
+# Game offset, movetext offset, end offset
+OFFSETS_STRUCT = struct.Struct("<3q")
+
+# Header-value codes are saved little-endian; array("I") uses the machine’s byte order
+CODE_ARRAY_NEEDS_BYTESWAP = sys.byteorder != "little"
+
+
+class GameIndex:
+    """
+    The index of the games of one PGN file. See the module docstring.
+
+    Object attributes:
+        path_to_pgnfile: Path of the indexed PGN file
+        number_of_games: Number of games in the file
+        header_fields: List of the names of the indexed header fields
+        offsets: List of (game_offset, movetext_offset, end_offset) triples, one per game, or None if the index was
+            loaded from a sidecar file, in which case the offsets are read from that file on demand
+        header_columns: HeaderColumns of each game’s values of header_fields (“” when absent), or None until needed,
+            if the index was loaded from a sidecar file
+        text_length: Length of the (decompressed) text of the file that has been indexed
+        file_size, mtime_ns: Size and modification time of the file when the indexed text was scanned (i.e., before
+            it was read), or None
+        path_to_sidecar: Path of the sidecar file, or None
+        offsets_start_in_sidecar: Byte offset in the sidecar file at which the offsets of the first game begin
+        prefix_fingerprints: Dictionary {length of prefix: fingerprint} of the prefixes of the file’s current text
+            whose fingerprints are known (see fingerprint_of_prefix())
+        prefix_hasher: The hash object (see hasher_of_prefix()) of the first text_length bytes of the file’s text, from
+            which extend_game_index() continues, or None if it isn’t at hand
+    """
+
+
+    def __init__(self, path_to_pgnfile, header_fields):
+        self.path_to_pgnfile = path_to_pgnfile
+        self.header_fields = header_fields
+        self.number_of_games = 0
+        self.offsets = []
+        self.header_columns = HeaderColumns(header_fields)
+        self.text_length = 0
+        self.file_size = None
+        self.mtime_ns = None
+        self.path_to_sidecar = None
+        self.offsets_start_in_sidecar = None
+        self.prefix_fingerprints = {}
+        self.prefix_hasher = None
+
+
+    def fingerprint_of_prefix(self, length_of_prefix):
+        """
+        Returns the fingerprint of the first length_of_prefix bytes of the text of the PGN file, computing it only if it
+        isn’t already known.
+        """
+        if length_of_prefix not in self.prefix_fingerprints:
+            self.prefix_fingerprints[length_of_prefix] = fingerprint_of_prefix(self.path_to_pgnfile, length_of_prefix)
+        return self.prefix_fingerprints[length_of_prefix]
+
+
+    def offsets_of_game(self, game_number):
+        """
+        Returns the (game_offset, movetext_offset, end_offset) triple of game game_number (counting from 1).
+        """
+        if self.offsets is not None:
+            return self.offsets[game_number - 1]
+        with open(self.path_to_sidecar, "rb") as sidecar_file:
+            sidecar_file.seek(self.offsets_start_in_sidecar + (game_number - 1) * OFFSETS_STRUCT.size)
+            return OFFSETS_STRUCT.unpack(sidecar_file.read(OFFSETS_STRUCT.size))
+
+
+    def load_all_offsets(self):
+        """
+        Reads the offsets of every game from the sidecar file, if they haven’t been read yet, so that games can be
+        appended to the index.
+        """
+        if self.offsets is None:
+            with open(self.path_to_sidecar, "rb") as sidecar_file:
+                sidecar_file.seek(self.offsets_start_in_sidecar)
+                offsets_bytes = sidecar_file.read(self.number_of_games * OFFSETS_STRUCT.size)
+            self.offsets = list(OFFSETS_STRUCT.iter_unpack(offsets_bytes))
+
+
+    def get_header_columns(self):
+        """
+        Returns the HeaderColumns of the games, reading them from the sidecar file if they haven’t been read yet.
+        """
+        if self.header_columns is None:
+            columns = {}
+            with open(self.path_to_sidecar, "rb") as sidecar_file:
+                sidecar_file.seek(self.offsets_start_in_sidecar + self.number_of_games * OFFSETS_STRUCT.size)
+                for field in self.header_fields:
+                    distinct_values = json.loads(sidecar_file.readline())
+                    codes = array("I")
+                    codes.frombytes(sidecar_file.read(self.number_of_games * codes.itemsize))
+                    if CODE_ARRAY_NEEDS_BYTESWAP:
+                        codes.byteswap()
+                    columns[field] = DictionaryEncodedColumn(distinct_values, codes)
+            self.header_columns = HeaderColumns(self.header_fields, columns)
+        return self.header_columns
+
+
+    def game_numbers_where(self, header_conditions):
+        """
+        Returns the list of the numbers (counting from 1) of the games whose header values include every (field, value)
+        pair of the dictionary header_conditions.
+        """
+        return list(self.get_header_columns().game_numbers_where(header_conditions))
+
+
+    def first_game_number_where(self, header_conditions):
+        """
+        Returns the number (counting from 1) of the first game whose header values include every (field, value) pair of
+        the dictionary header_conditions, or None if there is no such game.
+        """
+        return next(self.get_header_columns().game_numbers_where(header_conditions), None)
+
+
+def scan_games_in_binary_stream(binary_stream, header_fields, starting_offset = 0):
+    """
+    Generator that makes one streaming pass over binary_stream and yields, for each game, the 2-tuple:
+        ((game_offset, movetext_offset, end_offset), list of values of header_fields)
+
+    Offsets are counted from starting_offset, the offset in the file of the current position of binary_stream.
+
+    A game begins at a header line that follows either the start of the stream or the movetext of the previous game.
+    (A game with no headers begins at its first movetext line.) Its movetext begins at its first non-blank line that is
+    not a header line.
+    """
+    field_position = {field.encode(): position for position, field in enumerate(header_fields)}
+
+    game_offset = None
+    movetext_offset = None
+    values = None
+    is_in_movetext = False
+
+    offset = starting_offset
+    for line in binary_stream:
+        stripped_line = line.strip()
+        if stripped_line:
+            match = HEADER_LINE_REGEX.match(line)
+            if match and (game_offset is None or is_in_movetext):
+                # A header line that begins a new game; it also ends the previous game, if any
+                if game_offset is not None:
+                    yield (game_offset, movetext_offset, offset), values
+                game_offset = offset
+                movetext_offset = None
+                values = [""] * len(header_fields)
+                is_in_movetext = False
+            elif not match and not is_in_movetext:
+                # The first movetext line of the current game (which, lacking headers, might begin here)
+                if game_offset is None:
+                    game_offset = offset
+                    values = [""] * len(header_fields)
+                movetext_offset = offset
+                is_in_movetext = True
+
+            if match and not is_in_movetext:
+                position = field_position.get(match.group(1))
+                if position is not None:
+                    values[position] = match.group(2).decode(errors = "replace")
+        offset += len(line)
+
+    if game_offset is not None:
+        if movetext_offset is None:
+            # Headers with no movetext
+            movetext_offset = offset
+        yield (game_offset, movetext_offset, offset), values
+
+
+def path_to_sidecar_of(path_to_pgnfile):
+    return path_to_pgnfile.with_name(path_to_pgnfile.name + constants.GAME_INDEX_SUFFIX)
+
+
+def new_prefix_hasher():
+    return blake2b(digest_size = 16)
+
+
+def hasher_of_prefix(path_to_pgnfile, length_of_prefix):
+    """
+    Returns the hash object (which can be updated with more text) of the first length_of_prefix bytes of the
+    (decompressed) text of the PGN file, or None if the text is shorter than that. See fingerprint_of_prefix().
+
+    The prefix is read in chunks of constants.PREFIX_FINGERPRINT_CHUNK_SIZE bytes, and so never held in memory at once;
+    reading it is still far cheaper than parsing it.
+    """
+    prefix_hasher = new_prefix_hasher()
+    number_of_bytes_left = length_of_prefix
+    with open_pgn_binary_stream(path_to_pgnfile) as binary_stream:
+        while number_of_bytes_left > 0:
+            chunk = binary_stream.read(min(number_of_bytes_left, constants.PREFIX_FINGERPRINT_CHUNK_SIZE))
+            if not chunk:
+                return None
+            prefix_hasher.update(chunk)
+            number_of_bytes_left -= len(chunk)
+    return prefix_hasher
+
+
+def fingerprint_of_prefix(path_to_pgnfile, length_of_prefix):
+    """
+    Returns a fingerprint (a hexadecimal string) of the first length_of_prefix bytes of the (decompressed) text of the
+    PGN file, or None if the text is shorter than that.
+
+    The fingerprint is a hash of the whole prefix, so that it detects any change to the previously indexed text (e.g., a
+    game’s having been edited, even if its length is unchanged, or removed, or the file’s having been replaced).
+    """
+    prefix_hasher = hasher_of_prefix(path_to_pgnfile, length_of_prefix)
+    return None if prefix_hasher is None else prefix_hasher.hexdigest()
+
+
+def build_game_index(path_to_pgnfile, header_fields = constants.INDEXED_HEADER_FIELDS):
+    """
+    Returns a GameIndex of the PGN file at path_to_pgnfile built with one streaming pass over the file.
+    """
+    game_index = GameIndex(path_to_pgnfile, list(header_fields))
+    extend_game_index(game_index)
+    return game_index
+
+
+def extend_game_index(game_index):
+    """
+    Appends to game_index the games in the text of its PGN file beyond game_index.text_length, scanning only that text.
+
+    (If text was appended to the last indexed game itself, rather than as new games, that text is indexed as a game
+    without headers.)
+
+    The size and modification time of the file are recorded from the opened file before any of it is read, so that,
+    if the file grows during the scan, the index covers at least the text they describe (and any further growth is
+    indexed next time, rather than taken as already indexed).
+
+    The scanned text is also hashed as it is read, continuing from game_index.prefix_hasher (if the indexed text is
+    extended), so that the fingerprint of the newly indexed text needs no second reading of the file.
+    """
+    starting_text_length = game_index.text_length
+    prefix_hasher = game_index.prefix_hasher if starting_text_length > 0 else new_prefix_hasher()
+    number_of_bytes_scanned = 0
+
+    def lines_hashed_as_read(binary_stream):
+        nonlocal number_of_bytes_scanned
+        for line in binary_stream:
+            prefix_hasher.update(line)
+            number_of_bytes_scanned += len(line)
+            yield line
+
+    with open_pgn_binary_stream(game_index.path_to_pgnfile) as binary_stream:
+        stat_result = os.fstat(binary_stream.fileno())
+        binary_stream.seek(starting_text_length)
+        lines = binary_stream if prefix_hasher is None else lines_hashed_as_read(binary_stream)
+        for offsets, values in scan_games_in_binary_stream(lines, game_index.header_fields, starting_text_length):
+            game_index.offsets.append(offsets)
+            game_index.header_columns.append_game(values)
+    game_index.number_of_games = len(game_index.offsets)
+    if game_index.offsets:
+        game_index.text_length = game_index.offsets[-1][2]
+    game_index.file_size = stat_result.st_size
+    game_index.mtime_ns = stat_result.st_mtime_ns
+
+    # The hash covers the indexed text only if the scanned text ended with a game (rather than, e.g., blank lines)
+    if prefix_hasher is not None and starting_text_length + number_of_bytes_scanned == game_index.text_length:
+        game_index.prefix_fingerprints[game_index.text_length] = prefix_hasher.hexdigest()
+        game_index.prefix_hasher = prefix_hasher
+    else:
+        game_index.prefix_hasher = None
+
+
+def save_game_index(game_index):
+    """
+    Writes game_index to its sidecar file, by way of a temporary file that then replaces it. See the module docstring
+    for the layout.
+    """
+    offsets_bytes = b"".join(OFFSETS_STRUCT.pack(*offsets) for offsets in game_index.offsets)
+    list_of_column_bytes = []
+    for field in game_index.header_fields:
+        column = game_index.header_columns.columns[field]
+        codes = array("I", column.codes)
+        if CODE_ARRAY_NEEDS_BYTESWAP:
+            codes.byteswap()
+        list_of_column_bytes.append(json.dumps(column.distinct_values).encode() + b"\n" + codes.tobytes())
+
+    metadata = {"file_size": game_index.file_size,
+                "mtime_ns": game_index.mtime_ns,
+                "text_length": game_index.text_length,
+                "prefix_fingerprint": game_index.fingerprint_of_prefix(game_index.text_length),
+                "number_of_games": game_index.number_of_games,
+                "header_fields": game_index.header_fields,
+                "length_after_metadata": len(offsets_bytes) + sum(map(len, list_of_column_bytes))}
+
+    path_to_sidecar = path_to_sidecar_of(game_index.path_to_pgnfile)
+    path_to_temporary_file = path_to_sidecar.with_name(path_to_sidecar.name + ".tmp")
+    try:
+        with open(path_to_temporary_file, "wb") as sidecar_file:
+            sidecar_file.write(constants.GAME_INDEX_MAGIC)
+            sidecar_file.write(json.dumps(metadata).encode() + b"\n")
+            sidecar_file.write(offsets_bytes)
+            for column_bytes in list_of_column_bytes:
+                sidecar_file.write(column_bytes)
+        os.replace(path_to_temporary_file, path_to_sidecar)
+    except OSError:
+        path_to_temporary_file.unlink(missing_ok = True)
+        raise
+
+
+def load_game_index(path_to_pgnfile, do_accept_appended_file = False):
+    """
+    Returns the GameIndex saved in the sidecar file of the PGN file at path_to_pgnfile, or None if there is no sidecar
+    file, it is malformed (e.g., truncated), or it is stale (i.e., the PGN file’s size or modification time has changed
+    since it was written).
+
+    If do_accept_appended_file is True, an index of a file that has since only grown (see the module docstring) is
+    returned too, in which case its .text_length is less than the length of the file’s text. The games beyond that can
+    be added with extend_game_index().
+
+    Only the metadata is read now; offsets and header values are read from the sidecar file on demand.
+    """
+    path_to_sidecar = path_to_sidecar_of(path_to_pgnfile)
+    try:
+        with open(path_to_sidecar, "rb") as sidecar_file:
+            if sidecar_file.readline() != constants.GAME_INDEX_MAGIC:
+                return None
+            metadata_line = sidecar_file.readline()
+            offsets_start_in_sidecar = sidecar_file.tell()
+            sidecar_length = os.fstat(sidecar_file.fileno()).st_size
+    except FileNotFoundError:
+        return None
+
+    # A malformed sidecar file is treated as missing. (Its length is checked against the metadata, which records how
+    # much follows it, so that the offsets and header values read from it later on demand are all there.)
+    try:
+        metadata = json.loads(metadata_line)
+        # (Each game has its offsets and, in each header column, a code.)
+        minimum_length_after_metadata = metadata["number_of_games"] * (OFFSETS_STRUCT.size
+                                                                       + len(metadata["header_fields"]) * 4)
+        is_well_formed = (sidecar_length - offsets_start_in_sidecar == metadata["length_after_metadata"]
+                          and metadata["length_after_metadata"] >= minimum_length_after_metadata)
+        file_size = metadata["file_size"]
+        mtime_ns = metadata["mtime_ns"]
+        text_length = metadata["text_length"]
+        prefix_fingerprint = metadata["prefix_fingerprint"]
+        number_of_games = metadata["number_of_games"]
+        header_fields = metadata["header_fields"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not is_well_formed:
+        return None
+
+    stat_result = os.stat(path_to_pgnfile)
+    prefix_hasher = None
+    if (file_size != stat_result.st_size) or (mtime_ns != stat_result.st_mtime_ns):
+        if not do_accept_appended_file or stat_result.st_size < file_size:
+            return None
+        prefix_hasher = hasher_of_prefix(path_to_pgnfile, text_length)
+        if prefix_hasher is None or prefix_hasher.hexdigest() != prefix_fingerprint:
+            return None
+
+    game_index = GameIndex(path_to_pgnfile, header_fields)
+    game_index.number_of_games = number_of_games
+    game_index.text_length = text_length
+    game_index.file_size = file_size
+    game_index.mtime_ns = mtime_ns
+    game_index.offsets = None
+    game_index.header_columns = None
+    game_index.path_to_sidecar = path_to_sidecar
+    game_index.offsets_start_in_sidecar = offsets_start_in_sidecar
+    # Either the file is unchanged, or its indexed text has just been verified (by prefix_hasher, from which the
+    # fingerprint of the extended text is then continued)
+    game_index.prefix_fingerprints[text_length] = prefix_fingerprint
+    game_index.prefix_hasher = prefix_hasher
+    return game_index
+
+
+def is_game_index_up_to_date(game_index):
+    """
+    Returns True if game_index was loaded from a sidecar file written when its PGN file had its current size and
+    modification time.
+    """
+    stat_result = os.stat(game_index.path_to_pgnfile)
+    return (game_index.file_size, game_index.mtime_ns) == (stat_result.st_size, stat_result.st_mtime_ns)
+
+
+def load_or_build_game_index(path_to_pgnfile):
+    """
+    Returns the GameIndex of the PGN file at path_to_pgnfile, loading it from its sidecar file if that is up to date,
+    extending it if the file has only grown since, and otherwise building it. An extended or newly built index is saved
+    (if the directory is writable) for next time.
+    """
+    game_index = load_game_index(path_to_pgnfile, do_accept_appended_file = True)
+    is_up_to_date = game_index is not None and is_game_index_up_to_date(game_index)
+    if not is_up_to_date:
+        if game_index is None:
+            game_index = build_game_index(path_to_pgnfile)
+        else:
+            # Reads the rest of the saved index into memory, and then indexes only the appended games
+            game_index.load_all_offsets()
+            game_index.get_header_columns()
+            extend_game_index(game_index)
+        try:
+            save_game_index(game_index)
+        except OSError as err:
+            print_nonfatal_error(f"Could not save the game index next to the PGN file, so it will be rebuilt next time.\n"
+                                 f"{err}")
+    return game_index
+
+
+def read_game_string(path_to_pgnfile, game_index, game_number):
+    """
+    Returns the text of game game_number (counting from 1) of the PGN file, read by seeking directly to its offset.
+
+    (Seeking within a compressed file requires decompressing everything before the game, so random access is fast
+    only for uncompressed files.)
+    """
+    return next(iterate_game_strings(path_to_pgnfile, game_index, [game_number]))
+
+
+def iterate_game_strings(path_to_pgnfile, game_index, game_numbers):
+    """
+    Generator that yields the text of each game whose number (counting from 1) is in game_numbers, in that order,
+    seeking from one game to the next in a single opening of the file. The text of other games is never read.
+    """
+    with open_pgn_binary_stream(path_to_pgnfile) as binary_stream:
+        for game_number in game_numbers:
+            game_offset, movetext_offset, end_offset = game_index.offsets_of_game(game_number)
+            binary_stream.seek(game_offset)
+            yield binary_stream.read(end_offset - game_offset).decode(errors = "replace")
+
+
+def parse_header_conditions(list_of_conditions, game_index):
+    """
+    Converts a list of strings of the form “Field=Value” (e.g., “White=Carlsen, Magnus”) to a dictionary
+    {Field: Value}. Exits with an error message if a condition is malformed or its field is not indexed by game_index.
+    """
+    header_conditions = {}
+    for condition in list_of_conditions:
+        field, separator, value = condition.partition("=")
+        if not separator or not field:
+            fatal_error_exit_without_traceback(f"The condition “{condition}” is not of the form Field=Value, "
+                                               "e.g., “ECO=B90”.")
+        header_conditions[field.strip()] = value.strip()
+
+    unknown_fields = [field for field in header_conditions if field not in game_index.header_fields]
+    if unknown_fields:
+        fatal_error_exit_without_traceback(f"Header field(s) {', '.join(unknown_fields)} not indexed. Indexed "
+                                           f"fields: {', '.join(game_index.header_fields)}.")
+    return header_conditions
+
+
+def load_or_build_game_index_CLI_package(user_pgn_filepath):
+    """
+    Returns the GameIndex of the PGN file at user_pgn_filepath, exiting with an error message if there is no such file.
+    """
+    try:
+        return load_or_build_game_index(user_pgn_filepath)
+    except FileNotFoundError as err:
+        fatal_error_exit_without_traceback(f"PGN file “{user_pgn_filepath}” could not be found.\n{err}")
+
+
+def get_string_of_selected_game_CLI_package(user_pgn_filepath, game_number = None, list_of_conditions = None):
+    """
+    Get the string of a single game, selected either (a) by its number (counting from 1) or (b) as the first game
+    satisfying every “Field=Value” condition of list_of_conditions, from the PGN file at user_pgn_filepath, using the
+    file’s game index.
+
+    Returns the 2-tuple (string_read_from_file, game_number).
+    """
+    game_index = load_or_build_game_index_CLI_package(user_pgn_filepath)
+
+    if list_of_conditions:
+        header_conditions = parse_header_conditions(list_of_conditions, game_index)
+        game_number = game_index.first_game_number_where(header_conditions)
+        if game_number is None:
+            fatal_error_exit_without_traceback(f"No game in “{user_pgn_filepath.name}” satisfies "
+                                               f"{' and '.join(list_of_conditions)}.")
+
+    if not 1 <= game_number <= game_index.number_of_games:
+        fatal_error_exit_without_traceback(f"“{user_pgn_filepath.name}” has {game_index.number_of_games} game(s); "
+                                           f"there is no game {game_number}.")
+
+    return read_game_string(user_pgn_filepath, game_index, game_number), game_number
+
+
+def get_game_strings_matching_filter_CLI_package(user_pgn_filepath, list_of_conditions):
+    """
+    Selects, using the header columns of the game index of the PGN file at user_pgn_filepath, every game satisfying
+    every “Field=Value” condition of list_of_conditions.
+
+    Returns the 2-tuple (generator of the 2-tuple (text, value of Result header) of each selected game, number of
+    selected games). Only the selected games are ever read.
+    """
+    game_index = load_or_build_game_index_CLI_package(user_pgn_filepath)
+    header_conditions = parse_header_conditions(list_of_conditions, game_index)
+    game_numbers = game_index.game_numbers_where(header_conditions)
+    if not game_numbers:
+        fatal_error_exit_without_traceback(f"No game in “{user_pgn_filepath.name}” satisfies "
+                                           f"{' and '.join(list_of_conditions)}.")
+
+    result_column = game_index.get_header_columns().columns[constants.RESULT_HEADER_FIELD]
+    results = [result_column.value_of_game_at(game_number - 1) for game_number in game_numbers]
+
+    return zip(iterate_game_strings(user_pgn_filepath, game_index, game_numbers), results), len(game_numbers)
+
+
+def describe_selection_of_games(number_of_games, list_of_conditions):
+    """
+    Returns a description of a selection of games for the header of the variations table, e.g.,
+    “12 games with ECO=B90, Result=1-0”.
+    """
+    good_grammar_string = "game" if number_of_games == 1 else "games"
+    description = f"{number_of_games} {good_grammar_string}"
+    if list_of_conditions:
+        description += f" with {', '.join(list_of_conditions)}"
+    return description
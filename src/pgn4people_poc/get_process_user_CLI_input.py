@@ -5,25 +5,40 @@ Asks for, receives, parses, and iterates until satisfactory input from user
 
 import random
 
+# readline is unavailable on some platforms (e.g., Windows without pyreadline). Tab completion is then simply not offered.
+try:
+    import readline
+except ImportError:
+    readline = None
+
 from yachalk import chalk
 
 from . import constants
 from .error_processing import fatal_developer_error, print_nonfatal_error
+from .process_pgn_file import tokenize_pgnstring
+from .traverse_tree import (deviation_history_after_choice,
+                            follow_movetext_path,
+                            node_id_from_movetext_path)
 from .utilities import (lowercase_alpha_from_num,
                          num_from_alpha)
 
 
 def get_node_id_move_choice_for_next_line_to_display(fullmovenummber_to_node_id_lookup_table,
                                                      examples_command_triples_white,
-                                                     examples_command_triples_black):
+                                                     examples_command_triples_black,
+                                                     nodedict = None):
     """
-    Ask user to supply (a) a (fullmovenumber, player color, move-choice letter) triple for the next line to explore or
-    (b) one of several one-word keywords.
+    Ask user to supply (a) a (fullmovenumber, player color, move-choice letter) triple for the next line to explore,
+    (b) one of several one-word keywords, or (c) the “goto” keyword followed by a path of moves from the initial
+    position (e.g., “goto e4 c5 Nf3 d6”).
 
     If the user’s input isn’t valid, a report of the error(s) is output and the user is invited to try again.
 
-    When valid input is provided by the user, this function returns (a) a flag for a chosen one-word keyword or (b) the
-    node_id and the numeric index (zero-index) of the chosen move at that node.
+    When valid input is provided by the user, this function returns (a) a flag for a chosen one-word keyword, (b) the
+    node_id and the numeric index (zero-index) of the chosen move at that node, or (c) the pair
+    (constants.GOTO_COMMAND, list of movetexts of the validated goto path).
+
+    nodedict is required only to resolve a goto path; if it is None, the goto command is not accepted.
     """
 
 
@@ -51,114 +66,145 @@ def get_node_id_move_choice_for_next_line_to_display(fullmovenummber_to_node_id_
                         "OR "
                         )
     
-    user_prompt_2 = "one of ‘reset’, ‘report’, ‘nodereport’, or ‘stop’:\n"
+    user_prompt_2 = "one of ‘reset’, ‘refresh’, ‘report’, ‘nodereport’, ‘memreport’, or ‘stop’"
+    if nodedict is not None:
+        user_prompt_2 += ",\nor ‘goto’ followed by moves from the start (e.g., ‘goto e4 c5 Nf3’; <TAB> completes moves)"
+    user_prompt_2 += ":\n"
 
     if is_some_mainline_move_available:
         user_prompt = user_prompt_1 + user_prompt_2
     else:
         user_prompt = "Enter " + user_prompt_2
 
+    # Get user input, and interpret it, until it is valid
+    while True:
+        # Pose request to user and get user response
+        user_response_string = input(user_prompt)
+        interpreted_response = interpret_user_response(user_response_string,
+                                                       fullmovenummber_to_node_id_lookup_table,
+                                                       nodedict)
+        if interpreted_response is not None:
+            return interpreted_response
+        # Invites user to try again
+        print_nonfatal_error("Please try again.")
+
+
+def interpret_user_response(user_response_string, fullmovenummber_to_node_id_lookup_table, nodedict = None):
+    """
+    Interprets one response (a line of text) of the user to the request of
+    get_node_id_move_choice_for_next_line_to_display(), and returns what that function returns.
+
+    If the response isn’t valid, a report of the error(s) is output, and None is returned.
+
+    Separated from the prompting so that the same interpretation serves commands read from a file (see
+    batch_mode.py).
+    """
+
     # Eligible answers for player-color response are expressed only in lowercase, because user input is
     # lower-cased prior to validating
     white_player_color_response_string_set = {"w", "white"}
     black_player_color_response_string_set = {"b", "black"}
 
     # Initialize booleans for checking validity of user input
-    request_pending = True
-
     is_valid_key = False
     is_valid_alpha_move_choice = False
     is_fullmovenumber_integer = False
     is_valid_player_color = False
     is_a_single_alpha = False
 
-    # Get user input, parse it while checking its validity
-    while request_pending:
-        # Pose request to user and get user response
-        user_response_string = input(user_prompt)
-        response_list = user_response_string.split()
-
-        number_of_fields_in_response = len(response_list)
-        if number_of_fields_in_response > 0:
-            lowercase_response = response_list[0].lower()
-            # Test whether user wants to stop
-            if lowercase_response.startswith(constants.STOP_SIGN):
-                return constants.STOP_SIGN, None
-            # Test whether user wants to reset to the initial node
-            if lowercase_response.startswith(constants.RESET_COMMAND):
-                return constants.RESET_COMMAND, None
-            # Test whether user wants a report characterizing the size and complexity of the tree
-            if lowercase_response.startswith(constants.REPORT_COMMAND):
-                return constants.REPORT_COMMAND, None
-            # Test whether user wants a node-by-node report of its attributes
-            if lowercase_response.startswith(constants.NODEREPORT_COMMAND):
-                return constants.NODEREPORT_COMMAND, None
-        # User didn't request to stop, reset, or produce a report
-        if number_of_fields_in_response != 3:
-            # When the number of fields supplied is wrong, we don't even try to assess the validity of the first three.
+    response_list = user_response_string.split()
+
+    number_of_fields_in_response = len(response_list)
+    if number_of_fields_in_response > 0:
+        lowercase_response = response_list[0].lower()
+        # Test whether user wants to stop
+        if lowercase_response.startswith(constants.STOP_SIGN):
+            return constants.STOP_SIGN, None
+        # Test whether user wants to reset to the initial node
+        if lowercase_response.startswith(constants.RESET_COMMAND):
+            return constants.RESET_COMMAND, None
+        # Test whether user wants a report characterizing the size and complexity of the tree
+        if lowercase_response.startswith(constants.REPORT_COMMAND):
+            return constants.REPORT_COMMAND, None
+        # Test whether user wants a node-by-node report of its attributes
+        if lowercase_response.startswith(constants.NODEREPORT_COMMAND):
+            return constants.NODEREPORT_COMMAND, None
+        # Test whether user wants a report of the memory the tree occupies
+        if lowercase_response.startswith(constants.MEMREPORT_COMMAND):
+            return constants.MEMREPORT_COMMAND, None
+        # Test whether user wants the current table displayed again (e.g., after the tree was rebuilt in watch mode)
+        if lowercase_response.startswith(constants.REFRESH_COMMAND):
+            return constants.REFRESH_COMMAND, None
+        # Test whether user wants to jump directly to the node reached by a path of moves
+        if (nodedict is not None) and (lowercase_response == constants.GOTO_COMMAND):
+            movetext_path = movetext_path_from_goto_response(nodedict, user_response_string)
+            if movetext_path is not None:
+                return constants.GOTO_COMMAND, movetext_path
+            return None
+    # User didn't request to stop, reset, or produce a report
+    if number_of_fields_in_response != 3:
+        # When the number of fields supplied is wrong, we don't even try to assess the validity of the first three.
+        report_input_errors_to_user(response_list,
+                                    is_fullmovenumber_integer,
+                                    is_valid_player_color,
+                                    is_a_single_alpha,
+                                    is_valid_key,
+                                    is_valid_alpha_move_choice)
+    else:
+        # Parse components from user's response
+        fullmovenumber, player_color, alpha_move_choice  = response_list
+
+        # Validate that first field is at least numeric
+        is_fullmovenumber_integer = fullmovenumber.isdigit()
+
+        # Validate player color (only to extent that input expresses a player color, not to whether
+        # that particular color is appropriate in the full context)
+        player_color_lower = player_color.lower()
+        if player_color_lower in black_player_color_response_string_set:
+            player_color_string = constants.BLACK_PLAYER_COLOR_STRING
+            is_valid_player_color = True
+        elif player_color_lower in white_player_color_response_string_set:
+            player_color_string = constants.WHITE_PLAYER_COLOR_STRING
+            is_valid_player_color = True
+        else:
+            is_valid_player_color = False
+
+        # Validate that third field is a single alpha character
+        is_a_single_alpha = (len(alpha_move_choice) == 1) and (alpha_move_choice.isalpha())
+
+        # Validate that (fullmovenumber, player_color) is a valid key
+        if is_valid_player_color and is_fullmovenumber_integer:
+
+            # NOTE: Absent wrapping fullmovenumber within int(…), it appeared as a string in the query, and thus
+            # didn't match the actual keys in the dictionary, where the first element of the key's tuple was
+            # an integer
+            key_to_query_lookup_table = int(fullmovenumber) , player_color_string
+            # NOTE: is_valid_key was already initialized to False above because the following calculation occurs
+            # only when both is_valid_player_color and is_fullmovenumber_numeric were found to be true.
+            is_valid_key = key_to_query_lookup_table in fullmovenummber_to_node_id_lookup_table.keys()
+
+        # Validates user's choice of move                
+        if is_valid_key and is_a_single_alpha:
+            numeric_move_choice = num_from_alpha(alpha_move_choice)
+            node_id_selected, number_of_choices = fullmovenummber_to_node_id_lookup_table[key_to_query_lookup_table]
+            # Checks that single-char alpha is not above the range available at this node
+            is_valid_alpha_move_choice = numeric_move_choice <= number_of_choices
+
+        # Assesses whether user response was satisfactory
+        if is_valid_alpha_move_choice:
+            # This was the last hurdle. User response was satisfactory.
+            # Return the node_id and numeric_move_choice (adjusted to zero-index)
+            return node_id_selected, numeric_move_choice
+        else:
+            # Informs user there are errors in her input
             report_input_errors_to_user(response_list,
                                         is_fullmovenumber_integer,
                                         is_valid_player_color,
                                         is_a_single_alpha,
                                         is_valid_key,
                                         is_valid_alpha_move_choice)
-        else:
-            # Parse components from user's response
-            fullmovenumber, player_color, alpha_move_choice  = response_list
-
-            # Validate that first field is at least numeric
-            is_fullmovenumber_integer = fullmovenumber.isdigit()
-
-            # Validate player color (only to extent that input expresses a player color, not to whether
-            # that particular color is appropriate in the full context)
-            player_color_lower = player_color.lower()
-            if player_color_lower in black_player_color_response_string_set:
-                player_color_string = constants.BLACK_PLAYER_COLOR_STRING
-                is_valid_player_color = True
-            elif player_color_lower in white_player_color_response_string_set:
-                player_color_string = constants.WHITE_PLAYER_COLOR_STRING
-                is_valid_player_color = True
-            else:
-                is_valid_player_color = False
-
-            # Validate that third field is a single alpha character
-            is_a_single_alpha = (len(alpha_move_choice) == 1) and (alpha_move_choice.isalpha())
-
-            # Validate that (fullmovenumber, player_color) is a valid key
-            if is_valid_player_color and is_fullmovenumber_integer:
-
-                # NOTE: Absent wrapping fullmovenumber within int(…), it appeared as a string in the query, and thus
-                # didn't match the actual keys in the dictionary, where the first element of the key's tuple was
-                # an integer
-                key_to_query_lookup_table = int(fullmovenumber) , player_color_string
-                # NOTE: is_valid_key was already initialized to False above because the following calculation occurs
-                # only when both is_valid_player_color and is_fullmovenumber_numeric were found to be true.
-                is_valid_key = key_to_query_lookup_table in fullmovenummber_to_node_id_lookup_table.keys()
-
-            # Validates user's choice of move                
-            if is_valid_key and is_a_single_alpha:
-                numeric_move_choice = num_from_alpha(alpha_move_choice)
-                node_id_selected, number_of_choices = fullmovenummber_to_node_id_lookup_table[key_to_query_lookup_table]
-                # Checks that single-char alpha is not above the range available at this node
-                is_valid_alpha_move_choice = numeric_move_choice <= number_of_choices
-
-            # Assesses whether user response was satisfactory
-            if is_valid_alpha_move_choice:
-                # This was the last hurdle. User response was satisfactory.
-                request_pending = False
-            else:
-                # Informs user there are errors in her input and invites her to try again
-                report_input_errors_to_user(response_list,
-                                            is_fullmovenumber_integer,
-                                            is_valid_player_color,
-                                            is_a_single_alpha,
-                                            is_valid_key,
-                                            is_valid_alpha_move_choice)
-
-            # End of while loop to successfully obtain valid user input
 
-    # Return the node_id and numeric_move_choice (adjusted to zero-index)
-    return node_id_selected, numeric_move_choice
+    return None
 
 
 def report_input_errors_to_user(response_list,
@@ -168,8 +214,7 @@ def report_input_errors_to_user(response_list,
                                 is_valid_key,
                                 is_valid_alpha_move_choice):
     """
-    Takes errors identified in get_node_id_move_choice_for_next_line_to_display() and reports them to user
-    and invites her to try again.
+    Takes errors identified in interpret_user_response() and reports them to user.
     """
 
     number_of_fields_in_response = len(response_list)
@@ -241,8 +286,6 @@ def report_input_errors_to_user(response_list,
             print_nonfatal_error(alpha_out_of_range_message_part_1
                                                 + alpha_out_of_range_message_part_2
                                                 + alpha_out_of_range_message_part_3)
-#   End of branches. Now invite user to try again.
-    print_nonfatal_error("Please try again.")
 
 
 def example_commmand_string_for_each_player(examples_command_triples_white,
@@ -336,9 +379,120 @@ def synthesize_combined_example_command_string(examples_command_triples_white, e
     return example_command_string
 
 
-def  target_node_id_from_user_input(nodedict, node_id_chosen, move_choice):
+def movetext_path_from_goto_response(nodedict, user_response_string):
+    """
+    Parses a response of the form “goto e4 c5 Nf3 d6” (move numbers such as “1.e4” or “2...Nf3” are permitted) into a
+    list of movetexts and checks that this path of moves can be followed from the initial node.
+
+    Returns the list of movetexts, or None (after reporting the problem to the user) if the path cannot be followed.
+    """
+    # Drop the leading “goto” keyword and tokenize the remainder in the same way as PGN movetext
+    movetext_path = tokenize_pgnstring(" ".join(user_response_string.split()[1:]))
+    if not movetext_path:
+        print_nonfatal_error(f"“{constants.GOTO_COMMAND}” must be followed by at least one move, e.g., “goto e4 c5”.")
+        return None
+
+    node_id_reached, number_of_movetexts_matched = node_id_from_movetext_path(nodedict, movetext_path)
+    if number_of_movetexts_matched < len(movetext_path):
+        unmatched_movetext = movetext_path[number_of_movetexts_matched]
+        available_movetexts = [edge.movetext for edge in nodedict[node_id_reached].edgeslist]
+        if number_of_movetexts_matched == 0:
+            where_string = "in the initial position"
+        else:
+            where_string = f"after “{' '.join(movetext_path[:number_of_movetexts_matched])}”"
+        if available_movetexts:
+            available_string = "Available moves: " + ", ".join(available_movetexts) + "."
+        else:
+            available_string = "That line ends there."
+        print_nonfatal_error(f"The move “{unmatched_movetext}” is not in this PGN {where_string}. {available_string}")
+        return None
+    return movetext_path
+
+
+def enable_tab_completion_of_movetext(nodedict):
+    """
+    Installs a readline completer so that, while typing a “goto” command, <TAB> completes the next move from the moves
+    available at the node reached by the moves already typed. (At the start of the line, <TAB> completes the one-word
+    keywords.)
+
+    Does nothing if readline is unavailable on this platform.
+    """
+    if readline is None:
+        return
+
+    keywords = [constants.STOP_SIGN,
+                constants.RESET_COMMAND,
+                constants.REPORT_COMMAND,
+                constants.NODEREPORT_COMMAND,
+                constants.MEMREPORT_COMMAND,
+                constants.REFRESH_COMMAND,
+                constants.GOTO_COMMAND]
+
+    def complete_movetext(text, state):
+        """
+        Inner function: readline completer. Returns the state-th candidate that begins with text, or None when there
+        are no more candidates.
+        """
+        words_before_text = readline.get_line_buffer()[:readline.get_begidx()].split()
+        if not words_before_text:
+            candidates = [keyword + " " for keyword in keywords if keyword.startswith(text.lower())]
+        elif words_before_text[0].lower() == constants.GOTO_COMMAND:
+            movetext_path = tokenize_pgnstring(" ".join(words_before_text[1:]))
+            node_id_reached, number_of_movetexts_matched = node_id_from_movetext_path(nodedict, movetext_path)
+            if number_of_movetexts_matched < len(movetext_path):
+                candidates = []
+            else:
+                candidates = [edge.movetext + " " for edge in nodedict[node_id_reached].edgeslist
+                              if edge.movetext.startswith(text)]
+        else:
+            candidates = []
+        return candidates[state] if state < len(candidates) else None
+
+    readline.set_completer(complete_movetext)
+    readline.set_completer_delims(" ")
+    # macOS’s Python may link readline against libedit, which uses a different binding syntax
+    if readline.__doc__ and "libedit" in readline.__doc__:
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+
+
+def choice_id_from_user_input(render_context, node_id_chosen, move_choice):
+    """
+    Translates user input of (a node and the display position of the selected edge at that node) to the original index
+    of that edge in the node’s .edgeslist, by the display order of the node in the table last compiled for
+    render_context.
+    """
+    return render_context.display_order_of_node[node_id_chosen][move_choice]
+
+
+def  target_node_id_from_user_input(nodedict, render_context, node_id_chosen, move_choice):
     # Translate user input of (a node and selected edge at that node) to the implied destination node
     base_node = nodedict[node_id_chosen]
-    original_index_of_chosen_edge = base_node.display_order_of_edges[move_choice]
+    original_index_of_chosen_edge = choice_id_from_user_input(render_context, node_id_chosen, move_choice)
     target_node_id = base_node.edgeslist[original_index_of_chosen_edge].destination_node_id
     return target_node_id
+
+
+def position_after_navigation_command(nodedict, render_context, node_id_chosen, move_choice):
+    """
+    Carries out a navigation command (as returned by interpret_user_response(): “reset”, “goto …”, or a choice of a
+    move at a node of the current table) by updating the .target_node_id and .deviation_history of render_context (an
+    instance of RenderContext). Any other command leaves the position unchanged.
+    """
+    if node_id_chosen == constants.RESET_COMMAND:
+        render_context.target_node_id, render_context.deviation_history = constants.INITIAL_NODE_ID, {}
+    elif node_id_chosen == constants.GOTO_COMMAND:
+        # For the goto command, move_choice carries the user’s (validated) path of moves
+        render_context.target_node_id, render_context.deviation_history = follow_movetext_path(nodedict, move_choice)
+    elif node_id_chosen not in constants.NON_NAVIGATION_COMMANDS:
+        # Translates user input of node/edge to the implied detination node and deviation history
+        choice_id = choice_id_from_user_input(render_context, node_id_chosen, move_choice)
+        render_context.target_node_id = target_node_id_from_user_input(nodedict,
+                                                                       render_context,
+                                                                       node_id_chosen,
+                                                                       move_choice)
+        render_context.deviation_history = deviation_history_after_choice(nodedict,
+                                                                          render_context.deviation_history,
+                                                                          node_id_chosen,
+                                                                          choice_id)
@@ -0,0 +1,104 @@
+"""
+Compact columnar store of the header (tag-pair) values of the games of a PGN database, used to select games (e.g.,
+ECO=B90 and Result=1-0) before any movetext is read.
+
+Each header field is stored as one column, dictionary-encoded: the column keeps a list of the field’s distinct values,
+and, for each game, only the (4-byte) code of its value, i.e., the value’s index in that list. Real databases repeat a
+few thousand distinct values (player names, events, ECO codes, results) across hundreds of thousands of games, so the
+store is small, and a condition “Field=Value” is tested by comparing integers after a single lookup of Value’s code.
+"""
+
+from array import array
+
+
+class DictionaryEncodedColumn:
+    """
+    The values of one header field, one per game, dictionary-encoded. See the module docstring.
+
+    Object attributes:
+        distinct_values: List of the distinct values, in order of first appearance
+        code_of_value: Dictionary {value: index of value in distinct_values}
+        codes: array of unsigned 32-bit integers, the code of each game’s value, in game order
+    """
+
+    __slots__ = ("distinct_values", "code_of_value", "codes")
+
+
+    def __init__(self, distinct_values = None, codes = None):
+        self.distinct_values = [] if distinct_values is None else distinct_values
+        self.code_of_value = {value: code for code, value in enumerate(self.distinct_values)}
+        self.codes = array("I") if codes is None else codes
+
+
+    def append(self, value):
+        code = self.code_of_value.get(value)
+        if code is None:
+            code = len(self.distinct_values)
+            self.distinct_values.append(value)
+            self.code_of_value[value] = code
+        self.codes.append(code)
+
+
+    def value_of_game_at(self, index_of_game):
+        return self.distinct_values[self.codes[index_of_game]]
+
+
+class HeaderColumns:
+    """
+    Dictionary-encoded columns of the values of the header fields header_fields, for a sequence of games.
+
+    Object attributes:
+        header_fields: List of the names of the stored header fields
+        columns: Dictionary {header field: DictionaryEncodedColumn}
+        number_of_games: Number of games stored
+    """
+
+
+    def __init__(self, header_fields, columns = None):
+        self.header_fields = list(header_fields)
+        if columns is None:
+            columns = {field: DictionaryEncodedColumn() for field in self.header_fields}
+        self.columns = columns
+        self.number_of_games = len(columns[self.header_fields[0]].codes) if self.header_fields else 0
+
+
+    def append_game(self, values):
+        """
+        Appends the header values of one game. values is a list of the game’s values of self.header_fields, in order.
+        """
+        for field, value in zip(self.header_fields, values):
+            self.columns[field].append(value)
+        self.number_of_games += 1
+
+
+    def header_values_of_game(self, game_number):
+        """
+        Returns the dictionary {header field: value} of game game_number (counting from 1).
+        """
+        return {field: self.columns[field].value_of_game_at(game_number - 1) for field in self.header_fields}
+
+
+    def game_numbers_where(self, header_conditions):
+        """
+        Generator that yields, in order, the number (counting from 1) of each game whose header values include every
+        (field, value) pair of the dictionary header_conditions.
+        """
+        required_codes = []
+        for field, value in header_conditions.items():
+            code = self.columns[field].code_of_value.get(value)
+            if code is None:
+                # No game has this value
+                return
+            required_codes.append((self.columns[field].codes, code))
+
+        if not required_codes:
+            yield from range(1, self.number_of_games + 1)
+            return
+
+        # Scans the first condition’s column, checking the other conditions only on games that satisfy it
+        first_codes, first_code = required_codes[0]
+        other_required_codes = required_codes[1:]
+        for index_of_game, code in enumerate(first_codes):
+            if code == first_code and all(codes[index_of_game] == required_code
+                                          for codes, required_code in other_required_codes):
+                yield index_of_game + 1
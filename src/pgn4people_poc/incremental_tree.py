@@ -0,0 +1,132 @@
+"""
+Persistent merged game tree of a growing (append-only) game collection, updated incrementally.
+
+The tree into which the selected games of a PGN file are merged (see build_merged_gametree()), together with its
+result counts, is saved next to the PGN file, as <name of PGN file> + constants.MERGED_TREE_SUFFIX. Also saved are
+(a) the header conditions by which games were selected, (b) the number of games (selected or not) that had been
+indexed, and (c) the length and fingerprint of the file’s text that had been indexed (see game_index.py).
+
+On a later run with the same conditions, if the previously indexed text is unchanged (i.e., games have only been
+appended since), the saved tree is loaded, and only the selected games among those appended are read, parsed, and
+merged into it. Otherwise the tree is rebuilt from all selected games.
+
+The tree is saved with pickle, and so the saved file must be trusted as much as the code: it is written only by this
+module, next to the user’s own PGN file.
+"""
+
+import os
+import pickle
+
+from . build_tree import build_merged_gametree
+from . classes_arboreal import GameNode
+from . import constants
+from . error_processing import print_nonfatal_error
+from . game_index import (iterate_game_strings,
+                          load_or_build_game_index_CLI_package,
+                          parse_header_conditions)
+from . process_pgn_file import (PGNSource,
+                                clean_and_parse_string_read_from_file)
+from . result_counts import ResultCounts
+
+
+def path_to_merged_tree_of(path_to_pgnfile):
+    return path_to_pgnfile.with_name(path_to_pgnfile.name + constants.MERGED_TREE_SUFFIX)
+
+
+def load_merged_tree(path_to_pgnfile, header_conditions, game_index):
+    """
+    Returns the dictionary saved by save_merged_tree() for the PGN file at path_to_pgnfile, whose GameIndex is
+    game_index, or None if there is none, it was saved by an incompatible version or for different header conditions,
+    or the text it was built from has changed in any way other than by having text appended.
+    """
+    # Any failure to load the saved tree (e.g., one saved by another version of the package, whose classes or layout
+    # differ, or one that is truncated) only means that the tree is rebuilt
+    try:
+        with open(path_to_merged_tree_of(path_to_pgnfile), "rb") as merged_tree_file:
+            saved_tree = pickle.load(merged_tree_file)
+        if (saved_tree.get("version") != constants.MERGED_TREE_VERSION
+                or saved_tree["header_conditions"] != header_conditions
+                or saved_tree["prefix_fingerprint"] != game_index.fingerprint_of_prefix(saved_tree["text_length"])):
+            return None
+    except FileNotFoundError:
+        return None
+    except Exception as err:
+        print_nonfatal_error(f"Could not load the merged tree saved next to the PGN file, so it will be rebuilt.\n"
+                             f"{type(err).__name__}: {err}")
+        return None
+
+    # Re-registers the loaded nodes in the class-level sets that buildtree() populates as it creates nodes
+    for node_id, node in saved_tree["nodedict"].items():
+        GameNode.set_of_node_IDs.add(node_id)
+        if node.number_of_edges > 0:
+            GameNode.set_of_nonterminal_node_IDs.add(node_id)
+
+    return saved_tree
+
+
+def save_merged_tree(path_to_pgnfile, saved_tree, game_index):
+    """
+    Saves, next to the PGN file (whose GameIndex is game_index), the dictionary saved_tree, which has the keys:
+        version, header_conditions, text_length, prefix_fingerprint, number_of_games_indexed,
+        number_of_games_merged, nodedict, result_counts
+    """
+    saved_tree["version"] = constants.MERGED_TREE_VERSION
+    saved_tree["prefix_fingerprint"] = game_index.fingerprint_of_prefix(saved_tree["text_length"])
+    # Written to a temporary file that then replaces the saved tree, so that an interrupted save never leaves a partly
+    # written tree
+    path_to_merged_tree = path_to_merged_tree_of(path_to_pgnfile)
+    path_to_temporary_file = path_to_merged_tree.with_name(path_to_merged_tree.name + ".tmp")
+    try:
+        with open(path_to_temporary_file, "wb") as merged_tree_file:
+            pickle.dump(saved_tree, merged_tree_file, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(path_to_temporary_file, path_to_merged_tree)
+    except OSError as err:
+        path_to_temporary_file.unlink(missing_ok = True)
+        print_nonfatal_error(f"Could not save the merged tree next to the PGN file, so it will be rebuilt next time.\n"
+                             f"{err}")
+
+
+def load_or_update_merged_gametree_CLI_package(user_pgn_filepath, list_of_conditions, sort_alternatives_by = None):
+    """
+    Returns the 4-tuple (nodedict, result_counts, number of games merged, number of games newly merged) of the tree
+    into which every game of the PGN file at user_pgn_filepath satisfying every “Field=Value” condition of
+    list_of_conditions (every game, if list_of_conditions is empty) is merged, merging into the saved tree only the
+    games appended since it was saved. See the module docstring.
+    """
+    game_index = load_or_build_game_index_CLI_package(user_pgn_filepath)
+    header_conditions = parse_header_conditions(list_of_conditions, game_index)
+
+    saved_tree = load_merged_tree(user_pgn_filepath, header_conditions, game_index)
+    if saved_tree is None or saved_tree["number_of_games_indexed"] > game_index.number_of_games:
+        saved_tree = {"header_conditions": header_conditions,
+                      "number_of_games_indexed": 0,
+                      "number_of_games_merged": 0,
+                      "nodedict": None,
+                      "result_counts": ResultCounts()}
+
+    new_game_numbers = [game_number for game_number in game_index.game_numbers_where(header_conditions)
+                        if game_number > saved_tree["number_of_games_indexed"]]
+
+    # Games are parsed only now, and only the new ones
+    result_column = game_index.get_header_columns().columns[constants.RESULT_HEADER_FIELD]
+    pgn_source = PGNSource(False, user_pgn_filepath)
+    games_to_merge = ((clean_and_parse_string_read_from_file(game_string, pgn_source),
+                       result_column.value_of_game_at(game_number - 1))
+                      for game_number, game_string in zip(new_game_numbers,
+                                                          iterate_game_strings(user_pgn_filepath,
+                                                                               game_index,
+                                                                               new_game_numbers)))
+    result_counts = saved_tree["result_counts"]
+    nodedict = build_merged_gametree(games_to_merge, result_counts, saved_tree["nodedict"])
+
+    # (A newly started tree has no text_length, and so is always saved.)
+    do_save = new_game_numbers or saved_tree.get("text_length") != game_index.text_length
+    saved_tree["nodedict"] = nodedict
+    saved_tree["number_of_games_indexed"] = game_index.number_of_games
+    saved_tree["number_of_games_merged"] += len(new_game_numbers)
+    saved_tree["text_length"] = game_index.text_length
+    if do_save:
+        save_merged_tree(user_pgn_filepath, saved_tree, game_index)
+
+    result_counts.sort_alternatives_by = sort_alternatives_by
+    return nodedict, result_counts, saved_tree["number_of_games_merged"], len(new_game_numbers)
@@ -0,0 +1,127 @@
+"""
+Lazy, on-demand construction of the game tree.
+
+A user session typically visits only a tiny fraction of a large annotated PGN. Rather than build every node up front,
+build_lazy_gametree():
+    (a) makes a fast pre-scan of the cleaned movetext that records, using parenthesis depth, the span (start and end
+        index) of each top-level variation “( … )”,
+    (b) tokenizes and builds only the main line, recording each top-level variation as pending at the main-line node at
+        which it is an alternative, and
+    (c) returns a LazyNodeDict, which builds the pending variations of a node the first time that node is looked up
+        (e.g., by display_mainline_given_deviation_history() or by a “goto” path).
+
+Node IDs are assigned in the order in which nodes are built, and so differ from those assigned by buildtree(), but
+they are stable for the life of the LazyNodeDict.
+
+See generally pgn4people-poc/docs/game-tree-concepts.md
+"""
+
+from collections.abc import Mapping
+import re
+
+from . build_tree import (buildtree,
+                          grow_tree_from_tokens)
+from . classes_arboreal import VariationSpan
+from . process_pgn_file import tokenize_pgnstring
+
+PAREN_REGEX = re.compile(r"[()]")
+
+
+def tokenize_mainline_with_variation_spans(pgnstring):
+    """
+    Returns the token list of pgnstring (the cleaned movetext of a game; see clean_string_read_from_file()) in which
+    the tokens of each top-level variation are replaced by a single VariationSpan that records where that variation
+    lies in pgnstring. Only the main line is tokenized.
+
+    A “)” without a matching “(” is left in the main line, so that buildtree() reports it just as it would for an
+    eagerly built tree. A “(” that is never closed yields a variation running to the end of pgnstring.
+    """
+    mainline_tokens = []
+    depth = 0
+    start_of_mainline_segment = 0
+    start_of_variation = None
+
+    for match in PAREN_REGEX.finditer(pgnstring):
+        if match.group() == "(":
+            if depth == 0:
+                mainline_tokens.extend(tokenize_pgnstring(pgnstring[start_of_mainline_segment:match.start()]))
+                start_of_variation = match.start()
+            depth += 1
+        elif depth > 0:
+            depth -= 1
+            if depth == 0:
+                mainline_tokens.append(VariationSpan(start_of_variation, match.end()))
+                start_of_mainline_segment = match.end()
+        # else: An unmatched “)” in the main line remains part of the current main-line segment
+
+    if depth > 0:
+        mainline_tokens.append(VariationSpan(start_of_variation, len(pgnstring)))
+    else:
+        mainline_tokens.extend(tokenize_pgnstring(pgnstring[start_of_mainline_segment:]))
+
+    return mainline_tokens
+
+
+class LazyNodeDict(Mapping):
+    """
+    Read-only {node_id: GameNode} mapping that builds each top-level variation the first time the node at which it is
+    an alternative is looked up. See the module docstring.
+
+    Iterating over a LazyNodeDict, or taking its len(), first builds every pending variation, so that the reports see
+    the whole tree.
+    """
+
+
+    def __init__(self, pgnstring, gamenodes, pending_variations_of_node):
+        # The cleaned movetext, retained so that pending variations can be tokenized later
+        self.pgnstring = pgnstring
+        # {node_id: GameNode} of the nodes built so far
+        self.gamenodes = gamenodes
+        # {node_id: list of VariationSpan} of the variations not yet built, in the order in which they appear
+        self.pending_variations_of_node = pending_variations_of_node
+        self.next_node_id = max(gamenodes) + 1
+
+
+    def __getitem__(self, node_id):
+        node = self.gamenodes[node_id]
+        if node_id in self.pending_variations_of_node:
+            self.materialize_variations_of_node(node_id)
+        return node
+
+
+    def __iter__(self):
+        self.materialize_all()
+        return iter(self.gamenodes)
+
+
+    def __len__(self):
+        self.materialize_all()
+        return len(self.gamenodes)
+
+
+    def materialize_variations_of_node(self, node_id):
+        """
+        Builds, in order, each pending top-level variation at node node_id, thereby appending its alternatives to the
+        node’s .edgeslist.
+        """
+        for variation_span in self.pending_variations_of_node.pop(node_id):
+            tokenlist = tokenize_pgnstring(self.pgnstring[variation_span.start:variation_span.end])
+            self.next_node_id = grow_tree_from_tokens(self.gamenodes, tokenlist, node_id, self.next_node_id)
+
+
+    def materialize_all(self):
+        """
+        Builds every pending variation.
+        """
+        for node_id in list(self.pending_variations_of_node):
+            self.materialize_variations_of_node(node_id)
+
+
+def build_lazy_gametree(pgnstring):
+    """
+    Returns a LazyNodeDict for pgnstring, the cleaned movetext of a game (see clean_string_read_from_file()), in which
+    only the main line has yet been built.
+    """
+    pending_variations_of_node = {}
+    gamenodes = buildtree(tokenize_mainline_with_variation_spans(pgnstring), pending_variations_of_node)
+    return LazyNodeDict(pgnstring, gamenodes, pending_variations_of_node)
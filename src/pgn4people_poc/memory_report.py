@@ -0,0 +1,238 @@
+"""
+Report of the memory footprint of the built game tree, broken down by kind of object: the nodes, the edges, their edge
+lists, the movetext strings, the nodedict hash table, the class-level sets of node IDs of GameNode, and so on, each also
+expressed as bytes per node and per edge.
+
+The footprint is computed by sys.getsizeof() accounting: each object reachable from the tree is counted once (by id()),
+in the category in which it is first met, at its shallow size. (Thus, e.g., an integer that is both a node_id key and a
+.destination_node_id is counted once, as is a small integer that Python caches and shares with the rest of the program.)
+Objects of the program outside the tree (e.g., the tokens of the PGN) aren’t counted.
+
+Because the accounting visits every object of the tree, and its set of their id()s itself takes memory in proportion to
+the tree, the report is compiled only on request, by the “memreport” command, never as part of another report.
+
+The layouts of compress_tree.py and lazy_tree.py are accounted in their own terms: the unary chains and their index
+arrays; the not-yet-built variations (and the cleaned movetext retained to build them). A lazily built tree is reported
+as built so far, i.e., computing the footprint doesn’t build any pending variation. Of a tree stored in a SQLite
+database (see sqlite_tree.py), only the nodes in its page cache, which are all that it holds in memory, are reported.
+
+If tracemalloc is tracing (i.e., with --profile), a snapshot is also taken, and the memory still allocated by each
+module of the package (wherever it was allocated: e.g., the nodes where buildtree() created them) is reported.
+"""
+
+import os
+import sys
+import tracemalloc
+
+from yachalk import chalk
+
+from . classes_arboreal import GameNode
+from . compress_tree import CompressedNodeDict
+from . import constants
+from . lazy_tree import LazyNodeDict
+from . sqlite_tree import SQLiteNodeDict
+
+# Categories of the footprint, in the order in which they are reported
+CATEGORY_NODES = "nodes"
+CATEGORY_EDGES = "edges"
+CATEGORY_EDGE_LISTS = "edge lists"
+CATEGORY_MOVETEXT_LOOKUPS = "movetext lookup dicts"
+CATEGORY_MOVETEXT_STRINGS = "movetext strings"
+CATEGORY_INTEGERS = "integers"
+CATEGORY_NODEDICT = "nodedict hash table"
+CATEGORY_CHAINS = "unary chains"
+CATEGORY_CHAIN_INDEXES = "chain index arrays"
+CATEGORY_PENDING_VARIATIONS = "unbuilt variations"
+CATEGORY_CLASS_LEVEL_SETS = "class-level ID sets"
+ORDER_OF_CATEGORIES = (CATEGORY_NODES,
+                       CATEGORY_EDGES,
+                       CATEGORY_EDGE_LISTS,
+                       CATEGORY_MOVETEXT_LOOKUPS,
+                       CATEGORY_MOVETEXT_STRINGS,
+                       CATEGORY_INTEGERS,
+                       CATEGORY_NODEDICT,
+                       CATEGORY_CHAINS,
+                       CATEGORY_CHAIN_INDEXES,
+                       CATEGORY_PENDING_VARIATIONS,
+                       CATEGORY_CLASS_LEVEL_SETS)
+
+
+class MemoryAccount:
+    """
+    Running tally, by category, of the number and total shallow size of the objects accounted so far.
+
+    Object attributes:
+        number_of_objects: Dictionary {category: number of objects}
+        number_of_bytes: Dictionary {category: total sys.getsizeof() of those objects}
+        ids_of_accounted_objects: Set of the id() of every object accounted so far, so that none is counted twice
+    """
+
+    __slots__ = ("number_of_objects", "number_of_bytes", "ids_of_accounted_objects")
+
+
+    def __init__(self):
+        self.number_of_objects = dict.fromkeys(ORDER_OF_CATEGORIES, 0)
+        self.number_of_bytes = dict.fromkeys(ORDER_OF_CATEGORIES, 0)
+        self.ids_of_accounted_objects = set()
+
+
+    def add(self, category, an_object):
+        """
+        Adds an_object to category, unless it is None or has already been accounted.
+        """
+        if an_object is None or id(an_object) in self.ids_of_accounted_objects:
+            return
+        self.ids_of_accounted_objects.add(id(an_object))
+        self.number_of_objects[category] += 1
+        self.number_of_bytes[category] += sys.getsizeof(an_object)
+
+
+def account_for_gamenode(account, node_id, node):
+    """
+    Adds to account node (whose node_id is node_id) and everything it alone refers to: its edges, its edge list, its
+    movetext lookup dictionary (if any), their movetexts, and the integers they hold.
+    """
+    account.add(CATEGORY_NODES, node)
+    for integer in (node_id, node.halfmovenumber, node.depth, node.originatingnode_id,
+                    node.choice_id_at_originatingnode, node.number_of_edges):
+        account.add(CATEGORY_INTEGERS, integer)
+
+    account.add(CATEGORY_EDGE_LISTS, node.edgeslist)
+    for edge in node.edgeslist:
+        account.add(CATEGORY_EDGES, edge)
+        account.add(CATEGORY_MOVETEXT_STRINGS, edge.movetext)
+        account.add(CATEGORY_INTEGERS, edge.destination_node_id)
+        account.add(CATEGORY_INTEGERS, edge.reference_index)
+
+    if node.edges_by_movetext is not None:
+        account.add(CATEGORY_MOVETEXT_LOOKUPS, node.edges_by_movetext)
+        for normalized_movetext in node.edges_by_movetext:
+            account.add(CATEGORY_MOVETEXT_STRINGS, normalized_movetext)
+
+
+def compute_memory_footprint(nodedict):
+    """
+    Returns the memory footprint of the tree nodedict (a dict, CompressedNodeDict, LazyNodeDict, or SQLiteNodeDict) as
+    the dictionary:
+        number_of_nodes: Number of nodes (for a LazyNodeDict, built so far; for a SQLiteNodeDict, in its page cache)
+        number_of_edges: Number of edges of those nodes
+        categories: Dictionary {category: {"objects": number of objects, "bytes": their total size}}, in the order of
+            ORDER_OF_CATEGORIES, of only the categories with at least one object
+        total_bytes: Total size of all the categories
+        traced_bytes_by_module: See traced_memory_by_module()
+
+    See the module docstring.
+    """
+    # The snapshot is taken first, so that it doesn’t include the accounting itself
+    traced_bytes_by_module = traced_memory_by_module()
+    account = MemoryAccount()
+
+    # The {node_id: GameNode} dictionaries in which the nodes (or, if compressed, the explicit nodes) are stored
+    if isinstance(nodedict, CompressedNodeDict):
+        dictionaries_of_gamenodes = [nodedict.explicit_nodes]
+    elif isinstance(nodedict, LazyNodeDict):
+        dictionaries_of_gamenodes = [nodedict.gamenodes]
+    elif isinstance(nodedict, SQLiteNodeDict):
+        account.add(CATEGORY_NODEDICT, nodedict.pages)
+        dictionaries_of_gamenodes = list(nodedict.pages.values())
+    else:
+        dictionaries_of_gamenodes = [nodedict]
+    if not isinstance(nodedict, dict):
+        account.add(CATEGORY_NODEDICT, nodedict)
+
+    number_of_nodes = 0
+    number_of_edges = 0
+    for gamenodes in dictionaries_of_gamenodes:
+        account.add(CATEGORY_NODEDICT, gamenodes)
+        number_of_nodes += len(gamenodes)
+        for node_id, node in gamenodes.items():
+            account_for_gamenode(account, node_id, node)
+            number_of_edges += node.number_of_edges
+
+    if isinstance(nodedict, CompressedNodeDict):
+        account.add(CATEGORY_CHAINS, nodedict.chains)
+        for chain in nodedict.chains:
+            for part_of_chain in (chain, chain.node_ids, chain.packed_movetexts, chain.movetext_offsets):
+                account.add(CATEGORY_CHAINS, part_of_chain)
+            # Each member of a chain is a node with exactly one edge
+            number_of_nodes += len(chain.node_ids)
+            number_of_edges += len(chain.node_ids)
+        account.add(CATEGORY_CHAIN_INDEXES, nodedict.chain_index_of_node)
+        account.add(CATEGORY_CHAIN_INDEXES, nodedict.position_in_chain)
+
+    if isinstance(nodedict, LazyNodeDict):
+        account.add(CATEGORY_PENDING_VARIATIONS, nodedict.pgnstring)
+        account.add(CATEGORY_PENDING_VARIATIONS, nodedict.pending_variations_of_node)
+        for variation_spans in nodedict.pending_variations_of_node.values():
+            account.add(CATEGORY_PENDING_VARIATIONS, variation_spans)
+            for variation_span in variation_spans:
+                account.add(CATEGORY_PENDING_VARIATIONS, variation_span)
+
+    # The class-level sets hold the node IDs of every tree built in this session, not only of nodedict.
+    # (set_of_terminal_node_IDs exists only once characterize_gametree() has run.)
+    for set_of_IDs in (GameNode.set_of_node_IDs,
+                       GameNode.set_of_nonterminal_node_IDs,
+                       getattr(GameNode, "set_of_terminal_node_IDs", None)):
+        if set_of_IDs is None:
+            continue
+        account.add(CATEGORY_CLASS_LEVEL_SETS, set_of_IDs)
+        for node_id in set_of_IDs:
+            account.add(CATEGORY_INTEGERS, node_id)
+
+    categories = {category: {"objects": account.number_of_objects[category],
+                             "bytes": account.number_of_bytes[category]}
+                  for category in ORDER_OF_CATEGORIES if account.number_of_objects[category] > 0}
+    return {"number_of_nodes": number_of_nodes,
+            "number_of_edges": number_of_edges,
+            "categories": categories,
+            "total_bytes": sum(category["bytes"] for category in categories.values()),
+            "traced_bytes_by_module": traced_bytes_by_module}
+
+
+def traced_memory_by_module():
+    """
+    If tracemalloc is tracing, takes a snapshot and returns the list, largest first, of at most
+    constants.MEMORY_REPORT_NUMBER_OF_MODULES dictionaries {"module", "bytes", "blocks"}, one for each module of this
+    package, of the memory still allocated by that module’s code; otherwise returns None.
+    """
+    if not tracemalloc.is_tracing():
+        return None
+    package_directory = os.path.dirname(os.path.abspath(__file__))
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True,
+                                                                             os.path.join(package_directory, "*"))])
+    return [{"module": os.path.basename(statistic.traceback[0].filename),
+             "bytes": statistic.size,
+             "blocks": statistic.count}
+            for statistic in snapshot.statistics("filename")[:constants.MEMORY_REPORT_NUMBER_OF_MODULES]]
+
+
+def output_memory_report(footprint):
+    """
+    Prints footprint, as returned by compute_memory_footprint(): for each category, the number of objects, their total
+    size, and that size per node and per edge.
+    """
+    number_of_nodes = footprint["number_of_nodes"]
+    number_of_edges = footprint["number_of_edges"]
+
+    def per(number_of_bytes, number_of_items):
+        return f"{number_of_bytes / number_of_items:.1f}" if number_of_items else "-"
+
+    print(chalk.magenta("\nMEMORY FOOTPRINT OF THIS GAME TREE\n"))
+    print(f"{number_of_nodes:,} positions and {number_of_edges:,} edges (sizes by sys.getsizeof(), in bytes)\n")
+    width = constants.MEMORY_REPORT_CATEGORY_WIDTH
+    print(f"{'Category':<{width}} {'Objects':>9} {'Bytes':>13} {'Per node':>9} {'Per edge':>9}")
+    rows = list(footprint["categories"].items())
+    rows.append(("TOTAL", {"objects": sum(category["objects"] for category in footprint["categories"].values()),
+                           "bytes": footprint["total_bytes"]}))
+    for category, sizes in rows:
+        print(f"{category:<{width}} {sizes['objects']:>9,} {sizes['bytes']:>13,} "
+              f"{per(sizes['bytes'], number_of_nodes):>9} {per(sizes['bytes'], number_of_edges):>9}")
+
+    traced_bytes_by_module = footprint["traced_bytes_by_module"]
+    if traced_bytes_by_module is None:
+        print("\n(Run with --profile to also see the memory allocated by each module, as traced by tracemalloc.)")
+        return
+    print("\nMEMORY STILL ALLOCATED BY EACH MODULE (traced by tracemalloc)")
+    print(f"{'Module':<{width}} {'Blocks':>9} {'Bytes':>13}")
+    for traced in traced_bytes_by_module:
+        print(f"{traced['module']:<{width}} {traced['blocks']:>9,} {traced['bytes']:>13,}")
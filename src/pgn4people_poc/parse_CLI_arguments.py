@@ -0,0 +1,280 @@
+"""
+Defines and parses the command-line arguments of the pgn4people entry point.
+"""
+
+import argparse
+import pathlib
+import sys
+
+from . import constants
+
+
+def parse_CLI_arguments():
+    """
+    Parses the command line and returns the resulting argparse.Namespace.
+
+    If the first argument is “diff”, the command line is parsed as `pgn4people diff old.pgn new.pgn`, and the namespace
+    has command == constants.DIFF_COMMAND and attributes old_pgn_filepath and new_pgn_filepath.
+
+    Otherwise, command is None. The sole positional argument, user_textfile_path, is the (optional) path to a
+    user-supplied PGN file. If it is absent, user_textfile_path is None and the built-in sample PGN is used.
+    """
+
+    # argparse can’t combine an optional positional argument with subcommands, so the diff subcommand is recognized here
+    if sys.argv[1:2] == [constants.DIFF_COMMAND]:
+        return parse_CLI_arguments_for_diff()
+
+    parser = argparse.ArgumentParser(description=constants.HELP_DESCRIPTION, epilog=constants.HELP_EPILOG)
+
+    # Defines argument
+    #   nargs='?': One argument will be consumed from the command line if possible, and produced as a single item.
+    #       If no command-line argument is present, the value from default will be produced.
+    #   type=pathlib.Path: returns a pathlib.Path object, which supports the open() method.
+    parser.add_argument('user_textfile_path', nargs='?', default=None, type=pathlib.Path)
+
+    parser.add_argument('--compress',
+                        action='store_true',
+                        help=("Store each chain of single-move positions (e.g., a forced main-line sequence) as one "
+                              "compact record. Uses less memory on deep trees."))
+
+    parser.add_argument('--share-subtrees',
+                        action='store_true',
+                        help=("Store each repeated, identical sub-variation only once (useful for annotated files in "
+                              "which the same sub-variation is pasted under several parents)."))
+
+    parser.add_argument('--lazy',
+                        action='store_true',
+                        help=("Build only the main line up front, and build each top-level variation when it is first "
+                              "reached. Shortens the time to the first table for very large files."))
+
+    parser.add_argument('--game',
+                        type=int,
+                        metavar='N',
+                        help=("View game N (counting from 1) of a multi-game PGN file. Uses a game index saved next to "
+                              "the file, so that any game opens without scanning the file."))
+
+    parser.add_argument('--game-where',
+                        action='append',
+                        metavar='FIELD=VALUE',
+                        help=("View the first game whose header FIELD has VALUE, e.g., --game-where White=\"Carlsen, "
+                              "Magnus\". May be repeated; all conditions must hold."))
+
+    parser.add_argument('--filter',
+                        action='append',
+                        metavar='FIELD=VALUE',
+                        help=("Merge into one tree every game whose header FIELD has VALUE, e.g., --filter ECO=B90 "
+                              "--filter Result=1-0. May be repeated; all conditions must hold. The moves of other "
+                              "games are never read."))
+
+    parser.add_argument('--sort-alternatives',
+                        choices=[constants.SORT_BY_GAMES, constants.SORT_BY_SCORE],
+                        help=("With --filter, sort each player’s alternatives by the number of games that played them, "
+                              "or by the score those games achieved for that player."))
+
+    parser.add_argument('--prune-depth',
+                        type=int,
+                        metavar='N',
+                        help=("Drop every variation that is more than N deviations from the main line (0 keeps only "
+                              "the main line)."))
+
+    parser.add_argument('--prune-length',
+                        type=int,
+                        metavar='N',
+                        help="Drop every move after the Nth halfmove of each line.")
+
+    parser.add_argument('--prune-min-games',
+                        type=int,
+                        metavar='N',
+                        help=("With --filter or --incremental, drop every move (and what follows it) played in fewer "
+                              "than N of the merged games."))
+
+    parser.add_argument('--incremental',
+                        action='store_true',
+                        help=("Merge the games selected by --filter (or, without --filter, every game) into one tree, "
+                              "save that tree next to the PGN file, and on later runs merge into it only the games "
+                              "appended to the file since."))
+
+    parser.add_argument('--watch',
+                        action='store_true',
+                        help=("Watch the PGN file while you explore, and rebuild the tree whenever the file changes "
+                              "(e.g., when you save it in another program), keeping your place if that line still "
+                              "exists."))
+
+    parser.add_argument('--batch',
+                        metavar='FILE',
+                        help=("Instead of exploring interactively, carry out the commands (e.g., “12 W b”, “reset”, "
+                              "“report”) in FILE, one per line (“-” for standard input), and write each resulting "
+                              "table to standard output, with the time the command took."))
+
+    parser.add_argument('--output-format',
+                        choices=[constants.BATCH_OUTPUT_PLAIN, constants.BATCH_OUTPUT_JSON],
+                        default=constants.BATCH_OUTPUT_PLAIN,
+                        help=("With --batch, write each result as plain text (the default) or as one line of JSON."))
+
+    parser.add_argument('--export-lines',
+                        metavar='FILE',
+                        help=("Instead of exploring interactively, write every line of the tree (every path from the "
+                              "initial position to the end of a variation) to FILE (“-” for standard output)."))
+
+    parser.add_argument('--export-format',
+                        choices=[constants.EXPORT_FORMAT_TEXT, constants.EXPORT_FORMAT_JSONL],
+                        default=constants.EXPORT_FORMAT_TEXT,
+                        help=("With --export-lines, write each line as PGN-style text (the default) or as one line of "
+                              "JSON."))
+
+    parser.add_argument('--export-tables',
+                        action='store_true',
+                        help="With --export-lines, also write the variations table of each line.")
+
+    parser.add_argument('--render-tables',
+                        metavar='DIRECTORY',
+                        help=("Instead of exploring interactively, write the variations table of every line of the "
+                              "tree to its own file in DIRECTORY, using several processes in parallel."))
+
+    parser.add_argument('--render-from',
+                        metavar='MOVES',
+                        help=("With --render-tables, render only the lines through the position reached by MOVES, "
+                              "e.g., --render-from \"e4 c5 Nf3\"."))
+
+    parser.add_argument('--workers',
+                        type=int,
+                        metavar='N',
+                        help="With --render-tables, the number of worker processes (by default, one per CPU).")
+
+    parser.add_argument('--write-pgn',
+                        metavar='FILE',
+                        help=("Instead of exploring interactively, write the tree (e.g., the games merged by --filter) "
+                              "as one PGN game to FILE (“-” for standard output)."))
+
+    parser.add_argument('--sqlite-export',
+                        metavar='FILE',
+                        help=("Instead of exploring interactively, write the tree (with the results of any merged "
+                              "games) to a SQLite database FILE, which --sqlite can then explore."))
+
+    parser.add_argument('--sqlite',
+                        metavar='FILE',
+                        help=("Explore the tree stored in the SQLite database FILE by --sqlite-export, instead of "
+                              "reading a PGN file. Reads positions from the database as they are needed, so that even "
+                              "a tree too large for memory can be explored."))
+
+    parser.add_argument('--table-cache-entries',
+                        type=int,
+                        metavar='N',
+                        default=constants.TABLE_CACHE_MAX_ENTRIES,
+                        help=("Keep the variations tables of up to N recently shown lines, so that returning to one of "
+                              f"them is immediate (default {constants.TABLE_CACHE_MAX_ENTRIES}; 0 switches the cache "
+                              "off)."))
+
+    parser.add_argument('--table-cache-mib',
+                        type=int,
+                        metavar='MIB',
+                        default=constants.TABLE_CACHE_MAX_MEBIBYTES,
+                        help=("Keep at most MIB mebibytes of recently shown variations tables (default "
+                              f"{constants.TABLE_CACHE_MAX_MEBIBYTES})."))
+
+    parser.add_argument('--no-prefetch',
+                        action='store_true',
+                        help=("Don’t prepare, while waiting for your choice, the tables of the alternatives shown "
+                              "(which are otherwise kept in the table cache, so that the one you choose is shown at "
+                              "once)."))
+
+    parser.add_argument('--profile',
+                        action='store_true',
+                        help=("Measure the time, memory, and counts of tokens, nodes, and edges of each stage of "
+                              "reading and building the tree, and of each command, and print a summary on exit. "
+                              f"(Also switched on by setting the environment variable "
+                              f"{constants.PROFILE_ENVIRONMENT_VARIABLE}.)"))
+
+    parser.add_argument('--profile-json',
+                        metavar='FILE',
+                        help="Like --profile, and also write the summary to FILE as JSON.")
+
+    parser.add_argument('--trace',
+                        metavar='FILE',
+                        help=("Write a span for each stage of reading and building the tree, for each game merged, and "
+                              "for each table and command to FILE, in the Chrome Trace Event format, which "
+                              "chrome://tracing and speedscope open."))
+
+    args = parser.parse_args()
+    args.command = None
+
+    if args.output_format != constants.BATCH_OUTPUT_PLAIN and args.batch is None:
+        parser.error("--output-format requires --batch.")
+    if (args.export_format != constants.EXPORT_FORMAT_TEXT or args.export_tables) and args.export_lines is None:
+        parser.error("--export-format and --export-tables require --export-lines.")
+    number_of_outputs_instead_of_exploring = ((args.batch is not None) + args.watch + (args.export_lines is not None)
+                                              + (args.render_tables is not None) + (args.write_pgn is not None)
+                                              + (args.sqlite_export is not None))
+    if number_of_outputs_instead_of_exploring > 1:
+        parser.error("Only one of --batch, --watch, --export-lines, --render-tables, --write-pgn, and --sqlite-export "
+                     "may be given.")
+    if (args.render_from is not None or args.workers is not None) and args.render_tables is None:
+        parser.error("--render-from and --workers require --render-tables.")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1.")
+    if args.table_cache_entries < 0 or args.table_cache_mib < 0:
+        parser.error("--table-cache-entries and --table-cache-mib must not be negative.")
+    # Lines are enumerated, and a database is navigated, by climbing from each node to its unique originating node
+    if (args.export_lines is not None or args.render_tables is not None or args.sqlite_export is not None) \
+            and args.share_subtrees:
+        parser.error("--export-lines, --render-tables, and --sqlite-export cannot be combined with --share-subtrees.")
+
+    if args.watch and args.user_textfile_path is None:
+        parser.error("--watch requires the path of a PGN file.")
+
+    number_of_game_selections = (args.game is not None) + bool(args.game_where) + bool(args.filter or args.incremental)
+    if number_of_game_selections and args.user_textfile_path is None:
+        parser.error("--game, --game-where, --filter, and --incremental require the path of a PGN file.")
+    if number_of_game_selections > 1:
+        parser.error("Only one of --game, --game-where, and --filter (or --incremental) may be given.")
+
+    # Compressing or sharing subtrees must visit every node, which would defeat building the tree lazily
+    if args.lazy and (args.compress or args.share_subtrees):
+        parser.error("--lazy cannot be combined with --compress or --share-subtrees.")
+    if args.lazy and (args.filter or args.incremental):
+        parser.error("--lazy cannot be combined with --filter or --incremental.")
+    # Results are counted per path, which sharing identical subtrees would conflate
+    if args.share_subtrees and (args.filter or args.incremental):
+        parser.error("--share-subtrees cannot be combined with --filter or --incremental.")
+    if args.sort_alternatives and not (args.filter or args.incremental or args.sqlite):
+        parser.error("--sort-alternatives requires --filter, --incremental, or --sqlite.")
+
+    for option, value in (("--prune-depth", args.prune_depth),
+                          ("--prune-length", args.prune_length),
+                          ("--prune-min-games", args.prune_min_games)):
+        if value is not None and value < 0:
+            parser.error(f"{option} must not be negative.")
+    # Results are counted only for merged games
+    if args.prune_min_games is not None and not (args.filter or args.incremental):
+        parser.error("--prune-min-games requires --filter or --incremental.")
+    # Pruning must visit every node, which would defeat building the tree lazily
+    if args.lazy and (args.prune_depth is not None or args.prune_length is not None):
+        parser.error("--lazy cannot be combined with --prune-depth or --prune-length.")
+
+    # A tree stored in a database is explored as it was stored
+    if args.sqlite is not None:
+        if args.user_textfile_path is not None:
+            parser.error("--sqlite cannot be combined with the path of a PGN file.")
+        if (args.lazy or args.compress or args.share_subtrees or args.watch or args.sqlite_export is not None
+                or args.prune_depth is not None or args.prune_length is not None or args.prune_min_games is not None):
+            parser.error("--sqlite cannot be combined with --lazy, --compress, --share-subtrees, --prune-depth, "
+                         "--prune-length, --prune-min-games, --watch, or --sqlite-export.")
+
+    return args
+
+
+def parse_CLI_arguments_for_diff():
+    """
+    Parses the command line `pgn4people diff old.pgn new.pgn` and returns the resulting argparse.Namespace.
+    """
+
+    parser = argparse.ArgumentParser(prog=f"{constants.entry_point_name} {constants.DIFF_COMMAND}",
+                                     description=constants.HELP_DESCRIPTION_DIFF,
+                                     epilog=constants.HELP_EPILOG)
+    parser.add_argument('old_pgn_filepath', type=pathlib.Path, help="Path to the old version of the PGN file")
+    parser.add_argument('new_pgn_filepath', type=pathlib.Path, help="Path to the new version of the PGN file")
+
+    args = parser.parse_args(sys.argv[2:])
+    args.command = constants.DIFF_COMMAND
+
+    return args
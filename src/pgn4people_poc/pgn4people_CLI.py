@@ -3,18 +3,55 @@ Module Docstring
 """
 
 
-from . build_tree import buildtree
+from . batch_mode import run_batch_commands_CLI_package
+from . build_tree import (build_merged_gametree,
+                          buildtree)
+from . compress_tree import compress_gametree
 from . import constants
 from . compile_and_output_report import (characterize_gametree,
                                          output_GameTreeReport,
                                          output_node_report)
+from . diff_trees import output_diff_of_pgn_files
+from . export_lines import export_lines_CLI_package
 from . construct_output import print_header_for_variations_table
-from . get_process_user_CLI_input import (get_node_id_move_choice_for_next_line_to_display,
-                                          target_node_id_from_user_input)
-from . process_pgn_file import (get_string_read_from_file_CLI_package,
-                                clean_and_parse_string_read_from_file)
-from . traverse_tree import (deviation_history_of_node,
-                             display_mainline_given_deviation_history)
+from . parse_CLI_arguments import parse_CLI_arguments
+from . get_process_user_CLI_input import (enable_tab_completion_of_movetext,
+                                          get_node_id_move_choice_for_next_line_to_display,
+                                          position_after_navigation_command)
+from . error_processing import (fatal_error_exit_without_traceback,
+                                print_nonfatal_error)
+from . game_index import (describe_selection_of_games,
+                          get_game_strings_matching_filter_CLI_package,
+                          get_string_of_selected_game_CLI_package)
+from . incremental_tree import load_or_update_merged_gametree_CLI_package
+from . lazy_tree import build_lazy_gametree
+from . memory_report import (compute_memory_footprint,
+                             output_memory_report)
+from . prefetch_tables import TablePrefetcher
+from . prune_tree import prune_gametree
+from . process_pgn_file import (PGNSource,
+                                get_string_read_from_file_CLI_package,
+                                clean_and_parse_string_read_from_file,
+                                clean_string_read_from_file)
+from . render_context import RenderContext
+from . render_tables import render_tables_CLI_package
+from . result_counts import ResultCounts
+from . share_subtrees import share_identical_subtrees
+from . table_cache import create_table_cache_CLI_package
+from . sqlite_tree import (export_gametree_to_sqlite_CLI_package,
+                           open_sqlite_gametree_CLI_package)
+from . pgn_utilities import format_movetext_path
+from . profiling import (count_in_profile,
+                         enable_profiling_CLI_package,
+                         is_profiling,
+                         profile_stage)
+from . traverse_tree import (display_mainline_given_deviation_history,
+                             follow_movetext_path,
+                             movetext_path_given_deviation_history,
+                             node_id_from_movetext_path)
+from . utilities import wait_for_any_user_input
+from . watch_pgn_file import PGNFileWatcher
+from . write_pgn import write_pgn_CLI_package
 
 
 def main():
@@ -25,61 +62,245 @@ def main():
     """
 
 
-    # Get string of PGN from either (a) file specified by user in command line or (b) a built-in PGN file,
-    string_read_from_file, pgn_source = get_string_read_from_file_CLI_package()
+    args = parse_CLI_arguments()
 
-    # Grab the movetext from game #1 by stripping headers and stripping textual annotations; then tokenize that string.
-    tokenlist = clean_and_parse_string_read_from_file(string_read_from_file, pgn_source)
+    # (The diff command has no profiling options)
+    if args.command == constants.DIFF_COMMAND:
+        output_diff_of_pgn_files(args.old_pgn_filepath, args.new_pgn_filepath)
+        return
 
-    # Builds tree from pgn file
-    nodedict = buildtree(tokenlist)
+    # Measures the stages of the pipeline and each command, if requested; the summary is output when the program exits
+    enable_profiling_CLI_package(args.profile, args.profile_json, args.trace)
 
-    fullmovenummber_to_node_id_lookup_table = {}
+    nodedict, result_counts, pgn_source = build_gametree_from_CLI_arguments(args)
 
-    examples_command_triples_white = []
-    examples_command_triples_black = []
+    # Recently shown tables, so that returning to a line doesn’t compile its table again (None if switched off)
+    table_cache = create_table_cache_CLI_package(args.table_cache_entries, args.table_cache_mib)
 
-    # Starts by showing the main line
-    target_node_id = 0
+    if args.batch is not None:
+        run_batch_commands_CLI_package(args.batch, nodedict, result_counts, args.output_format, table_cache)
+        return
+    if args.export_lines is not None:
+        export_lines_CLI_package(args.export_lines, nodedict, args.export_format, args.export_tables, result_counts)
+        return
+    if args.render_tables is not None:
+        render_tables_CLI_package(args.render_tables, nodedict, args.render_from, result_counts, args.workers)
+        return
+    if args.write_pgn is not None:
+        write_pgn_CLI_package(args.write_pgn, nodedict)
+        return
+    if args.sqlite_export is not None:
+        with profile_stage("export_gametree_to_sqlite"):
+            export_gametree_to_sqlite_CLI_package(args.sqlite_export, nodedict, result_counts)
+        return
+
+    # In watch mode, the tree is rebuilt in the background whenever the PGN file changes
+    if args.watch:
+        pgn_file_watcher = PGNFileWatcher(args.user_textfile_path, lambda: build_gametree_from_CLI_arguments(args))
+        pgn_file_watcher.start()
+    else:
+        pgn_file_watcher = None
+    # Message about the rebuilt tree, to be shown below the next table
+    watch_notice = None
+
+    # Lets <TAB> complete moves when the user navigates with “goto e4 c5 …”
+    enable_tab_completion_of_movetext(nodedict)
+
+    # While the user chooses, prepares in the background the tables of the alternatives shown
+    if table_cache is not None and not args.no_prefetch:
+        table_prefetcher = TablePrefetcher(table_cache)
+    else:
+        table_prefetcher = None
+
+    # The position shown, and everything else that changes from one table to the next; starts with the main line
+    render_context = RenderContext()
 
     #  Traverses the tree and displays the variations table to the console
+    # The deviation history required to achieve target_node_id is carried forward from one choice to the next (rather
+    # than recomputed backward from target_node_id), so that navigation also works once identical subtrees are shared.
     do_keep_exploring = True
     while do_keep_exploring: 
-        # Computes the deviation history required to achieve the specified target_node_id
-        deviation_history = deviation_history_of_node(nodedict, target_node_id)
+        if pgn_file_watcher is not None:
+            rebuilt_gametree = pgn_file_watcher.take_rebuilt_gametree()
+            if rebuilt_gametree is not None:
+                # Swaps in the rebuilt tree, and finds the current line in it by its moves (node_ids differ between
+                # trees). If the line no longer exists in full, its longest surviving beginning is shown instead.
+                movetext_path = movetext_path_given_deviation_history(nodedict,
+                                                                      render_context.deviation_history,
+                                                                      render_context.target_node_id)
+                nodedict, result_counts, pgn_source = rebuilt_gametree
+                if table_cache is not None:
+                    table_cache.clear()
+                enable_tab_completion_of_movetext(nodedict)
+                _, number_of_movetexts_matched = node_id_from_movetext_path(nodedict, movetext_path)
+                render_context.target_node_id, render_context.deviation_history = \
+                    follow_movetext_path(nodedict, movetext_path[:number_of_movetexts_matched])
+                if number_of_movetexts_matched == len(movetext_path):
+                    watch_notice = "The tree was rebuilt from the changed PGN file."
+                else:
+                    watch_notice = (f"The tree was rebuilt from the changed PGN file, which no longer has the line "
+                                    f"{format_movetext_path(movetext_path)}.")
 
-        print_header_for_variations_table(target_node_id, deviation_history, pgn_source)
+        with profile_stage("render table"):
+            print_header_for_variations_table(render_context.target_node_id,
+                                              render_context.deviation_history,
+                                              pgn_source)
 
-        # Displays to console the new mainline and first halfmove of each deviation from this new mainline
-        display_mainline_given_deviation_history(nodedict,
-                                                 deviation_history,
-                                                 fullmovenummber_to_node_id_lookup_table,
-                                                 examples_command_triples_white,
-                                                 examples_command_triples_black)
+            # Displays to console the new mainline and first halfmove of each deviation from this new mainline
+            display_mainline_given_deviation_history(nodedict, render_context, result_counts, table_cache)
+        if watch_notice is not None:
+            print_nonfatal_error(watch_notice)
+            watch_notice = None
         
         # Seeks user’s desire of what line to explore next and computes next target_node_id
-        node_id_chosen, move_choice = \
-            get_node_id_move_choice_for_next_line_to_display(fullmovenummber_to_node_id_lookup_table,
-                                                             examples_command_triples_white,
-                                                             examples_command_triples_black)
+        if table_prefetcher is not None:
+            table_prefetcher.start(nodedict, render_context, result_counts)
+        try:
+            with profile_stage("input wait"):
+                node_id_chosen, move_choice = get_node_id_move_choice_for_next_line_to_display(
+                    render_context.fullmovenummber_to_node_id_lookup_table,
+                    render_context.examples_command_triples_white,
+                    render_context.examples_command_triples_black,
+                    nodedict)
+        finally:
+            # Nothing is prefetched from the tree once the user has chosen (e.g., after it is replaced in watch mode)
+            if table_prefetcher is not None:
+                table_prefetcher.stop()
         if node_id_chosen != constants.STOP_SIGN:
-            if node_id_chosen == constants.RESET_COMMAND:
-                target_node_id = constants.INITIAL_NODE_ID
-                print("Tree reset to original starting point.")
-            elif node_id_chosen == constants.REPORT_COMMAND:
-                characterize_gametree(nodedict)
-                output_GameTreeReport()
-            elif node_id_chosen == constants.NODEREPORT_COMMAND:
-                output_node_report(nodedict)
-            else:
-                # Translates user input of node/edge to the implied detination node
-                target_node_id = target_node_id_from_user_input(nodedict, node_id_chosen, move_choice)
+            # (The time spent waiting for the user to dismiss a report isn’t included in the command’s stage.)
+            name_of_command = node_id_chosen if isinstance(node_id_chosen, str) else "choice"
+            with profile_stage(f"command {name_of_command}"):
+                if node_id_chosen == constants.REPORT_COMMAND:
+                    characterize_gametree(nodedict)
+                    output_GameTreeReport(do_wait_for_user=False)
+                elif node_id_chosen == constants.NODEREPORT_COMMAND:
+                    output_node_report(nodedict, do_wait_for_user=False)
+                elif node_id_chosen == constants.MEMREPORT_COMMAND:
+                    output_memory_report(compute_memory_footprint(nodedict))
+                elif node_id_chosen == constants.REFRESH_COMMAND:
+                    # The table is displayed again (with any rebuilt tree) at the top of the loop
+                    pass
+                else:
+                    # Translates reset, goto, or user input of node/edge to the implied destination node and deviation
+                    # history
+                    with profile_stage("deviation history"):
+                        position_after_navigation_command(nodedict, render_context, node_id_chosen, move_choice)
+                    if node_id_chosen == constants.RESET_COMMAND:
+                        print("Tree reset to original starting point.")
+            if node_id_chosen in (constants.REPORT_COMMAND,
+                                  constants.NODEREPORT_COMMAND,
+                                  constants.MEMREPORT_COMMAND):
+                with profile_stage("input wait"):
+                    wait_for_any_user_input()
         else:
             do_keep_exploring = False
+            if pgn_file_watcher is not None:
+                pgn_file_watcher.stop()
             print("You have told me to stop 🛑. I obey.")
     # End of while keep_exploring
 
 
+
+def build_gametree_from_CLI_arguments(args):
+    """
+    Reads and parses the PGN game(s) chosen by the command-line arguments args, and builds the game tree as they direct.
+
+    Returns the 3-tuple (nodedict, result_counts, pgn_source), where result_counts is the ResultCounts of the merged
+    games, or None if games were not merged.
+    """
+
+    # Results of the merged games, counted per move; None unless games are merged
+    result_counts = None
+
+    if args.sqlite is not None:
+        # Positions are read from the database as they are needed
+        nodedict, result_counts = open_sqlite_gametree_CLI_package(args.sqlite, args.sort_alternatives)
+        return nodedict, result_counts, PGNSource(False, args.sqlite, "SQLite database")
+
+    if args.incremental:
+        # Loads the saved merged tree, merging into it only the selected games appended to the file since it was saved
+        with profile_stage("load_or_update_merged_gametree"):
+            nodedict, result_counts, number_of_games, number_of_new_games = \
+                load_or_update_merged_gametree_CLI_package(args.user_textfile_path,
+                                                           args.filter or [],
+                                                           args.sort_alternatives)
+        count_in_profile("games merged", number_of_games)
+        if number_of_games == 0:
+            fatal_error_exit_without_traceback(f"No game in “{args.user_textfile_path.name}” was selected.")
+        pgn_source = PGNSource(False,
+                               args.user_textfile_path,
+                               describe_selection_of_games(number_of_games, args.filter) +
+                               f" ({number_of_new_games} new)")
+    elif args.filter:
+        # Selects games by their header values, without reading the moves of any other game
+        with profile_stage("select games"):
+            game_strings, number_of_games = get_game_strings_matching_filter_CLI_package(args.user_textfile_path,
+                                                                                        args.filter)
+        pgn_source = PGNSource(False, args.user_textfile_path, describe_selection_of_games(number_of_games, args.filter))
+
+        # Merges the selected games into a single tree, tokenizing each game’s movetext in turn, and counting results
+        result_counts = ResultCounts(args.sort_alternatives)
+        with profile_stage("build_merged_gametree"):
+            nodedict = build_merged_gametree(((clean_and_parse_string_read_from_file(game_string, pgn_source), result)
+                                              for game_string, result in game_strings),
+                                             result_counts)
+        count_in_profile("games merged", number_of_games)
+    else:
+        if args.game is not None or args.game_where:
+            # Get string of a single game, chosen by number or by header values, from a multi-game PGN file
+            with profile_stage("select game"):
+                string_read_from_file, game_number = get_string_of_selected_game_CLI_package(args.user_textfile_path,
+                                                                                             args.game,
+                                                                                             args.game_where)
+            pgn_source = PGNSource(False, args.user_textfile_path, f"game {game_number}")
+        else:
+            # Get string of PGN from either (a) file specified by user in command line or (b) a built-in PGN file,
+            string_read_from_file, pgn_source = get_string_read_from_file_CLI_package(args.user_textfile_path)
+
+        if args.lazy:
+            # Grab the movetext from game #1 by stripping headers and stripping textual annotations. Only the main line
+            # is tokenized and built now; each top-level variation is built when first reached.
+            pgnstring = clean_string_read_from_file(string_read_from_file, pgn_source)
+            with profile_stage("build_lazy_gametree"):
+                nodedict = build_lazy_gametree(pgnstring)
+        else:
+            # Grab the movetext from game #1 by stripping headers and stripping textual annotations; then tokenize that
+            # string.
+            tokenlist = clean_and_parse_string_read_from_file(string_read_from_file, pgn_source)
+
+            # Builds tree from pgn file
+            with profile_stage("buildtree"):
+                nodedict = buildtree(tokenlist)
+
+    if args.prune_depth is not None or args.prune_length is not None or args.prune_min_games is not None:
+        # Drops the side lines outside the requested limits, and renumbers the remaining nodes
+        number_of_nodes_before_pruning = len(nodedict)
+        with profile_stage("prune_gametree"):
+            nodedict, result_counts = prune_gametree(nodedict,
+                                                     args.prune_depth,
+                                                     args.prune_length,
+                                                     args.prune_min_games,
+                                                     result_counts)
+        count_in_profile("nodes pruned", number_of_nodes_before_pruning - len(nodedict))
+
+    if args.share_subtrees:
+        # Stores each repeated identical sub-variation only once; the tree becomes a DAG
+        with profile_stage("share_identical_subtrees"):
+            share_identical_subtrees(nodedict)
+
+    if args.compress:
+        # Replaces the tree by its compressed layout; the uncompressed nodes are released when nodedict is rebound
+        with profile_stage("compress_gametree"):
+            nodedict = compress_gametree(nodedict)
+
+    # (Counting edges visits every node, which, for a lazily built tree, would build every variation.)
+    if is_profiling() and not args.lazy:
+        count_in_profile("nodes", len(nodedict))
+        count_in_profile("edges", sum(node.number_of_edges for node in nodedict.values()))
+
+    return nodedict, result_counts, pgn_source
+
+
 if __name__ == "__main__":
     """ This is executed when run from the command line """
     main()
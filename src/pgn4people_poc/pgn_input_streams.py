@@ -0,0 +1,102 @@
+"""
+Opens PGN files as streams, transparently decompressing gzip (.pgn.gz), bzip2 (.pgn.bz2), and xz (.pgn.xz) files with
+the standard-library codecs, and reads from such a stream only as much text as is needed.
+
+The compression format is detected from the file’s leading “magic” bytes rather than from its extension, so that,
+e.g., a gzip file without a .gz extension is still read correctly.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+
+# Leading bytes that identify each supported compression format
+GZIP_MAGIC_BYTES = b"\x1f\x8b"
+BZIP2_MAGIC_BYTES = b"BZh"
+XZ_MAGIC_BYTES = b"\xfd7zXZ\x00"
+
+# Number of leading bytes that must be read to recognize any of the above
+MAGIC_BYTES_LENGTH = 6
+
+
+def compression_format_of_file(path_to_file):
+    """
+    Returns "gzip", "bz2", or "xz" if the file at path_to_file is compressed in that format; otherwise returns None.
+    """
+    with open(path_to_file, "rb") as file:
+        leading_bytes = file.read(MAGIC_BYTES_LENGTH)
+    if leading_bytes.startswith(GZIP_MAGIC_BYTES):
+        return "gzip"
+    if leading_bytes.startswith(BZIP2_MAGIC_BYTES):
+        return "bz2"
+    if leading_bytes.startswith(XZ_MAGIC_BYTES):
+        return "xz"
+    return None
+
+
+def open_pgn_binary_stream(path_to_file):
+    """
+    Opens the PGN file at path_to_file for reading in binary mode, decompressing it on the fly if it is compressed.
+    Returns a binary file object. Decompression is incremental: the decompressed file is never held in memory as a
+    whole.
+
+    Raises FileNotFoundError if there is no file at path_to_file.
+    """
+    compression_format = compression_format_of_file(path_to_file)
+    if compression_format == "gzip":
+        return gzip.open(path_to_file, "rb")
+    if compression_format == "bz2":
+        return bz2.open(path_to_file, "rb")
+    if compression_format == "xz":
+        return lzma.open(path_to_file, "rb")
+    return open(path_to_file, "rb")
+
+
+def open_pgn_text_stream(path_to_file):
+    """
+    Opens the PGN file at path_to_file for reading as text (with the same encoding and newline handling as the
+    built-in open(path_to_file, "r")), decompressing it on the fly if it is compressed. Returns a text file object.
+
+    Raises FileNotFoundError if there is no file at path_to_file.
+    """
+    return io.TextIOWrapper(open_pgn_binary_stream(path_to_file))
+
+
+def is_blankish_line(line, is_first_line):
+    """
+    Returns True if line (as read from a file, including any line ending) is a “blank-ish” line in the sense of
+    id_text_between_first_two_blankish_lines(): a line containing only whitespace that is preceded by a newline. (A
+    whitespace-only first line of a file is therefore not blank-ish.)
+    """
+    return (not is_first_line) and (not line.strip())
+
+
+def read_game_1_string_from_text_stream(text_stream):
+    """
+    Reads lines from text_stream only until the end of the first game’s movetext, and returns the text read.
+
+    The first game’s movetext is the text between the first two blank-ish lines (see
+    id_text_between_first_two_blankish_lines()). Reading stops just after the blank-ish line that ends it (or at the
+    end of the stream). Because the returned text is a prefix of the stream’s text that includes both of those
+    blank-ish lines, extract_game_1_movetext() finds the same movetext in it as it would in the whole file, while the
+    rest of a large (or compressed) file is never read.
+    """
+    lines_read = []
+
+    # Reading proceeds through three phases: (a) before the first blank-ish line (i.e., the headers), (b) within the
+    # first run of consecutive blank-ish lines, and (c) within the movetext, which ends at the next blank-ish line.
+    has_seen_blankish_line = False
+    is_in_movetext = False
+
+    for line in text_stream:
+        is_blankish = is_blankish_line(line, is_first_line = not lines_read)
+        lines_read.append(line)
+        if is_blankish:
+            if is_in_movetext:
+                break
+            has_seen_blankish_line = True
+        elif has_seen_blankish_line:
+            is_in_movetext = True
+
+    return "".join(lines_read)
@@ -39,4 +39,33 @@ def fullmovenumber_from_halfmove(halfmovenumber):
 #       “//” returns closest integer value that is ≤ the actual value
 #       See https://www.geeksforgeeks.org/division-operator-in-python/
     fullmovenumber = (halfmovenumber + 1) // 2
-    return fullmovenumber
\ No newline at end of file
+    return fullmovenumber
+
+
+def normalized_movetext(movetext):
+    """
+    Returns movetext stripped of any trailing check/mate indicator and annotation glyphs (“+”, “#”, “!”, “?”), so that,
+    e.g., “Nf3”, “Nf3+”, and “Nf3!?” all normalize to “Nf3”.
+
+    Used as the key when looking up an edge by its movetext.
+    """
+    return movetext.rstrip("+#!?")
+
+
+def format_movetext_path(movetext_path, first_halfmovenumber = 1):
+    """
+    Formats a sequence of movetexts as conventional PGN-style text with move numbers, e.g., “1.e4 c5 2.Nf3 d6”.
+
+    first_halfmovenumber is the halfmove number of the first movetext in movetext_path. If that is a Black move, the
+    sequence begins with, e.g., “3...Nc6”.
+    """
+    formatted_elements = []
+    for offset, movetext in enumerate(movetext_path):
+        halfmovenumber = first_halfmovenumber + offset
+        if is_white_move(halfmovenumber):
+            formatted_elements.append(f"{fullmovenumber_from_halfmove(halfmovenumber)}.{movetext}")
+        elif offset == 0:
+            formatted_elements.append(f"{fullmovenumber_from_halfmove(halfmovenumber)}...{movetext}")
+        else:
+            formatted_elements.append(movetext)
+    return " ".join(formatted_elements)
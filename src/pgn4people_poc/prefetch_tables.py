@@ -0,0 +1,131 @@
+"""
+Background prefetching of the variations tables that the user may choose next.
+
+Once a table is shown, the program waits, idle, for the user’s choice. TablePrefetcher uses that time: a background
+thread compiles the tables of the lines reached by the alternatives listed in the table (see
+deviation_histories_of_alternatives()) and puts them in the VariationsTableCache (see table_cache.py), from which the
+table the user then chooses is shown at once.
+
+The alternatives are taken in the order in which the user most likely chooses them: the earlier the move, the sooner
+(a user works down the table), and, at each move, in the order in which they are listed. At most
+constants.PREFETCH_MAX_TABLES tables (and at most half of the cache) are prefetched after each table, so that
+prefetching never evicts the tables of the lines the user has actually visited.
+
+The prefetching thread only reads the tree, which the main thread doesn’t modify while it waits (see
+traverse_tree.compile_variations_table()). A tree that is modified as it is read (a LazyNodeDict, which builds
+variations when they are first reached) or that can’t be read from another thread (a SQLiteNodeDict, whose connection
+belongs to the main thread) isn’t prefetched from. stop() is called as soon as the user has chosen, and waits for the
+thread to finish the table it is compiling, so that no table of an old tree is cached after the tree is replaced (e.g.,
+in watch mode).
+"""
+
+import threading
+
+from . import constants
+from . lazy_tree import LazyNodeDict
+from . profiling import count_in_profile
+from . sqlite_tree import SQLiteNodeDict
+from . traverse_tree import (compile_table_of_deviation_history,
+                             deviation_history_after_choice)
+
+
+def deviation_histories_of_alternatives(nodedict,
+                                        deviation_history,
+                                        fullmovenummber_to_node_id_lookup_table,
+                                        display_order_of_node):
+    """
+    Generator that yields the deviation history of the line reached by each alternative listed in the table of
+    deviation_history (whose lookup table and display orders are the other arguments; see RenderContext), earliest move
+    first and, at each move, in the order in which the alternatives are listed.
+    """
+    # The lookup table lists the nodes of the table in order, with the number of alternatives of each
+    for node_id, number_of_alternatives in fullmovenummber_to_node_id_lookup_table.values():
+        if number_of_alternatives < 1:
+            continue
+        display_order_of_edges = display_order_of_node[node_id]
+        for move_choice in range(1, number_of_alternatives + 1):
+            yield deviation_history_after_choice(nodedict,
+                                                 deviation_history,
+                                                 node_id,
+                                                 display_order_of_edges[move_choice])
+
+
+def is_tree_safe_to_prefetch_from(nodedict):
+    """
+    Returns True if nodedict may be read by the prefetching thread while the main thread waits. See the module
+    docstring.
+    """
+    return not isinstance(nodedict, (LazyNodeDict, SQLiteNodeDict))
+
+
+class TablePrefetcher:
+    """
+    Compiles, in a background thread, the tables the user may choose next into table_cache. See the module docstring.
+
+    Object attributes:
+        table_cache: The VariationsTableCache into which tables are prefetched
+        max_tables: Maximum number of tables prefetched after each table is shown
+        thread: The threading.Thread now prefetching, or None
+        stop_event: threading.Event set to tell that thread to stop
+        number_of_tables_prefetched: Number of tables compiled and cached by prefetching so far
+    """
+
+
+    def __init__(self, table_cache, max_tables = constants.PREFETCH_MAX_TABLES):
+        self.table_cache = table_cache
+        self.max_tables = min(max_tables, table_cache.max_entries // 2)
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.number_of_tables_prefetched = 0
+
+
+    def start(self, nodedict, render_context, result_counts = None):
+        """
+        Starts prefetching the tables of the alternatives listed in the table last compiled for render_context.
+        """
+        self.stop()
+        if self.max_tables == 0 or not is_tree_safe_to_prefetch_from(nodedict):
+            return
+        self.stop_event.clear()
+        # The thread gets its own references to render_context’s containers, which the main thread replaces (rather
+        # than modifies) when the user chooses
+        deviation_histories = deviation_histories_of_alternatives(nodedict,
+                                                                  render_context.deviation_history,
+                                                                  render_context.fullmovenummber_to_node_id_lookup_table,
+                                                                  render_context.display_order_of_node)
+        self.thread = threading.Thread(target=self.prefetch_tables,
+                                       args=(nodedict, deviation_histories, result_counts),
+                                       name="prefetch tables",
+                                       daemon=True)
+        self.thread.start()
+
+
+    def stop(self):
+        """
+        Stops prefetching, and waits for the thread to finish the table it is compiling.
+        """
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+
+    def prefetch_tables(self, nodedict, deviation_histories, result_counts):
+        """
+        Body of the prefetching thread: compiles and caches, until stopped, the table of each of up to max_tables of
+        deviation_histories that isn’t already cached.
+        """
+        number_of_tables = 0
+        for deviation_history in deviation_histories:
+            if self.stop_event.is_set() or number_of_tables >= self.max_tables:
+                break
+            if deviation_history in self.table_cache:
+                continue
+            compiled_table = compile_table_of_deviation_history(nodedict, deviation_history, result_counts)
+            if self.stop_event.is_set():
+                break
+            self.table_cache.put(deviation_history, compiled_table)
+            number_of_tables += 1
+        self.number_of_tables_prefetched += number_of_tables
+        count_in_profile("tables prefetched", number_of_tables)
@@ -9,25 +9,28 @@ import re
 from . import constants
 from . error_processing import (fatal_error_exit_without_traceback,
                                 fatal_pgn_error)
-from . jdr_utilities import check_CLI_for_user_file
 from . jdr_utilities import id_text_between_first_two_blankish_lines
+from . pgn_input_streams import (open_pgn_text_stream,
+                                 read_game_1_string_from_text_stream)
+from . profiling import (count_in_profile,
+                         profile_stage)
 from . strip_balanced_braces import strip_balanced_braces_from_string
 
 
-def get_string_read_from_file_CLI_package():
+def get_string_read_from_file_CLI_package(user_pgn_filepath):
     """
     Get string of PGN from either (a) file specified by user in command line or (b) a built-in PGN file
-    """
 
-    # Checks command line to see whether user specified her own PGN file to view
-    # user_pgn_filepath will be either (a) a file object or (b) None
-    user_pgn_filepath = check_CLI_for_user_file(constants.HELP_DESCRIPTION, constants.HELP_EPILOG)
+    user_pgn_filepath is the path (a pathlib.Path object) the user supplied on the command line, or None if the user
+    didn’t supply one.
+    """
 
     if user_pgn_filepath is None:
         # User didn't specify her own PGN file, so use sample PGN file included in the package
         try:
-            string_read_from_file = read_resource_pgnfile_into_string(constants.PACKAGE_FOR_SAMPLE_PGN,
-                                                                      constants.CHOSEN_SAMPLE_PGN_FILE)
+            with profile_stage("read PGN file"):
+                string_read_from_file = read_resource_pgnfile_into_string(constants.PACKAGE_FOR_SAMPLE_PGN,
+                                                                          constants.CHOSEN_SAMPLE_PGN_FILE)
         except FileNotFoundError as err:
             error_message =("Built-in sample PGN file could not be found.\n"
                             f"One possibility: the installation of {constants.NAME_OF_IMPORT_PACKAGE} is corrupted.\n"
@@ -37,10 +40,11 @@ def get_string_read_from_file_CLI_package():
 
         is_sample_pgn = True
     else:
-        # User specified her own PGN file
+        # User specified her own PGN file, which may be compressed (gzip, bz2, or xz). Only the text through the end of
+        # the first game is read (and, if compressed, decompressed).
         try:
-            with user_pgn_filepath.open('r') as file:
-                string_read_from_file = file.read()
+            with profile_stage("read PGN file"), open_pgn_text_stream(user_pgn_filepath) as file:
+                string_read_from_file = read_game_1_string_from_text_stream(file)
         except FileNotFoundError as err:
             pgn_file_not_found_fatal_error(user_pgn_filepath, err)
         
@@ -56,25 +60,44 @@ def clean_and_parse_string_read_from_file(string_read_from_file, pgn_source):
     Grab the movetext from game #1 by stripping headers and stripping textual annotations; then tokenize that string.
     """
 
-    pgnstring = extract_game_1_movetext(string_read_from_file, pgn_source)
+    pgnstring = clean_string_read_from_file(string_read_from_file, pgn_source)
+   
+    # Parse string into a list of tokens, either (a) a movetext entry (e.g., "e4"), (b) “(”, or (c) “)”.
+    with profile_stage("tokenize_pgnstring"):
+        tokenlist = tokenize_pgnstring(pgnstring)
+    count_in_profile("tokens", len(tokenlist))
+
+    return tokenlist
 
-    pgnstring = strip_balanced_braces_from_string(pgnstring)
+
+def clean_string_read_from_file(string_read_from_file, pgn_source):
+    """
+    Grab the movetext from game #1 by stripping headers and stripping textual annotations. Return that string, not yet
+    tokenized.
+    """
+
+    with profile_stage("extract_game_1_movetext"):
+        pgnstring = extract_game_1_movetext(string_read_from_file, pgn_source)
+
+    with profile_stage("strip_balanced_braces_from_string"):
+        pgnstring = strip_balanced_braces_from_string(pgnstring)
 
     if not pgnstring:
         fatal_pgn_error("No valid movetext found", pgn_source)
-   
-    # Parse string into a list of tokens, either (a) a movetext entry (e.g., "e4"), (b) “(”, or (c) “)”.
-    tokenlist = tokenize_pgnstring(pgnstring)
 
-    return tokenlist
+    return pgnstring
 
 
 class PGNSource():
     """
     Class instance embodies metadata for the chosen PGN file to be communicated, e.g., for output header
+
+    selection_description describes which game(s) of a multi-game file were chosen (e.g., “game 12”), or is None if
+    the first game was used by default.
     """
-    def __init__(self, is_sample_pgn, path_to_pgnfile):
+    def __init__(self, is_sample_pgn, path_to_pgnfile, selection_description = None):
         self.is_sample_pgn = is_sample_pgn
+        self.selection_description = selection_description
         if path_to_pgnfile is None:
             self.path_to_pgnfile = None
             self.filename_of_pgnfile = None
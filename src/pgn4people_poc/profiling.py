@@ -0,0 +1,309 @@
+"""
+Optional, built-in instrumentation of the stages of the pipeline (reading, cleaning, tokenizing, building, rendering)
+and of each interactive command: for each stage, the number of times it ran, its wall time, and the peak memory it
+allocated (traced by tracemalloc); and counters, e.g., of tokens, nodes, and edges.
+
+Profiling is switched on by --profile (or --profile-json FILE), or by setting the environment variable
+PGN4PEOPLE_PROFILE (to anything other than “0”). A summary is printed (to standard error) when the program exits, and,
+with --profile-json, also written to FILE as JSON.
+
+With --trace FILE, each run of each stage is also recorded as a span, and the spans are written to FILE, when the
+program exits, in the Chrome Trace Event format, which both chrome://tracing (or Perfetto) and speedscope load. Spans
+nest as the stages do, e.g., the tokenizing of each game within the span of that game (see profile_each_item()).
+Because tracing allocations slows the program, allocations are traced only if --profile is also given.
+
+When profiling is off, profile_stage() returns one shared, do-nothing context manager and count_in_profile() returns at
+once, so the instrumented code pays only a function call per stage.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from . import constants
+
+# The do-nothing context manager returned by profile_stage() when profiling is off (nullcontext is reusable)
+NULL_STAGE = contextlib.nullcontext()
+
+
+class StageStatistics:
+    """
+    Accumulated measurements of one stage.
+
+    Object attributes:
+        number_of_calls: Number of times the stage ran
+        total_seconds: Total wall time of those runs
+        max_seconds: Longest wall time of any run
+        peak_allocated_bytes: Largest peak, over the runs, of the memory allocated during the run beyond what was
+            allocated when it began (None if allocations aren’t traced)
+    """
+
+    __slots__ = ("number_of_calls", "total_seconds", "max_seconds", "peak_allocated_bytes")
+
+
+    def __init__(self):
+        self.number_of_calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.peak_allocated_bytes = None
+
+
+class ProfiledStage:
+    """
+    Context manager that measures one run of the stage name_of_stage and records it in profiler. span_arguments, if not
+    None, is a dictionary recorded with the run’s span in the trace (e.g., {"game": 12}).
+    """
+
+    __slots__ = ("profiler", "name_of_stage", "span_arguments", "start_time", "start_allocated_bytes",
+                 "peak_of_inner_stages")
+
+
+    def __init__(self, profiler, name_of_stage, span_arguments = None):
+        self.profiler = profiler
+        self.name_of_stage = name_of_stage
+        self.span_arguments = span_arguments
+        self.peak_of_inner_stages = 0
+
+
+    def __enter__(self):
+        profiler = self.profiler
+        open_stages = profiler.open_stages_of_this_thread()
+        if profiler.do_trace_allocations:
+            if open_stages:
+                # The enclosing stage’s peak so far would be lost when the peak is reset for this stage
+                enclosing_stage = open_stages[-1]
+                enclosing_stage.peak_of_inner_stages = max(enclosing_stage.peak_of_inner_stages,
+                                                           tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self.start_allocated_bytes = tracemalloc.get_traced_memory()[0]
+        open_stages.append(self)
+        self.start_time = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end_time = time.perf_counter()
+        profiler = self.profiler
+        open_stages = profiler.open_stages_of_this_thread()
+        open_stages.pop()
+        peak_allocated_bytes = None
+        if profiler.do_trace_allocations:
+            peak_bytes = max(tracemalloc.get_traced_memory()[1], self.peak_of_inner_stages)
+            if open_stages:
+                enclosing_stage = open_stages[-1]
+                enclosing_stage.peak_of_inner_stages = max(enclosing_stage.peak_of_inner_stages, peak_bytes)
+            peak_allocated_bytes = max(0, peak_bytes - self.start_allocated_bytes)
+        profiler.record_stage(self.name_of_stage, self.start_time, end_time, peak_allocated_bytes, self.span_arguments)
+        return False
+
+
+    def abandon(self):
+        """
+        Ends this run of the stage without recording it.
+        """
+        self.profiler.open_stages_of_this_thread().pop()
+
+
+class Profiler:
+    """
+    The statistics of every stage, and the counters, of one run of the program. See the module docstring.
+
+    Object attributes:
+        is_enabled: Whether profiling is on
+        do_trace_allocations: Whether the peak memory allocated by each stage is measured (with tracemalloc)
+        statistics_of_stage: Dictionary {name of stage: StageStatistics}, in order of each stage’s first run
+        counters: Dictionary {name of counter: count}
+        thread_state: threading.local() whose attribute open_stages is the list of the ProfiledStage of each stage
+            now running in that thread, innermost last
+        json_filepath: Path of the file to which the summary is written as JSON, or None
+        trace_filepath: Path of the file to which the spans are written as a Chrome trace, or None
+        trace_events: List of the Chrome Trace Events (dictionaries) of the spans recorded so far, if trace_filepath
+            isn’t None
+        start_time: Value of time.perf_counter() when profiling was switched on
+    """
+
+
+    def __init__(self):
+        self.is_enabled = False
+        self.do_trace_allocations = False
+        self.statistics_of_stage = {}
+        self.counters = {}
+        self.thread_state = threading.local()
+        self.json_filepath = None
+        self.trace_filepath = None
+        self.trace_events = []
+        self.start_time = None
+
+
+    def enable(self, json_filepath = None, trace_filepath = None, do_trace_allocations = True):
+        self.is_enabled = True
+        self.json_filepath = json_filepath
+        self.trace_filepath = trace_filepath
+        self.do_trace_allocations = do_trace_allocations
+        self.start_time = time.perf_counter()
+        if do_trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        atexit.register(self.output_summary)
+
+
+    def open_stages_of_this_thread(self):
+        try:
+            return self.thread_state.open_stages
+        except AttributeError:
+            self.thread_state.open_stages = []
+            return self.thread_state.open_stages
+
+
+    def stage(self, name_of_stage, span_arguments = None):
+        return ProfiledStage(self, name_of_stage, span_arguments) if self.is_enabled else NULL_STAGE
+
+
+    def record_stage(self, name_of_stage, start_time, end_time, peak_allocated_bytes, span_arguments = None):
+        statistics = self.statistics_of_stage.get(name_of_stage)
+        if statistics is None:
+            statistics = StageStatistics()
+            self.statistics_of_stage[name_of_stage] = statistics
+        elapsed_seconds = end_time - start_time
+        statistics.number_of_calls += 1
+        statistics.total_seconds += elapsed_seconds
+        statistics.max_seconds = max(statistics.max_seconds, elapsed_seconds)
+        if peak_allocated_bytes is not None:
+            statistics.peak_allocated_bytes = max(statistics.peak_allocated_bytes or 0, peak_allocated_bytes)
+
+        if self.trace_filepath is not None:
+            # A “complete” event; times are in microseconds since profiling was switched on
+            trace_event = {"name": name_of_stage,
+                           "ph": "X",
+                           "ts": 1e6 * (start_time - self.start_time),
+                           "dur": 1e6 * elapsed_seconds,
+                           "pid": os.getpid(),
+                           "tid": threading.get_ident()}
+            if span_arguments is not None:
+                trace_event["args"] = span_arguments
+            self.trace_events.append(trace_event)
+
+
+    def count(self, name_of_counter, increment):
+        self.counters[name_of_counter] = self.counters.get(name_of_counter, 0) + increment
+
+
+    def summary_as_dictionary(self):
+        return {"total_seconds": time.perf_counter() - self.start_time,
+                "peak_traced_bytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+                "stages": {name_of_stage: {"calls": statistics.number_of_calls,
+                                           "total_seconds": statistics.total_seconds,
+                                           "mean_seconds": statistics.total_seconds / statistics.number_of_calls,
+                                           "max_seconds": statistics.max_seconds,
+                                           "peak_allocated_bytes": statistics.peak_allocated_bytes}
+                           for name_of_stage, statistics in self.statistics_of_stage.items()},
+                "counters": dict(self.counters)}
+
+
+    def output_summary(self):
+        """
+        Writes, if requested, the summary as JSON and the trace, and prints the summary to standard error. Called when
+        the program exits.
+        """
+        summary = self.summary_as_dictionary()
+
+        for filepath, contents, description in ((self.json_filepath, summary, "profile"),
+                                                (self.trace_filepath,
+                                                 {"traceEvents": self.trace_events, "displayTimeUnit": "ms"},
+                                                 "trace")):
+            if filepath is None:
+                continue
+            try:
+                with open(filepath, "w", encoding="utf-8") as output_file:
+                    json.dump(contents, output_file, indent=None if description == "trace" else 2)
+            except OSError as err:
+                print(f"Could not write the {description} to “{filepath}”.\n{err}", file=sys.stderr)
+
+        lines = ["", "PROFILE",
+                 f"{'Stage':<{constants.PROFILE_STAGE_NAME_WIDTH}} {'Calls':>7} {'Total ms':>11} {'Mean ms':>10} "
+                 f"{'Max ms':>10} {'Peak KiB':>10}"]
+        for name_of_stage, stage_summary in summary["stages"].items():
+            peak_allocated_bytes = stage_summary["peak_allocated_bytes"]
+            peak_string = "-" if peak_allocated_bytes is None else f"{peak_allocated_bytes / 1024:.1f}"
+            lines.append(f"{name_of_stage:<{constants.PROFILE_STAGE_NAME_WIDTH}} "
+                         f"{stage_summary['calls']:7} "
+                         f"{1000 * stage_summary['total_seconds']:11.2f} "
+                         f"{1000 * stage_summary['mean_seconds']:10.2f} "
+                         f"{1000 * stage_summary['max_seconds']:10.2f} "
+                         f"{peak_string:>10}")
+        if summary["counters"]:
+            lines.append("")
+            for name_of_counter, count in summary["counters"].items():
+                lines.append(f"{name_of_counter:<{constants.PROFILE_STAGE_NAME_WIDTH}} {count:>12,}")
+        lines.append(f"\nTotal wall time since start of profiling: {1000 * summary['total_seconds']:.1f} ms")
+        print("\n".join(lines), file=sys.stderr)
+
+
+# The profiler of this run of the program
+profiler = Profiler()
+
+
+def profile_stage(name_of_stage, span_arguments = None):
+    """
+    Returns a context manager that, if profiling is on, measures the code it encloses as one run of the stage
+    name_of_stage (with span_arguments, if any, recorded with its span in the trace). E.g.:
+        with profile_stage("buildtree"):
+            ...
+    """
+    return profiler.stage(name_of_stage, span_arguments)
+
+
+def profile_each_item(iterable, name_of_stage):
+    """
+    Generator that yields the items of iterable, measuring, as one run of the stage name_of_stage, both the production
+    of each item (e.g., the reading and tokenizing of a game) and the consumer’s handling of it (e.g., the merging of
+    that game), i.e., everything until the consumer asks for the next item. Each run’s span records the number
+    (counting from 1) of its item, e.g., {"game": 12}.
+    """
+    if not profiler.is_enabled:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    item_number = 0
+    while True:
+        item_number += 1
+        stage = ProfiledStage(profiler, name_of_stage, {name_of_stage: item_number})
+        stage.__enter__()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stage.abandon()
+            return
+        except BaseException:
+            stage.__exit__(None, None, None)
+            raise
+        try:
+            yield item
+        finally:
+            stage.__exit__(None, None, None)
+
+
+def count_in_profile(name_of_counter, increment = 1):
+    if profiler.is_enabled:
+        profiler.count(name_of_counter, increment)
+
+
+def is_profiling():
+    return profiler.is_enabled
+
+
+def enable_profiling_CLI_package(do_profile, json_filepath, trace_filepath = None):
+    """
+    Switches profiling on if requested on the command line (do_profile, or a json_filepath or trace_filepath that isn’t
+    None) or by the environment variable constants.PROFILE_ENVIRONMENT_VARIABLE.
+    """
+    is_requested_by_environment = os.environ.get(constants.PROFILE_ENVIRONMENT_VARIABLE, "") not in ("", "0")
+    do_profile = do_profile or json_filepath is not None or is_requested_by_environment
+    if do_profile or trace_filepath is not None:
+        # A trace alone isn’t slowed by tracing allocations
+        profiler.enable(json_filepath, trace_filepath, do_trace_allocations=do_profile)
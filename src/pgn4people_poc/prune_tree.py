@@ -0,0 +1,123 @@
+"""
+Pruning of the game tree: drops every subtree whose root is too deep, too far into the game, or reached by too few of
+the merged games, and renumbers the remaining nodes compactly.
+
+A huge tree merged from a database of games is mostly side lines played in a single game. Pruning it right after it is
+built (or merged) leaves the core that is worth browsing, and every later stage (reports, compression, tables) then
+works on the smaller tree.
+
+The nodes are visited once, in ascending order of node_id, which visits every node after its originating node (because
+each node is created after its originating node; see compute_subtree_hashes()). When a kept node is visited, it is given
+the next node_id (so the kept nodes keep their relative order), and its edges to nodes that fail a criterion are
+dropped; each remaining edge records, for its destination, the edge’s new index. When that destination is visited in
+turn, it is kept if and only if its originating node kept the edge to it, and its .originatingnode_id,
+.choice_id_at_originatingnode, and the .destination_node_id of that edge are remapped to the new node_ids. This state
+is carried forward in two compact arrays indexed by the old node_id: the new node_id, and the new index of the edge
+leading to the node.
+
+If a node’s main-line edge is dropped, its first remaining alternative becomes its main line. The .depth of each kept
+node is therefore recomputed from its new originating node; the criteria, however, are applied to the depths as built.
+
+Because the pass follows .originatingnode_id, it requires a tree in which each node has exactly one originating node,
+i.e., it must run before share_identical_subtrees().
+"""
+
+from array import array
+
+from . classes_arboreal import GameNode
+from . import constants
+from . result_counts import ResultCounts
+
+# Value, in the arrays of prune_gametree(), of a node that has been dropped
+PRUNED = -1
+
+
+def is_node_within_limits(nodedict, node_id, max_depth, max_halfmove_length, min_games, result_counts):
+    """
+    Returns True if node node_id passes every criterion that isn’t None: its depth is at most max_depth, it is reached
+    after at most max_halfmove_length halfmoves, and at least min_games of the merged games (as counted by
+    result_counts) reach it.
+    """
+    node = nodedict[node_id]
+    if max_depth is not None and node.depth > max_depth:
+        return False
+    # The halfmove number of a node is that of the move made FROM it, so the node is reached after one fewer halfmoves
+    if max_halfmove_length is not None and node.halfmovenumber - 1 > max_halfmove_length:
+        return False
+    if min_games is not None and result_counts.number_of_games(node_id) < min_games:
+        return False
+    return True
+
+
+def prune_gametree(nodedict,
+                   max_depth = None,
+                   max_halfmove_length = None,
+                   min_games = None,
+                   result_counts = None):
+    """
+    Returns the 2-tuple (pruned_nodedict, pruned_result_counts): the tree nodedict without every subtree whose root
+    fails a criterion (see is_node_within_limits(); a criterion that is None isn’t applied), with its nodes renumbered
+    0, 1, 2, … in their original order, and result_counts (None if result_counts is None) renumbered likewise.
+    min_games requires result_counts.
+
+    The nodes of nodedict are reused, with their attributes remapped, in pruned_nodedict, so nodedict must not be used
+    afterward. The class-level sets of node IDs of GameNode are updated to the new node_ids.
+
+    See the module docstring.
+    """
+    array_length = max(nodedict) + 1
+    # Indexed by the old node_id: the new node_id of a visited node that has been kept
+    new_id_of_node = array("q", [PRUNED]) * array_length
+    # Indexed by the old node_id: the new index of the edge leading to the node, if its originating node kept that edge
+    new_choice_id_of_node = array("q", [PRUNED]) * array_length
+
+    pruned_nodedict = {}
+    if result_counts is not None:
+        pruned_result_counts = ResultCounts(result_counts.sort_alternatives_by)
+        pairs_of_old_and_new_counts = ((result_counts.white_wins, pruned_result_counts.white_wins),
+                                       (result_counts.draws, pruned_result_counts.draws),
+                                       (result_counts.black_wins, pruned_result_counts.black_wins),
+                                       (result_counts.games, pruned_result_counts.games))
+    else:
+        pruned_result_counts = None
+
+    for node_id in sorted(nodedict):
+        new_choice_id = new_choice_id_of_node[node_id]
+        if node_id != constants.INITIAL_NODE_ID and new_choice_id == PRUNED:
+            continue
+        node = nodedict[node_id]
+        new_node_id = len(pruned_nodedict)
+        new_id_of_node[node_id] = new_node_id
+
+        if node_id != constants.INITIAL_NODE_ID:
+            new_originating_node_id = new_id_of_node[node.originatingnode_id]
+            originating_node = pruned_nodedict[new_originating_node_id]
+            originating_node.edgeslist[new_choice_id].destination_node_id = new_node_id
+            node.originatingnode_id = new_originating_node_id
+            node.choice_id_at_originatingnode = new_choice_id
+            node.depth = originating_node.depth + (0 if new_choice_id == constants.INDEX_MAINLINE else 1)
+
+        kept_edges = [edge for edge in node.edgeslist
+                      if is_node_within_limits(nodedict, edge.destination_node_id,
+                                               max_depth, max_halfmove_length, min_games, result_counts)]
+        for index, edge in enumerate(kept_edges):
+            edge.reference_index = index
+            # The destination, not yet visited, still has its old node_id
+            new_choice_id_of_node[edge.destination_node_id] = index
+        node.edgeslist = kept_edges
+        node.number_of_edges = len(kept_edges)
+        # Rebuilt, if needed, from the remaining edges
+        node.edges_by_movetext = None
+
+        pruned_nodedict[new_node_id] = node
+        if pruned_result_counts is not None:
+            for old_counts, new_counts in pairs_of_old_and_new_counts:
+                new_counts.append(old_counts[node_id] if node_id < len(old_counts) else 0)
+
+    GameNode.set_of_node_IDs.difference_update(nodedict)
+    GameNode.set_of_nonterminal_node_IDs.difference_update(nodedict)
+    GameNode.set_of_node_IDs.update(pruned_nodedict)
+    GameNode.set_of_nonterminal_node_IDs.update(node_id for node_id, node in pruned_nodedict.items()
+                                                if node.number_of_edges > 0)
+
+    return pruned_nodedict, pruned_result_counts
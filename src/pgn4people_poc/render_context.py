@@ -0,0 +1,49 @@
+"""
+The state of one user’s session of browsing a tree: everything that changes as the user moves from line to line.
+
+Compiling tables and translating choices (see traverse_tree.compile_variations_table()) only reads the tree, so one
+tree (e.g., a FrozenNodeDict; see frozen_tree.py) can serve any number of sessions at once, e.g., one per thread of a
+server, without locks, as long as each session keeps its own RenderContext. The one exception is looking a node up by
+movetext (e.g., by the goto command or tab completion), which builds the node’s .edges_by_movetext the first time. That
+write is idempotent, and is tolerated (see classes_arboreal.MovetextLookupMixin.edge_from_movetext()). (The nodes of a
+FrozenNodeDict are reconstructed for each thread, so it never writes to a node that another thread reads.)
+"""
+
+from . import constants
+
+
+class RenderContext:
+    """
+    The mutable view state of one session.
+
+    Object attributes:
+        target_node_id: node_id of the node whose line is displayed
+        deviation_history: Deviation history (see traverse_tree.deviation_history_of_node()) of the displayed line
+        fullmovenummber_to_node_id_lookup_table: Dictionary {(fullmovenumber, player color string): (node_id, number
+            of alternatives)} of the displayed table, by which the user’s choice is validated
+        examples_command_triples_white, examples_command_triples_black: Lists of (fullmovenumber, number_of_edges) of
+            the displayed table, from which example commands are drawn
+        display_order_of_node: Dictionary {node_id: display order of its edges} of each nonterminal node of the
+            displayed table (see traverse_tree.construct_display_order_of_node_edges()), by which the user’s choice of
+            an alternative is translated back to an edge
+
+    The last four are replaced, not modified, when another table is displayed, because they may be shared with a
+    cached table (see table_cache.py).
+    """
+
+    __slots__ = ("target_node_id",
+                 "deviation_history",
+                 "fullmovenummber_to_node_id_lookup_table",
+                 "examples_command_triples_white",
+                 "examples_command_triples_black",
+                 "display_order_of_node")
+
+
+    def __init__(self):
+        # Starts by showing the main line
+        self.target_node_id = constants.INITIAL_NODE_ID
+        self.deviation_history = {}
+        self.fullmovenummber_to_node_id_lookup_table = {}
+        self.examples_command_triples_white = []
+        self.examples_command_triples_black = []
+        self.display_order_of_node = {}
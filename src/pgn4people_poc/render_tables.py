@@ -0,0 +1,177 @@
+"""
+Renders, in parallel, the variations table of every line of the tree (or of every line through a given position), each
+to its own text file, e.g., for static study material with one page per line of a repertoire.
+
+The terminal nodes are enumerated, in depth-first order, by generate_lines() in the main process, and handed, in chunks
+of consecutive lines, to a pool of worker processes. The main process first freezes the tree into a block of shared
+memory (see frozen_tree.py), to which each worker attaches when it starts, so that the workers share a single, compact
+copy of the tree rather than each holding (or, when forked, gradually copying) its own. (A tree stored in SQLite isn’t
+frozen: each worker opens the database itself.)
+
+Consecutive lines in depth-first order share most of their moves, and so most of the rows of their tables. Within a
+chunk, a worker formats each distinct row only once: a row is identified by the edges it shows, and its formatted text
+is reused by every later line of the chunk that passes through the same moves.
+"""
+
+import collections
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from yachalk import chalk
+
+from . import constants
+from . construct_output import (format_column_headings,
+                                format_single_node)
+from . error_processing import fatal_error_exit_without_traceback
+from . export_lines import (generate_lines,
+                            variations_table_of_line)
+from . frozen_tree import freeze_gametree
+from . get_process_user_CLI_input import movetext_path_from_goto_response
+from . pgn_utilities import format_movetext_path
+from . sqlite_tree import SQLiteNodeDict
+from . traverse_tree import (follow_movetext_path,
+                             movetext_path_given_deviation_history)
+
+# The tree (and its result counts) shared by the tasks of a worker process, installed by install_tree_in_worker()
+worker_nodedict = None
+worker_result_counts = None
+
+
+def install_tree_in_worker(nodedict, result_counts):
+    global worker_nodedict, worker_result_counts
+    worker_nodedict = nodedict
+    worker_result_counts = result_counts
+    chalk.disable_all_ansi()
+
+
+def key_of_variations_line(variations_line):
+    """
+    Returns a hashable key that identifies the formatted text of variations_line: the destinations of the edges it
+    shows (which identify those edges), together with the move number and the player to move.
+    """
+    def destination(edge):
+        return None if edge is None else edge.destination_node_id
+
+    return (variations_line.fullmovenumber,
+            variations_line.is_player_white,
+            destination(variations_line.mainline_edge_white),
+            destination(variations_line.mainline_edge_black),
+            tuple(edge.destination_node_id for edge in variations_line.list_of_alternative_edges_to_display or ()))
+
+
+def render_chunk_of_lines(output_directory, chunk_of_lines):
+    """
+    Task of a worker process: writes, for each (line_number, terminal_node_id, movetext_path) of chunk_of_lines, the
+    variations table of that line to its own file in output_directory. Returns the number of files written.
+    """
+    formatted_row_of_key = {}
+    for line_number, terminal_node_id, movetext_path in chunk_of_lines:
+        _, variations_table = variations_table_of_line(worker_nodedict, terminal_node_id, worker_result_counts)
+
+        lines_of_file = [format_movetext_path(movetext_path), ""]
+        lines_of_file.extend(format_column_headings(worker_result_counts))
+        for variations_line in variations_table:
+            key = key_of_variations_line(variations_line)
+            formatted_row = formatted_row_of_key.get(key)
+            if formatted_row is None:
+                formatted_row = format_single_node(variations_line, worker_result_counts)
+                formatted_row_of_key[key] = formatted_row
+            lines_of_file.append(formatted_row)
+
+        path_to_file = output_directory / constants.RENDERED_TABLE_FILENAME_FORMAT.format(line_number)
+        with open(path_to_file, "w", encoding="utf-8") as rendered_file:
+            rendered_file.write("\n".join(lines_of_file) + "\n")
+
+    return len(chunk_of_lines)
+
+
+def chunks_of_lines(nodedict, starting_node_id, starting_movetext_path, chunk_size):
+    """
+    Generator that yields lists of up to chunk_size consecutive (line_number, terminal_node_id, movetext_path) for the
+    lines through starting_node_id, which is reached from the initial node by starting_movetext_path.
+    """
+    chunk = []
+    for line_number, (terminal_node_id, movetext_path) in enumerate(generate_lines(nodedict, starting_node_id),
+                                                                    start=1):
+        chunk.append((line_number, terminal_node_id, tuple(starting_movetext_path) + movetext_path))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_tables_of_lines(nodedict,
+                           output_directory,
+                           starting_movetext_path = (),
+                           result_counts = None,
+                           number_of_workers = None,
+                           chunk_size = constants.RENDER_CHUNK_SIZE):
+    """
+    Writes the variations table of each line through the position reached by starting_movetext_path (by default, of
+    every line; otherwise, a path validated as by movetext_path_from_goto_response()) to its own file in
+    output_directory, using number_of_workers processes (by default, one per CPU).
+
+    At most a few chunks per worker are in flight at a time, so that the lines of even a very large tree are never all
+    held in memory at once.
+
+    Returns the 3-tuple (number of files written, elapsed seconds, number of workers).
+    """
+    # Replaces the movetexts as given (e.g., “Nf3”) by those of the tree (e.g., “Nf3+”)
+    starting_node_id, deviation_history = follow_movetext_path(nodedict, starting_movetext_path)
+    starting_movetext_path = movetext_path_given_deviation_history(nodedict, deviation_history, starting_node_id)
+    if number_of_workers is None:
+        number_of_workers = os.cpu_count() or 1
+
+    start_time = time.perf_counter()
+    number_of_files = 0
+    # What is handed to each worker: the name of the shared-memory block of the frozen tree (or the database’s path)
+    frozen_nodedict = None if isinstance(nodedict, SQLiteNodeDict) else freeze_gametree(nodedict)
+    try:
+        with ProcessPoolExecutor(max_workers=number_of_workers,
+                                 initializer=install_tree_in_worker,
+                                 initargs=(frozen_nodedict or nodedict, result_counts)) as executor:
+            pending_futures = collections.deque()
+            for chunk in chunks_of_lines(nodedict, starting_node_id, starting_movetext_path, chunk_size):
+                if len(pending_futures) >= constants.RENDER_CHUNKS_IN_FLIGHT_PER_WORKER * number_of_workers:
+                    number_of_files += pending_futures.popleft().result()
+                pending_futures.append(executor.submit(render_chunk_of_lines, output_directory, chunk))
+            for future in pending_futures:
+                number_of_files += future.result()
+    finally:
+        if frozen_nodedict is not None:
+            frozen_nodedict.unlink()
+
+    return number_of_files, time.perf_counter() - start_time, number_of_workers
+
+
+def render_tables_CLI_package(output_directory, nodedict, render_from, result_counts, number_of_workers):
+    """
+    Renders the tables of the lines through the position reached by the moves of the string render_from (e.g., “e4
+    c5”; every line, if render_from is None) to files in output_directory (see render_tables_of_lines()), and reports
+    the throughput.
+    """
+    output_directory = pathlib.Path(output_directory)
+    try:
+        output_directory.mkdir(parents=True, exist_ok=True)
+    except OSError as err:
+        fatal_error_exit_without_traceback(f"Could not create the directory “{output_directory}”.\n{err}")
+
+    if render_from:
+        starting_movetext_path = movetext_path_from_goto_response(nodedict, f"{constants.GOTO_COMMAND} {render_from}")
+        if starting_movetext_path is None:
+            fatal_error_exit_without_traceback(f"Cannot render the lines through “{render_from}”.")
+    else:
+        starting_movetext_path = []
+    number_of_files, elapsed_seconds, number_of_workers = render_tables_of_lines(nodedict,
+                                                                                  output_directory,
+                                                                                  starting_movetext_path,
+                                                                                  result_counts,
+                                                                                  number_of_workers)
+
+    tables_per_second = number_of_files / elapsed_seconds if elapsed_seconds > 0 else float("inf")
+    print(f"Rendered {number_of_files} tables to {output_directory} in {elapsed_seconds:.2f} seconds "
+          f"({tables_per_second:,.0f} tables per second, {number_of_workers} worker "
+          f"process{'' if number_of_workers == 1 else 'es'}).")
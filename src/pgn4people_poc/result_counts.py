@@ -0,0 +1,94 @@
+"""
+Counts of White wins, draws, and Black wins for each edge of a tree into which games have been merged (see
+build_merged_gametree()), taken from each game’s Result header.
+
+Because each node of a (non-shared) tree is the destination of exactly one edge, the counts of an edge are stored at
+the index of its destination node, in compact integer arrays that grow as nodes are created. The counts are updated
+incrementally, one game at a time, as each game is merged, for every move of that game’s main line (the moves
+actually played, as distinct from any annotated variations).
+"""
+
+from array import array
+
+from . import constants
+
+
+class ResultCounts:
+    """
+    Per-edge result counts, indexed by the node_id of the edge’s destination node. See the module docstring.
+
+    Object attributes:
+        white_wins, draws, black_wins: arrays of unsigned 32-bit integers, the number of games reaching each node that
+            White won, that were drawn, and that Black won, respectively
+        games: array of unsigned 32-bit integers, the number of games reaching each node, including those whose result
+            is unknown (e.g., “*”)
+        sort_alternatives_by: None, constants.SORT_BY_GAMES, or constants.SORT_BY_SCORE; if not None, the alternatives
+            in the variations table are sorted (descending) by number of games or by score for the player to move
+    """
+
+
+    def __init__(self, sort_alternatives_by = None):
+        self.white_wins = array("I")
+        self.draws = array("I")
+        self.black_wins = array("I")
+        self.games = array("I")
+        self.sort_alternatives_by = sort_alternatives_by
+
+
+    def add_game(self, node_ids, result):
+        """
+        Adds one game, with Result header value result, that reached each node whose node_id is in node_ids.
+        """
+        counts_for_result = {constants.RESULT_WHITE_WINS: self.white_wins,
+                             constants.RESULT_DRAW: self.draws,
+                             constants.RESULT_BLACK_WINS: self.black_wins}.get(result)
+
+        for node_id in node_ids:
+            if node_id >= len(self.games):
+                number_of_new_slots = node_id + 1 - len(self.games)
+                for counts in (self.white_wins, self.draws, self.black_wins, self.games):
+                    # Zero bytes are zero counts
+                    counts.frombytes(bytes(number_of_new_slots * counts.itemsize))
+            self.games[node_id] += 1
+            if counts_for_result is not None:
+                counts_for_result[node_id] += 1
+
+
+    def number_of_games(self, node_id):
+        return self.games[node_id] if node_id < len(self.games) else 0
+
+
+    def score(self, node_id, is_white):
+        """
+        Returns the score (wins plus half of draws, as a fraction of the games with a known result) of the games
+        reaching node node_id, for White if is_white else for Black, or None if no such game has a known result.
+        """
+        if node_id >= len(self.games):
+            return None
+        wins = self.white_wins[node_id] if is_white else self.black_wins[node_id]
+        number_decided_or_drawn = self.white_wins[node_id] + self.draws[node_id] + self.black_wins[node_id]
+        if number_decided_or_drawn == 0:
+            return None
+        return (wins + self.draws[node_id] / 2) / number_decided_or_drawn
+
+
+    def score_string(self, node_id, is_white):
+        """
+        Returns a short description of the results of the games reaching node node_id, e.g., “62%/134” (a 62% score,
+        for White if is_white else for Black, in 134 games).
+        """
+        score = self.score(node_id, is_white)
+        score_string = "  -" if score is None else f"{100 * score:3.0f}"
+        return f"{score_string}%/{self.number_of_games(node_id)}"
+
+
+    def sort_key_of_edge(self, edge, is_white):
+        """
+        Returns the key by which edge is sorted among the alternatives of the player to move (White if is_white),
+        according to self.sort_alternatives_by, such that the best alternative has the smallest key.
+        """
+        node_id = edge.destination_node_id
+        if self.sort_alternatives_by == constants.SORT_BY_SCORE:
+            score = self.score(node_id, is_white)
+            return (-1 if score is None else -score, -self.number_of_games(node_id))
+        return -self.number_of_games(node_id)
@@ -0,0 +1,108 @@
+"""
+Structural (Merkle-style) hashing of subtrees, and hash-consing of the game tree so that identical subtrees are stored
+only once.
+
+Annotators often paste the same sub-variation under several parents. After share_identical_subtrees(), every edge that
+led to a copy of an already-seen subtree instead leads to the first copy, and the other copies are deleted. The tree
+thereby becomes a directed acyclic graph (DAG): a shared node is reachable from more than one originating node, but
+its .originatingnode_id records only the first.
+
+Consequently, on a shared tree, a node’s deviation history can no longer be recovered by walking backward via
+.originatingnode_id (as deviation_history_of_node() does). Navigation instead carries the deviation history forward
+(see deviation_history_after_choice() and follow_movetext_path() in traverse_tree.py), which works on both trees and
+DAGs.
+
+See generally pgn4people-poc/docs/game-tree-concepts.md
+"""
+
+from hashlib import blake2b
+
+from . classes_arboreal import GameNode
+from . import constants
+
+# 128-bit digests make an accidental collision between two different subtrees vanishingly unlikely
+SUBTREE_HASH_SIZE_IN_BYTES = 16
+
+
+def compute_subtree_hashes(nodedict):
+    """
+    Returns a dictionary {node_id: subtree_hash}, where subtree_hash is a bytes digest of the subtree rooted at node_id.
+
+    The hash of a node combines (a) its halfmovenumber (so that the same moves at a different move number, which would
+    be displayed differently, do not hash alike) and (b) for each edge, in order, the edge’s movetext and the hash of
+    the edge’s destination. Two nodes therefore have equal hashes if and only if (barring a hash collision) their
+    subtrees are identical, including the order of alternatives. Comparing two subtrees is thus O(1) once the hashes
+    have been computed.
+
+    The hashes are computed bottom-up, in decreasing order of node_id. This suffices because buildtree() always assigns
+    a node a larger node_id than its originating node.
+    """
+    subtree_hashes = {}
+    for node_id in sorted(nodedict, reverse=True):
+        node = nodedict[node_id]
+        hasher = blake2b(digest_size=SUBTREE_HASH_SIZE_IN_BYTES)
+        hasher.update(node.halfmovenumber.to_bytes(4, "little"))
+        for edge in node.edgeslist:
+            # The NUL separator keeps, e.g., movetexts “e4”+“e5” distinct from “e4e”+“5”
+            hasher.update(edge.movetext.encode())
+            hasher.update(b"\0")
+            hasher.update(subtree_hashes[edge.destination_node_id])
+        subtree_hashes[node_id] = hasher.digest()
+    return subtree_hashes
+
+
+def share_identical_subtrees(nodedict, subtree_hashes = None):
+    """
+    Hash-conses nodedict in place: for every edge whose destination subtree is identical to a subtree already
+    encountered, redirects the edge to the earlier copy and deletes the later copy from nodedict (and from the
+    class-level sets of node IDs of GameNode).
+
+    subtree_hashes is the output of compute_subtree_hashes(nodedict); it is computed if not supplied. Entries for
+    deleted nodes are removed from it, so that it remains valid for the shared tree.
+
+    Returns the number of nodes deleted.
+
+    Note: After sharing, characterize_gametree() counts each node once per path that reaches it (see
+    characterize_shared_gametree()), so that, e.g., a terminal node shared by three lines still counts as three lines.
+    """
+    if subtree_hashes is None:
+        subtree_hashes = compute_subtree_hashes(nodedict)
+
+    # Maps each subtree hash to the node_id of the first node found with that hash
+    canonical_node_id_of_hash = {subtree_hashes[constants.INITIAL_NODE_ID]: constants.INITIAL_NODE_ID}
+    number_of_nodes_deleted = 0
+
+    # Increasing order of node_id visits every originating node before its destinations
+    for node_id in sorted(nodedict):
+        if node_id not in nodedict:
+            # Deleted earlier in this loop as part of a duplicate subtree
+            continue
+        for edge in nodedict[node_id].edgeslist:
+            destination_node_id = edge.destination_node_id
+            subtree_hash = subtree_hashes[destination_node_id]
+            canonical_node_id = canonical_node_id_of_hash.setdefault(subtree_hash, destination_node_id)
+            if canonical_node_id != destination_node_id:
+                edge.destination_node_id = canonical_node_id
+                number_of_nodes_deleted += delete_subtree(nodedict, destination_node_id, subtree_hashes)
+
+    return number_of_nodes_deleted
+
+
+def delete_subtree(nodedict, root_node_id, subtree_hashes):
+    """
+    Deletes from nodedict, from subtree_hashes, and from the class-level sets of GameNode, the node root_node_id and
+    every node below it. Returns the number of nodes deleted.
+
+    Uses an explicit stack rather than recursion, because subtrees can be deeper than Python’s recursion limit.
+    """
+    number_of_nodes_deleted = 0
+    stack_of_node_ids = [root_node_id]
+    while stack_of_node_ids:
+        node_id = stack_of_node_ids.pop()
+        node = nodedict.pop(node_id)
+        del subtree_hashes[node_id]
+        GameNode.set_of_node_IDs.discard(node_id)
+        GameNode.set_of_nonterminal_node_IDs.discard(node_id)
+        number_of_nodes_deleted += 1
+        stack_of_node_ids.extend(edge.destination_node_id for edge in node.edgeslist)
+    return number_of_nodes_deleted
@@ -0,0 +1,257 @@
+"""
+Storage of the game tree in a local SQLite database, for trees too large to hold in memory even compressed.
+
+export_gametree_to_sqlite() writes the nodes and edges of a built tree (and, for merged games, their result counts)
+into the tables:
+    nodes(node_id, halfmovenumber, depth, originatingnode_id, choice_id_at_originatingnode, number_of_edges,
+          white_wins, draws, black_wins, games)
+    edges(node_id, edge_index, movetext, destination_node_id)
+    metadata(key, value)
+with indexes on the originating node and the depth of each node and on the movetext of each edge, so that the database
+can also be queried directly (e.g., every position at which “Nf3” is an alternative). The rows are inserted by
+executemany(), in batches, within a single transaction, and the indexes are built once all rows are in.
+
+SQLiteNodeDict is a read-only {node_id: node} mapping over such a database, so that traverse_tree, the reports, and
+the exports run on it unchanged. Nodes are read a page at a time: a page is the nodes (and their edges) whose node_ids
+share the same quotient by constants.SQLITE_PAGE_SIZE_IN_NODES, which are mostly neighbors in the tree, because
+buildtree() numbers nodes in the order in which the PGN presents them. At most constants.SQLITE_PAGE_CACHE_SIZE pages
+are kept in memory; the least recently used page is evicted when another is read.
+"""
+
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+import os
+import sqlite3
+
+from . classes_arboreal import (Edge,
+                                StoredNode)
+from . import constants
+from . error_processing import fatal_error_exit_without_traceback
+from . result_counts import ResultCounts
+
+SCHEMA = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE nodes (node_id INTEGER PRIMARY KEY,
+                    halfmovenumber INTEGER NOT NULL,
+                    depth INTEGER NOT NULL,
+                    originatingnode_id INTEGER NOT NULL,
+                    choice_id_at_originatingnode INTEGER,
+                    number_of_edges INTEGER NOT NULL,
+                    white_wins INTEGER NOT NULL,
+                    draws INTEGER NOT NULL,
+                    black_wins INTEGER NOT NULL,
+                    games INTEGER NOT NULL);
+CREATE TABLE edges (node_id INTEGER NOT NULL,
+                    edge_index INTEGER NOT NULL,
+                    movetext TEXT NOT NULL,
+                    destination_node_id INTEGER NOT NULL,
+                    PRIMARY KEY (node_id, edge_index)) WITHOUT ROWID;
+"""
+
+INDEXES = """
+CREATE INDEX nodes_by_originating_node ON nodes (originatingnode_id);
+CREATE INDEX nodes_by_depth ON nodes (depth);
+CREATE INDEX edges_by_movetext ON edges (movetext);
+"""
+
+
+class SQLiteNodeDict(Mapping):
+    """
+    Read-only {node_id: node} mapping over a database written by export_gametree_to_sqlite(), with an LRU cache of
+    pages of nodes. See the module docstring.
+    """
+
+
+    def __init__(self,
+                 database_filepath,
+                 page_size_in_nodes = constants.SQLITE_PAGE_SIZE_IN_NODES,
+                 page_cache_size = constants.SQLITE_PAGE_CACHE_SIZE):
+        self.database_filepath = database_filepath
+        self.page_size_in_nodes = page_size_in_nodes
+        self.page_cache_size = page_cache_size
+        # Opened read-only, so that a database that doesn’t exist isn’t created
+        self.connection = sqlite3.connect(f"file:{os.path.abspath(database_filepath)}?mode=ro", uri=True)
+        metadata = dict(self.connection.execute("SELECT key, value FROM metadata"))
+        if metadata.get("layout_version") != str(constants.SQLITE_TREE_LAYOUT_VERSION):
+            raise sqlite3.DatabaseError(f"not a tree of layout version {constants.SQLITE_TREE_LAYOUT_VERSION}")
+        self.number_of_nodes = int(metadata["number_of_nodes"])
+        self.has_result_counts = metadata["has_result_counts"] == "1"
+        # {page number: {node_id: StoredNode}}, least recently used first
+        self.pages = OrderedDict()
+        self.number_of_pages_read = 0
+
+
+    def __reduce__(self):
+        # A connection can’t be pickled (e.g., to hand the tree to the worker processes of render_tables.py), so each
+        # process opens its own
+        return (SQLiteNodeDict, (self.database_filepath, self.page_size_in_nodes, self.page_cache_size))
+
+
+    def __getitem__(self, node_id):
+        page_number = node_id // self.page_size_in_nodes
+        page = self.pages.get(page_number)
+        if page is None:
+            page = self.read_page(page_number)
+        else:
+            self.pages.move_to_end(page_number)
+        try:
+            return page[node_id]
+        except KeyError:
+            raise KeyError(node_id) from None
+
+
+    def __iter__(self):
+        for (node_id,) in self.connection.execute("SELECT node_id FROM nodes ORDER BY node_id"):
+            yield node_id
+
+
+    def __len__(self):
+        return self.number_of_nodes
+
+
+    def read_page(self, page_number):
+        """
+        Reads the nodes, and their edges, of page page_number into the cache (evicting the least recently used page if
+        the cache is full), and returns the page as a dictionary {node_id: StoredNode}.
+        """
+        first_node_id = page_number * self.page_size_in_nodes
+        bounds = (first_node_id, first_node_id + self.page_size_in_nodes)
+        page = {row[0]: StoredNode(row)
+                for row in self.connection.execute("SELECT node_id, halfmovenumber, depth, originatingnode_id, "
+                                                   "choice_id_at_originatingnode, number_of_edges FROM nodes "
+                                                   "WHERE node_id >= ? AND node_id < ?", bounds)}
+        for node_id, edge_index, movetext, destination_node_id in self.connection.execute(
+                "SELECT node_id, edge_index, movetext, destination_node_id FROM edges "
+                "WHERE node_id >= ? AND node_id < ? ORDER BY node_id, edge_index", bounds):
+            edge = Edge(movetext, destination_node_id)
+            edge.reference_index = edge_index
+            page[node_id].edgeslist.append(edge)
+
+        self.number_of_pages_read += 1
+        self.pages[page_number] = page
+        if len(self.pages) > self.page_cache_size:
+            self.pages.popitem(last=False)
+        return page
+
+
+    def columns_of_gametree(self):
+        """
+        Returns, like compile_and_output_report.columns_of_gametree(), the 3-tuple of arrays (number_of_edges, depth,
+        halfmovenumber) in ascending order of node_id, read by one query rather than node by node.
+        """
+        number_of_edges_column = array("i")
+        depth_column = array("i")
+        halfmovenumber_column = array("i")
+        for number_of_edges, depth, halfmovenumber in self.connection.execute(
+                "SELECT number_of_edges, depth, halfmovenumber FROM nodes ORDER BY node_id"):
+            number_of_edges_column.append(number_of_edges)
+            depth_column.append(depth)
+            halfmovenumber_column.append(halfmovenumber)
+        return number_of_edges_column, depth_column, halfmovenumber_column
+
+
+    def read_result_counts(self, sort_alternatives_by = None):
+        """
+        Returns the ResultCounts stored with the tree, or None if the tree wasn’t merged from games.
+        """
+        if not self.has_result_counts:
+            return None
+        result_counts = ResultCounts(sort_alternatives_by)
+        for node_id, white_wins, draws, black_wins, games in self.connection.execute(
+                "SELECT node_id, white_wins, draws, black_wins, games FROM nodes ORDER BY node_id"):
+            # Node IDs missing from the table (e.g., after sharing subtrees) have zero counts
+            number_of_new_slots = node_id + 1 - len(result_counts.games)
+            for counts, count in ((result_counts.white_wins, white_wins),
+                                  (result_counts.draws, draws),
+                                  (result_counts.black_wins, black_wins),
+                                  (result_counts.games, games)):
+                if number_of_new_slots > 1:
+                    counts.frombytes(bytes((number_of_new_slots - 1) * counts.itemsize))
+                counts.append(count)
+        return result_counts
+
+
+def generate_rows_in_batches(rows, batch_size):
+    """
+    Generator that yields lists of up to batch_size consecutive items of the iterable rows.
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_gametree_to_sqlite(nodedict, database_filepath, result_counts = None):
+    """
+    Writes the tree nodedict (with result_counts, if not None) to a new SQLite database at database_filepath, replacing
+    any file there. Returns the number of nodes written. See the module docstring.
+    """
+    if os.path.exists(database_filepath):
+        os.remove(database_filepath)
+    connection = sqlite3.connect(database_filepath)
+    try:
+        # The database is written from scratch, so a crash midway loses nothing that a rerun wouldn’t rewrite
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.executescript(SCHEMA)
+
+        def counts_of_node(node_id):
+            if result_counts is None or node_id >= len(result_counts.games):
+                return (0, 0, 0, 0)
+            return (result_counts.white_wins[node_id],
+                    result_counts.draws[node_id],
+                    result_counts.black_wins[node_id],
+                    result_counts.games[node_id])
+
+        node_rows = ((node_id, node.halfmovenumber, node.depth, node.originatingnode_id,
+                      node.choice_id_at_originatingnode, node.number_of_edges) + counts_of_node(node_id)
+                     for node_id, node in nodedict.items())
+        edge_rows = ((node_id, edge_index, edge.movetext, edge.destination_node_id)
+                     for node_id, node in nodedict.items()
+                     for edge_index, edge in enumerate(node.edgeslist))
+
+        number_of_nodes = 0
+        with connection:
+            for batch in generate_rows_in_batches(node_rows, constants.SQLITE_INSERT_BATCH_SIZE):
+                connection.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                number_of_nodes += len(batch)
+            for batch in generate_rows_in_batches(edge_rows, constants.SQLITE_INSERT_BATCH_SIZE):
+                connection.executemany("INSERT INTO edges VALUES (?, ?, ?, ?)", batch)
+            connection.executemany("INSERT INTO metadata VALUES (?, ?)",
+                                   (("layout_version", str(constants.SQLITE_TREE_LAYOUT_VERSION)),
+                                    ("number_of_nodes", str(number_of_nodes)),
+                                    ("has_result_counts", "1" if result_counts is not None else "0")))
+        connection.executescript(INDEXES)
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+    return number_of_nodes
+
+
+def export_gametree_to_sqlite_CLI_package(database_filepath, nodedict, result_counts = None):
+    """
+    Writes the tree nodedict to a SQLite database at database_filepath (see export_gametree_to_sqlite()).
+    """
+    try:
+        number_of_nodes = export_gametree_to_sqlite(nodedict, database_filepath, result_counts)
+    except (OSError, sqlite3.Error) as err:
+        fatal_error_exit_without_traceback(f"Could not write the tree to the database “{database_filepath}”.\n{err}")
+    print(f"Wrote the tree ({number_of_nodes} positions) to the database {database_filepath}.")
+
+
+def open_sqlite_gametree_CLI_package(database_filepath, sort_alternatives_by = None):
+    """
+    Returns the 2-tuple (nodedict, result_counts) of the tree stored in the database at database_filepath, where
+    nodedict is a SQLiteNodeDict and result_counts is None unless the tree was merged from games.
+    """
+    try:
+        nodedict = SQLiteNodeDict(database_filepath)
+        result_counts = nodedict.read_result_counts(sort_alternatives_by)
+    except (sqlite3.Error, KeyError) as err:
+        fatal_error_exit_without_traceback(f"Could not read a tree from the database “{database_filepath}”.\n{err}")
+    return nodedict, result_counts
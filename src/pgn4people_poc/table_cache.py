@@ -0,0 +1,178 @@
+"""
+Cache of compiled variations tables, so that returning to a line already shown costs one dictionary lookup.
+
+Users move back and forth among the same few lines. Compiling the table of a line (see
+traverse_tree.compile_variations_table()) walks the whole line, and builds, along with the table, the lookup table,
+the example commands, and the display orders against which the user’s next choice is checked. VariationsTableCache
+keeps all of these, as a CompiledTable, for the most recently shown lines, keyed by their deviation histories. (A
+deviation history is a dictionary, so its key is the frozenset of its (node_id, choice_id) items: two deviation
+histories with the same items describe the same line, in whatever order they were built.)
+
+The cache holds at most max_entries tables and at most max_bytes (estimated) bytes of them, evicting the least
+recently used table first. The size of a table is estimated, by sys.getsizeof(), from the objects that compiling it
+created; the edges to which it refers belong to the tree and aren’t counted.
+
+A CompiledTable is never modified once it is cached: a RenderContext that shows it refers to its containers rather
+than copying them. Because a table depends on the tree (and on the order of its alternatives), the cache must be
+cleared when the tree is replaced (e.g., in watch mode). The cache may be shared by several sessions, or threads, and
+so takes a lock for each operation.
+"""
+
+from collections import OrderedDict
+import sys
+import threading
+
+from . import constants
+from . profiling import count_in_profile
+
+
+class CompiledTable:
+    """
+    The variations table of one line, together with what compiling it produced for the session that shows it.
+
+    Object attributes:
+        variations_table: List of the Variations_Table_Line of each line of the table
+        fullmovenummber_to_node_id_lookup_table, examples_command_triples_white, examples_command_triples_black,
+            display_order_of_node: As the attributes of RenderContext of the same names, for this table
+        size_in_bytes: Estimated size of all of the above (see estimate_size_of_compiled_table())
+    """
+
+    __slots__ = ("variations_table",
+                 "fullmovenummber_to_node_id_lookup_table",
+                 "examples_command_triples_white",
+                 "examples_command_triples_black",
+                 "display_order_of_node",
+                 "size_in_bytes")
+
+
+    def __init__(self):
+        self.variations_table = None
+        self.fullmovenummber_to_node_id_lookup_table = {}
+        self.examples_command_triples_white = []
+        self.examples_command_triples_black = []
+        self.display_order_of_node = {}
+        self.size_in_bytes = 0
+
+
+def estimate_size_of_compiled_table(compiled_table):
+    """
+    Returns the total sys.getsizeof(), in bytes, of compiled_table and of the containers and objects it alone refers to.
+    (The edges, and the small integers, are shared with the tree and aren’t counted.)
+    """
+    size_in_bytes = sys.getsizeof(compiled_table) + sys.getsizeof(compiled_table.variations_table)
+    for variations_line in compiled_table.variations_table:
+        size_in_bytes += sys.getsizeof(variations_line) + sys.getsizeof(vars(variations_line))
+        if variations_line.list_of_alternative_edges_to_display is not None:
+            size_in_bytes += sys.getsizeof(variations_line.list_of_alternative_edges_to_display)
+
+    lookup_table = compiled_table.fullmovenummber_to_node_id_lookup_table
+    size_in_bytes += sys.getsizeof(lookup_table)
+    for key, value in lookup_table.items():
+        size_in_bytes += sys.getsizeof(key) + sys.getsizeof(value)
+
+    for examples_command_triples in (compiled_table.examples_command_triples_white,
+                                     compiled_table.examples_command_triples_black):
+        size_in_bytes += sys.getsizeof(examples_command_triples)
+        size_in_bytes += sum(map(sys.getsizeof, examples_command_triples))
+
+    size_in_bytes += sys.getsizeof(compiled_table.display_order_of_node)
+    size_in_bytes += sum(map(sys.getsizeof, compiled_table.display_order_of_node.values()))
+    return size_in_bytes
+
+
+def key_of_deviation_history(deviation_history):
+    """
+    Returns the hashable key, in a VariationsTableCache, of the line given by deviation_history.
+    """
+    return frozenset(deviation_history.items())
+
+
+class VariationsTableCache:
+    """
+    Bounded LRU cache {key of deviation history: CompiledTable}. See the module docstring.
+
+    Object attributes:
+        max_entries: Maximum number of tables held
+        max_bytes: Maximum total estimated size of the tables held
+        compiled_table_of_key: OrderedDict {key of deviation history: CompiledTable}, least recently used first
+        total_bytes: Total estimated size of the tables held
+        number_of_hits, number_of_misses, number_of_evictions: Counts, since the cache was created, of lookups that
+            found a table, of lookups that didn’t, and of tables evicted to respect the bounds
+        lock: threading.Lock taken by each operation
+    """
+
+
+    def __init__(self, max_entries = constants.TABLE_CACHE_MAX_ENTRIES, max_bytes = constants.TABLE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compiled_table_of_key = OrderedDict()
+        self.total_bytes = 0
+        self.number_of_hits = 0
+        self.number_of_misses = 0
+        self.number_of_evictions = 0
+        self.lock = threading.Lock()
+
+
+    def __len__(self):
+        return len(self.compiled_table_of_key)
+
+
+    def __contains__(self, deviation_history):
+        # Neither counted as a hit or miss nor made the most recently used (e.g., when prefetching checks the cache)
+        with self.lock:
+            return key_of_deviation_history(deviation_history) in self.compiled_table_of_key
+
+
+    def get(self, deviation_history):
+        """
+        Returns the CompiledTable of the line given by deviation_history, or None if it isn’t cached.
+        """
+        key = key_of_deviation_history(deviation_history)
+        with self.lock:
+            compiled_table = self.compiled_table_of_key.get(key)
+            if compiled_table is None:
+                self.number_of_misses += 1
+            else:
+                self.compiled_table_of_key.move_to_end(key)
+                self.number_of_hits += 1
+        count_in_profile("table cache misses" if compiled_table is None else "table cache hits")
+        return compiled_table
+
+
+    def put(self, deviation_history, compiled_table):
+        """
+        Caches compiled_table as that of the line given by deviation_history, evicting the least recently used tables
+        as needed to respect the bounds. A table larger than max_bytes on its own isn’t cached.
+        """
+        if compiled_table.size_in_bytes > self.max_bytes or self.max_entries == 0:
+            return
+        key = key_of_deviation_history(deviation_history)
+        with self.lock:
+            replaced_table = self.compiled_table_of_key.pop(key, None)
+            if replaced_table is not None:
+                self.total_bytes -= replaced_table.size_in_bytes
+            self.compiled_table_of_key[key] = compiled_table
+            self.total_bytes += compiled_table.size_in_bytes
+            while len(self.compiled_table_of_key) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, evicted_table = self.compiled_table_of_key.popitem(last=False)
+                self.total_bytes -= evicted_table.size_in_bytes
+                self.number_of_evictions += 1
+
+
+    def clear(self):
+        """
+        Empties the cache (e.g., when the tree is replaced). The counters are kept.
+        """
+        with self.lock:
+            self.compiled_table_of_key.clear()
+            self.total_bytes = 0
+
+
+def create_table_cache_CLI_package(max_entries, max_mebibytes):
+    """
+    Returns a VariationsTableCache bounded by max_entries tables and max_mebibytes MiB, or None if max_entries is 0
+    (i.e., caching is switched off).
+    """
+    if max_entries == 0:
+        return None
+    return VariationsTableCache(max_entries, max_mebibytes * 1024 * 1024)
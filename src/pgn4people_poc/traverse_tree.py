@@ -6,28 +6,89 @@ See generally pgn4people-poc/docs/game-tree-concepts.md
 
 
 from pgn4people_poc.error_processing import fatal_developer_error
-from . construct_output import print_single_node_to_console
+from . classes_arboreal import Edge
+from . compress_tree import CompressedNodeDict
+from . construct_output import print_variations_table_to_console
 from . import constants
+from . profiling import profile_stage
+from . table_cache import (CompiledTable,
+                           estimate_size_of_compiled_table)
 from . pgn_utilities import (assign_player_color_string,
                              fullmovenumber_from_halfmove,
                              is_white_move)
 
-def display_mainline_given_deviation_history(nodedict,
-                                             deviation_history,
-                                             fullmovenummber_to_node_id_lookup_table = None,
-                                             examples_command_triples_white = None,
-                                             examples_command_triples_black = None
-                                             ):
+def display_mainline_given_deviation_history(nodedict, render_context, result_counts = None, table_cache = None):
     """
-    Constructs and displays the entire variations table corresponding to deviation_history.
+    Constructs (see compile_variations_table_of_context()) and displays the entire variations table corresponding to
+    render_context.deviation_history.
+    """
+    with profile_stage("compile table"):
+        variations_table = compile_variations_table_of_context(nodedict, render_context, result_counts, table_cache)
+
+    with profile_stage("print table"):
+        print_variations_table_to_console(variations_table, result_counts)
+
+
+def compile_variations_table_of_context(nodedict, render_context, result_counts = None, table_cache = None):
+    """
+    Returns the variations table (see compile_variations_table()) of render_context.deviation_history, and points the
+    lookup table, the example commands, and the display orders of render_context (an instance of RenderContext) to
+    those of the table.
 
-    When present the following three arguments are modified in place:
+    If table_cache (a VariationsTableCache) is not None, a table already in it is reused rather than compiled again,
+    and a table that is compiled is added to it.
+    """
+    compiled_table = None if table_cache is None else table_cache.get(render_context.deviation_history)
+    if compiled_table is None:
+        compiled_table = compile_table_of_deviation_history(nodedict, render_context.deviation_history, result_counts)
+        if table_cache is not None:
+            table_cache.put(render_context.deviation_history, compiled_table)
+
+    # The containers of a CompiledTable are never modified again, so they are shared rather than copied
+    render_context.fullmovenummber_to_node_id_lookup_table = compiled_table.fullmovenummber_to_node_id_lookup_table
+    render_context.examples_command_triples_white = compiled_table.examples_command_triples_white
+    render_context.examples_command_triples_black = compiled_table.examples_command_triples_black
+    render_context.display_order_of_node = compiled_table.display_order_of_node
+    return compiled_table.variations_table
+
+
+def compile_table_of_deviation_history(nodedict, deviation_history, result_counts = None):
+    """
+    Returns a new CompiledTable of the variations table of deviation_history (see compile_variations_table()).
+    """
+    compiled_table = CompiledTable()
+    compiled_table.variations_table = compile_variations_table(nodedict,
+                                                               deviation_history,
+                                                               compiled_table.fullmovenummber_to_node_id_lookup_table,
+                                                               compiled_table.examples_command_triples_white,
+                                                               compiled_table.examples_command_triples_black,
+                                                               result_counts,
+                                                               compiled_table.display_order_of_node)
+    compiled_table.size_in_bytes = estimate_size_of_compiled_table(compiled_table)
+    return compiled_table
+
+
+def compile_variations_table(nodedict,
+                             deviation_history,
+                             fullmovenummber_to_node_id_lookup_table = None,
+                             examples_command_triples_white = None,
+                             examples_command_triples_black = None,
+                             result_counts = None,
+                             display_order_of_node = None
+                             ):
+    """
+    Constructs the entire variations table corresponding to deviation_history, and returns it as the list, in order,
+    of the Variations_Table_Line of each line of the table. Nothing is output, and neither nodedict nor its nodes are
+    modified, so that any number of threads may compile tables from the same tree at once (each with its own
+    arguments).
+
+    When present the following four arguments are modified in place:
         fullmovenummber_to_node_id_lookup_table
         examples_command_triples_white
         examples_command_triples_black
-    Thus nothing is explicitly returned.
+        display_order_of_node
     
-    Outputs the mainline path through the game, given the supplied devaition history, line by line.
+    Compiles the mainline path through the game, given the supplied devaition history, line by line.
 
     nodedict:   Dictionary of (node_id : node) key,value pairs, where node is an instance of class
                 GameNode.
@@ -41,6 +102,13 @@ def display_mainline_given_deviation_history(nodedict,
     The following are optional here, because they are specific to the CLI version, not the web-app version.
         examples_command_triples_white=None,
         examples_command_triples_black=None
+    result_counts:
+                If not None, the ResultCounts of the games merged into the tree, whose score for each displayed move is
+                shown, and by which the alternatives may be sorted.
+    display_order_of_node:
+                A dictionary {node_id: display order of its edges (see construct_display_order_of_node_edges())} of
+                each nonterminal node of the table, by which the user’s choice of an alternative is translated back to
+                an edge.
     """
 
     # Determine whether to update these elements that are required for input validation and user guidance in the CLI
@@ -59,17 +127,29 @@ def display_mainline_given_deviation_history(nodedict,
         examples_command_triples_white.clear()
         examples_command_triples_black.clear()
 
+    if display_order_of_node is not None:
+        display_order_of_node.clear()
+
     # Start at initial node    
     node_id = constants.INITIAL_NODE_ID
     inbound_carryover_white_edge = None
 
-    # Allows print_single_node() to take special action when it prints the first node, e.g.,
-    # creating extra vertical white space and printing column headings.
-    constants.FIRST_NODE_TO_BE_PRINTED = True
+    variations_table = []
 
     do_continue = True
 
     while do_continue:
+        # A chain of unary nodes of a compressed tree (which can’t include a deviation) is compiled in one step
+        chain_and_position = unary_chain_of_node(nodedict, node_id)
+        if chain_and_position is not None:
+            node_id, inbound_carryover_white_edge = \
+                compile_variations_lines_of_unary_chain(*chain_and_position,
+                                                        inbound_carryover_white_edge,
+                                                        variations_table,
+                                                        fullmovenummber_to_node_id_lookup_table,
+                                                        display_order_of_node)
+            continue
+
         # Determine which edge should be treated as the main line
         # Looks whether node_id is a node at which a deviation is prescribed by history
         if node_id in deviation_history.keys():
@@ -99,14 +179,21 @@ def display_mainline_given_deviation_history(nodedict,
                                             fullmovenumber,
                                             number_of_edges)
 
+        if node.number_of_edges > 0:
+            display_order_of_edges = construct_display_order_of_node_edges(node, choice_id_as_mainline, result_counts)
+            if display_order_of_node is not None:
+                display_order_of_node[node_id] = display_order_of_edges
+        else:
+            display_order_of_edges = None
+
         variations_line = compile_movetext_elements_for_output_for_single_node(node,
-                                                                               choice_id_as_mainline,
+                                                                               display_order_of_edges,
                                                                                inbound_carryover_white_edge)
         
         # Reset inbound_carryover_white_edge
         inbound_carryover_white_edge = None
 
-        # Extracts useful elements from variations_line to determine whether to call print_single_node_to_console()
+        # Extracts useful elements from variations_line to determine whether to add a line to the table
         outbound_carryover_white_edge = variations_line.outbound_carryover_white_edge
         is_terminal_node = variations_line.is_terminal_node
         mainline_edge_white = variations_line.mainline_edge_white
@@ -121,7 +208,7 @@ def display_mainline_given_deviation_history(nodedict,
         elif (not is_terminal_node) or mainline_edge_white:
             # Produce a line of output is either (a) the node is not a terminal node or (b) even if the node is a 
             # terminal node but there was a residual carryover_white_edge that needs to be flushed.
-            print_single_node_to_console(variations_line)
+            variations_table.append(variations_line)
 
         # Finds the next node in the main line
         if do_continue:
@@ -130,6 +217,73 @@ def display_mainline_given_deviation_history(nodedict,
             node_id = next_node_id
     # End of while not is_terminal_node loop
 
+    return variations_table
+
+
+def unary_chain_of_node(nodedict, node_id):
+    """
+    Returns the 2-tuple (UnaryChain, position in it) of node node_id if nodedict is a CompressedNodeDict (see
+    compress_tree.py) in which the node is unary; otherwise returns None.
+    """
+    if isinstance(nodedict, CompressedNodeDict):
+        return nodedict.chain_and_position_of(node_id)
+    return None
+
+
+def end_of_walk_through_unary_chain(chain, position, target_node_id):
+    """
+    Returns the 2-tuple (stop_position, node_id_reached) of a walk along chain from the member at position that stops
+    at target_node_id if that is a later member of the chain, and otherwise leaves the chain: stop_position is then
+    the length of the chain, and node_id_reached is chain.exit_node_id.
+    """
+    node_ids = chain.node_ids
+    if target_node_id in node_ids[position:]:
+        return node_ids.index(target_node_id, position), target_node_id
+    return len(node_ids), chain.exit_node_id
+
+
+def compile_variations_lines_of_unary_chain(chain,
+                                            position,
+                                            inbound_carryover_white_edge,
+                                            variations_table,
+                                            fullmovenummber_to_node_id_lookup_table,
+                                            display_order_of_node):
+    """
+    Does for each member of chain from position on what compile_variations_table() does for each node, reading the
+    chain’s node_ids and packed movetexts directly rather than reconstructing an ExpandedUnaryNode of each member: adds
+    to variations_table the line of each of Black’s moves (with White’s preceding move, which, having no alternatives, is
+    always carried over), and, if they are not None, updates the lookup table and the display orders.
+
+    Returns the 2-tuple (chain.exit_node_id, the carryover White edge into that node, or None).
+    """
+    halfmovenumber = chain.first_halfmovenumber + position
+    for position in range(position, len(chain.node_ids)):
+        fullmovenumber = fullmovenumber_from_halfmove(halfmovenumber)
+        is_player_white = is_white_move(halfmovenumber)
+        node_id = chain.node_ids[position]
+        if fullmovenummber_to_node_id_lookup_table is not None:
+            update_fullmovenummber_to_node_id_lookup_table(fullmovenummber_to_node_id_lookup_table,
+                                                           fullmovenumber,
+                                                           assign_player_color_string(is_player_white),
+                                                           node_id,
+                                                           1)
+        if display_order_of_node is not None:
+            display_order_of_node[node_id] = [constants.INDEX_MAINLINE]
+
+        mainline_edge = Edge(chain.movetext_at(position), chain.destination_at(position))
+        mainline_edge.reference_index = constants.INDEX_MAINLINE
+        if is_player_white:
+            inbound_carryover_white_edge = mainline_edge
+        else:
+            variations_table.append(Variations_Table_Line(False,
+                                                          is_player_white = False,
+                                                          fullmovenumber = fullmovenumber,
+                                                          mainline_edge_white = inbound_carryover_white_edge,
+                                                          mainline_edge_black = mainline_edge))
+            inbound_carryover_white_edge = None
+        halfmovenumber += 1
+    return chain.exit_node_id, inbound_carryover_white_edge
+
 
 def deviation_history_of_node(nodedict, target_node_id):
     """
@@ -178,12 +332,122 @@ def deviation_history_of_node(nodedict, target_node_id):
 
 
 
+def node_id_from_movetext_path(nodedict, movetext_path, starting_node_id = constants.INITIAL_NODE_ID):
+    """
+    Follows a path of movetexts (e.g., ["e4", "c5", "Nf3", "d6"]) from starting_node_id (by default, the initial node)
+    and returns a 2-tuple:
+        (node_id_reached, number_of_movetexts_matched)
+
+    If every movetext in movetext_path was found, node_id_reached is the node reached by playing the whole path and
+    number_of_movetexts_matched == len(movetext_path).
+
+    Otherwise, node_id_reached is the node reached by the longest matching prefix of movetext_path, and
+    movetext_path[number_of_movetexts_matched] is the first movetext that is not available at node_id_reached.
+
+    Each step is a dictionary lookup via GameNode.edge_from_movetext(), so the cost is independent of the number of
+    alternatives at each node.
+    """
+    node_id = starting_node_id
+    for number_of_movetexts_matched, movetext in enumerate(movetext_path):
+        edge = nodedict[node_id].edge_from_movetext(movetext)
+        if edge is None:
+            return node_id, number_of_movetexts_matched
+        node_id = edge.destination_node_id
+    return node_id, len(movetext_path)
+
+
+
+def follow_movetext_path(nodedict, movetext_path):
+    """
+    Follows movetext_path (a list of movetexts, each of which must be available at the node reached by its
+    predecessors; see node_id_from_movetext_path()) from the initial node and returns the 2-tuple:
+        (target_node_id, deviation_history)
+    where deviation_history is the deviation history (see deviation_history_of_node()) that brings play to
+    target_node_id along that path.
+
+    Unlike deviation_history_of_node(), this works forward from the initial node, and thus also on a tree whose
+    identical subtrees have been shared (see share_subtrees.py), in which a node can have more than one originating
+    node.
+    """
+    deviation_history = {}
+    node_id = constants.INITIAL_NODE_ID
+    for movetext in movetext_path:
+        edge = nodedict[node_id].edge_from_movetext(movetext)
+        if edge is None:
+            fatal_developer_error(f"Movetext “{movetext}” not available at node {node_id}; path should be validated.")
+        if edge.reference_index != constants.INDEX_MAINLINE:
+            deviation_history[node_id] = edge.reference_index
+        node_id = edge.destination_node_id
+    return node_id, deviation_history
+
+
+def movetext_path_given_deviation_history(nodedict, deviation_history, target_node_id):
+    """
+    Returns the list of movetexts of the path from the initial node to target_node_id along which deviation_history
+    (see deviation_history_of_node()) brings play. This is the inverse of follow_movetext_path(), and lets the same
+    line be found again in a different tree (e.g., one rebuilt after the PGN file changed).
+    """
+    movetext_path = []
+    node_id = constants.INITIAL_NODE_ID
+    while node_id != target_node_id:
+        # A chain of unary nodes of a compressed tree is passed in one step, its movetexts sliced out together
+        chain_and_position = unary_chain_of_node(nodedict, node_id)
+        if chain_and_position is not None:
+            chain, position = chain_and_position
+            stop_position, node_id = end_of_walk_through_unary_chain(chain, position, target_node_id)
+            movetext_path.extend(chain.movetexts_between(position, stop_position))
+            continue
+        node = nodedict[node_id]
+        if node.number_of_edges == 0:
+            fatal_developer_error(f"Node {target_node_id} is not reached by deviation history {deviation_history}.")
+        edge = node.edgeslist[deviation_history.get(node_id, constants.INDEX_MAINLINE)]
+        movetext_path.append(edge.movetext)
+        node_id = edge.destination_node_id
+    return movetext_path
+
+
+def deviation_history_after_choice(nodedict, deviation_history, node_id_chosen, choice_id):
+    """
+    Returns the deviation history that results when, on the line displayed for deviation_history, the user chooses the
+    edge with (original) index choice_id at node node_id_chosen.
+
+    The result keeps each deviation of deviation_history that occurs on the displayed line before node_id_chosen, adds
+    the deviation (node_id_chosen, choice_id) (unless choice_id is the mainline index), and drops every deviation after
+    node_id_chosen.
+
+    On a tree, the result equals deviation_history_of_node() applied to the destination of the chosen edge. Because it
+    walks forward from the initial node rather than backward via .originatingnode_id, it also works on a tree whose
+    identical subtrees have been shared (see share_subtrees.py).
+    """
+    new_deviation_history = {}
+    node_id = constants.INITIAL_NODE_ID
+    while node_id != node_id_chosen:
+        # A chain of unary nodes of a compressed tree (which can’t include a deviation) is passed in one step
+        chain_and_position = unary_chain_of_node(nodedict, node_id)
+        if chain_and_position is not None:
+            _, node_id = end_of_walk_through_unary_chain(*chain_and_position, node_id_chosen)
+            continue
+        node = nodedict[node_id]
+        if node.number_of_edges == 0:
+            fatal_developer_error(f"Node {node_id_chosen} is not on the line given by {deviation_history}.")
+        choice_id_as_mainline = deviation_history.get(node_id, constants.INDEX_MAINLINE)
+        if choice_id_as_mainline != constants.INDEX_MAINLINE:
+            new_deviation_history[node_id] = choice_id_as_mainline
+        node_id = node.edgeslist[choice_id_as_mainline].destination_node_id
+
+    if choice_id != constants.INDEX_MAINLINE:
+        new_deviation_history[node_id_chosen] = choice_id
+    return new_deviation_history
+
+
+
 def compile_movetext_elements_for_output_for_single_node(node,
-                                                         choice_id_as_mainline,
+                                                         display_order_of_edges,
                                                          inbound_carryover_white_edge):
     """
     Compiles the movetext elements to be output for a single line of the variations table,
-    where the line corresponds to a single node.
+    where the line corresponds to a single node, whose edges are shown in the order display_order_of_edges (see
+    construct_display_order_of_node_edges(); None for a terminal node).
 
     If inbound_carryover_white_edge is not None (this should occur only when node belongs to Black),
     inbound_carryover_white_edge is used as mainline_edge_white on the same line as Black’s move.
@@ -235,12 +499,6 @@ def compile_movetext_elements_for_output_for_single_node(node,
     # Case: NOT a terminal node. Thus we proceed to print a line
     is_terminal_node = False
 
-    # Constructs lists of indices reflecting a reordered list of edges to display
-    construct_display_order_of_node_edges(node, choice_id_as_mainline)
-
-    # The following is a list of indices
-    display_order_of_edges = node.display_order_of_edges
-
     # Gets mainline edge for the player with non-mainline alternatives
     mainline_edge = node.edgeslist[display_order_of_edges[0]]
 
@@ -292,47 +550,59 @@ def compile_movetext_elements_for_output_for_single_node(node,
     return variations_line
 
 
-def construct_display_order_of_node_edges(node, choice_id_as_mainline):
+def construct_display_order_of_node_edges(node, choice_id_as_mainline, result_counts = None):
     """
-    For (a) a node (an instance of class GameNode) and (b) choice_id_as_mainline, an integer, constructs
-        node.display_order_of_edges
+    For (a) a node (an instance of class GameNode) and (b) choice_id_as_mainline, an integer, returns
+        display_order_of_edges
 
-        where node.display_order_of_edges is a list of INDICES (not edges)
+        where display_order_of_edges is a list of INDICES (not edges)
 
         such that
-            len(node.display_order_of_edges) = node.number_of_edges
-            node.display_order_of_edges[0] = choice_id_as_mainline
+            len(display_order_of_edges) = node.number_of_edges
+            display_order_of_edges[0] = choice_id_as_mainline
             if choice_id_as_mainline != 0,
-                node.display_order_of_edges[1] = 0
-            and the remaining slots in node.display_order_of_edges are filled with remaining edges in node.edgeslist and
-            in that order. I.e., the sequence: for j=2,…,len-1, node.display_order_of_edges[j] is the same as
+                display_order_of_edges[1] = 0
+            and the remaining slots in display_order_of_edges are filled with remaining edges in node.edgeslist and
+            in that order. I.e., the sequence: for j=2,…,len-1, display_order_of_edges[j] is the same as
             for k = 1,…,len-1 (k≠choice_id_as_mainline)
             In other words, (a) choice_id_as_mainline becomes the 0th element, (b) the previously mainline move
             edgeslist[0] becomes the first alternative,  and (c) the original indices of all the other elements of
             edgeslist are imported into display_order_of_edges in numerical order.
-    
-    This function does NOT return anything. It adds a property to an existing instance of class Edge.
+
+    If result_counts (an instance of ResultCounts) has a .sort_alternatives_by, the alternatives (i.e., all but the
+    0th element) are instead sorted, best first, by result_counts.sort_key_of_edge() for the player to move.
+
+    The node is NOT modified: the display order depends on the line being displayed, so it belongs to whoever displays
+    it (e.g., a RenderContext), not to the (shared) tree.
     """
 
-    node.display_order_of_edges = []
+    display_order_of_edges = []
 
-    # Assigns index of designated non-mainline edge to zero-th element of .display_order_of_edges
-    node.display_order_of_edges.append(choice_id_as_mainline)
+    # Assigns index of designated non-mainline edge to zero-th element of display_order_of_edges
+    display_order_of_edges.append(choice_id_as_mainline)
 
     for jindex in range(0, node.number_of_edges):
         if jindex != choice_id_as_mainline:
-            node.display_order_of_edges.append(jindex)
+            display_order_of_edges.append(jindex)
         else:
             # When jindex == choice_id_as_mainline, that element should not be copied to display_order_of_edges
             # because it was already copied in the first step.
             pass
     # end for
-    
-    if len(node.display_order_of_edges) != node.number_of_edges:
+
+    if result_counts is not None and result_counts.sort_alternatives_by is not None:
+        is_player_white = is_white_move(node.halfmovenumber)
+        display_order_of_edges[1:] = sorted(
+            display_order_of_edges[1:],
+            key = lambda jindex: result_counts.sort_key_of_edge(node.edgeslist[jindex], is_player_white))
+
+    if len(display_order_of_edges) != node.number_of_edges:
         fatal_developer_error(
-          f".display_order_of_edges had {len(node.display_order_of_edges)} elements rather than {node.number_of_edges}."
+          f"display_order_of_edges had {len(display_order_of_edges)} elements rather than {node.number_of_edges}."
         )
 
+    return display_order_of_edges
+
 
 class Variations_Table_Line():
     def __init__(self,
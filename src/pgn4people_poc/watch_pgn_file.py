@@ -0,0 +1,96 @@
+"""
+Watch mode: while the user explores the tree, a background thread polls the PGN file’s size and modification time,
+and, when either changes, rebuilds the tree. The interactive loop in main() picks up the rebuilt tree the next time it
+displays a table, so it never waits for a rebuild.
+
+The rebuild reuses whatever cached parse the chosen options provide (e.g., with --incremental, only appended games are
+parsed). If the rebuild fails (e.g., the file was saved while only partly written), the previous tree is kept, and the
+watch continues.
+"""
+
+import os
+import threading
+
+from yachalk import chalk
+
+from . import constants
+from . error_processing import print_nonfatal_error
+
+
+def signature_of_file(path_to_file):
+    """
+    Returns the (size, modification time) of the file at path_to_file, or None if there is no such file (e.g., while it
+    is being replaced).
+    """
+    try:
+        stat_result = os.stat(path_to_file)
+    except FileNotFoundError:
+        return None
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+
+class PGNFileWatcher:
+    """
+    Polls the file at path_to_pgnfile every poll_interval seconds in a background (daemon) thread, and calls
+    rebuild_gametree() (with no arguments) each time the file has changed.
+
+    The value returned by the most recent successful rebuild is held until the main thread takes it with
+    take_rebuilt_gametree(). Because it is handed over whole, under a lock, the main thread sees either the old tree or
+    the completely rebuilt one, never a tree under construction.
+    """
+
+
+    def __init__(self, path_to_pgnfile, rebuild_gametree, poll_interval = constants.WATCH_POLL_INTERVAL_SECONDS):
+        self.path_to_pgnfile = path_to_pgnfile
+        self.rebuild_gametree = rebuild_gametree
+        self.poll_interval = poll_interval
+        self.file_signature = signature_of_file(path_to_pgnfile)
+        self.rebuilt_gametree = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target = self.watch, name = "pgn-file-watcher", daemon = True)
+
+
+    def start(self):
+        self.thread.start()
+
+
+    def stop(self):
+        self.stop_event.set()
+
+
+    def watch(self):
+        while not self.stop_event.wait(self.poll_interval):
+            file_signature = signature_of_file(self.path_to_pgnfile)
+            if file_signature is None or file_signature == self.file_signature:
+                continue
+            self.file_signature = file_signature
+
+            try:
+                rebuilt_gametree = self.rebuild_gametree()
+            except SystemExit:
+                # The rebuild reported its own error (e.g., a PGN error) before trying to exit
+                print_nonfatal_error("\nStill watching the PGN file; the previous tree is kept until it changes again.")
+                continue
+            except Exception as error:
+                # Any other error (e.g., EOFError from a compressed file that is only partly written) mustn’t end the
+                # watch, or the file would never be picked up once it is completely written
+                print_nonfatal_error(f"\nThe tree couldn’t be rebuilt from the PGN file ({type(error).__name__}: "
+                                     f"{error}).\nStill watching the PGN file; the previous tree is kept until it "
+                                     f"changes again.")
+                continue
+
+            with self.lock:
+                self.rebuilt_gametree = rebuilt_gametree
+            print(chalk.magenta(f"\nThe PGN file changed, and its tree has been rebuilt. Enter "
+                                f"‘{constants.REFRESH_COMMAND}’ (or any command) to see it."))
+
+
+    def take_rebuilt_gametree(self):
+        """
+        Returns the most recently rebuilt tree not yet taken, or None if there is none.
+        """
+        with self.lock:
+            rebuilt_gametree = self.rebuilt_gametree
+            self.rebuilt_gametree = None
+        return rebuilt_gametree
@@ -0,0 +1,132 @@
+"""
+Serializes a game tree back to PGN, e.g., after it has been merged from several games, so that the result can be
+opened by any other chess program (or by pgn4people itself).
+
+The movetext is generated, token by token, by an iterative walk from the initial node that follows the edges of the
+tree (not .originatingnode_id), so it also serializes trees whose identical subtrees have been shared. At each node, the
+main-line move is written first, then each alternative, in its original order, as a parenthesized variation, and then
+the continuation of the main line. This is the standard layout of PGN variations, and reading PGN so laid out with
+buildtree() numbers nodes in the same order in which they are written. Thus, for a tree read from a PGN in this layout
+(including any PGN written here), reading the written PGN with buildtree() reproduces the tree exactly: the same
+node_ids, depths, edges, and edge indices. (A PGN that nests a sibling alternative inside a variation, e.g.,
+“1.e4 ( 1.d4 ( 1.c4 ) )”, yields the same lines, but is written in the standard layout, “1.e4 ( 1.d4 ) ( 1.c4 )”.)
+
+The tokens are written to the output stream one line at a time, so no string of the whole movetext is ever built.
+"""
+
+import itertools
+import sys
+
+from . import constants
+from . error_processing import fatal_error_exit_without_traceback
+from . pgn_utilities import (fullmovenumber_from_halfmove,
+                             is_white_move)
+
+# Kinds of the items on the stack of work still to be written by generate_movetext_tokens()
+WRITE_LINE = 0
+WRITE_VARIATION = 1
+CLOSE_VARIATION = 2
+
+
+def numbered_movetext(movetext, halfmovenumber, do_number_black_move):
+    """
+    Returns movetext preceded by its move number: e.g., “12.Nf3” for a White move; e.g., “12...Nc6” for a Black move if
+    do_number_black_move (i.e., at the start of a variation or just after one), otherwise the bare “Nc6”.
+    """
+    if is_white_move(halfmovenumber):
+        return f"{fullmovenumber_from_halfmove(halfmovenumber)}.{movetext}"
+    if do_number_black_move:
+        return f"{fullmovenumber_from_halfmove(halfmovenumber)}...{movetext}"
+    return movetext
+
+
+def generate_movetext_tokens(nodedict, starting_node_id = constants.INITIAL_NODE_ID):
+    """
+    Generator that yields, in order, the tokens (numbered movetexts, “(”, and “)”) of the PGN movetext of the tree
+    nodedict from starting_node_id (by default, the initial node). See the module docstring.
+
+    Instead of recursing into each variation, the walk keeps a stack of the work still to be done, which holds, for each
+    node along the current path that has alternatives, only the alternatives not yet written and the continuation of
+    its main line.
+    """
+    stack_of_work = [(WRITE_LINE, starting_node_id, True)]
+    while stack_of_work:
+        kind_of_work, node_id, argument = stack_of_work.pop()
+
+        if kind_of_work == CLOSE_VARIATION:
+            yield ")"
+            continue
+
+        if kind_of_work == WRITE_VARIATION:
+            # argument is the index of the alternative at node node_id that begins the variation
+            node = nodedict[node_id]
+            edge = node.edgeslist[argument]
+            yield "("
+            yield numbered_movetext(edge.movetext, node.halfmovenumber, do_number_black_move=True)
+            node_id = edge.destination_node_id
+            do_number_black_move = False
+        else:
+            # argument is whether a Black move beginning the line needs its move number
+            do_number_black_move = argument
+
+        # Writes the line from node_id along main-line edges until a node with alternatives
+        node = nodedict[node_id]
+        while node.number_of_edges > 0:
+            edge = node.edgeslist[constants.INDEX_MAINLINE]
+            yield numbered_movetext(edge.movetext, node.halfmovenumber, do_number_black_move)
+            do_number_black_move = False
+
+            if node.number_of_edges > 1:
+                # The variations are written next, in order, and then the main line continues (renumbered)
+                stack_of_work.append((WRITE_LINE, edge.destination_node_id, True))
+                for index_of_alternative in range(node.number_of_edges - 1, constants.INDEX_MAINLINE, -1):
+                    stack_of_work.append((CLOSE_VARIATION, None, None))
+                    stack_of_work.append((WRITE_VARIATION, node_id, index_of_alternative))
+                break
+
+            node_id = edge.destination_node_id
+            node = nodedict[node_id]
+
+
+def write_pgn(nodedict, output_stream, headers = None):
+    """
+    Writes to output_stream a PGN game whose movetext is that of the tree nodedict, with the header (tag pairs) of the
+    dictionary headers (by default, the Seven Tag Roster with unknown values), wrapping the movetext at
+    constants.PGN_EXPORT_LINE_LENGTH characters.
+    """
+    if headers is None:
+        headers = constants.DEFAULT_PGN_HEADERS
+    for field, value in headers.items():
+        escaped_value = value.replace("\\", "\\\\").replace('"', '\\"')
+        output_stream.write(f'[{field} "{escaped_value}"]\n')
+    output_stream.write("\n")
+
+    # The movetext ends with the game-termination marker, which must match the Result header
+    result = headers.get(constants.RESULT_HEADER_FIELD, constants.RESULT_UNKNOWN)
+    tokens_of_line = []
+    length_of_line = 0
+    for token in itertools.chain(generate_movetext_tokens(nodedict), [result]):
+        if tokens_of_line and length_of_line + 1 + len(token) > constants.PGN_EXPORT_LINE_LENGTH:
+            output_stream.write(" ".join(tokens_of_line) + "\n")
+            tokens_of_line = []
+            length_of_line = 0
+        length_of_line += len(token) + (1 if tokens_of_line else 0)
+        tokens_of_line.append(token)
+    output_stream.write(" ".join(tokens_of_line) + "\n")
+
+
+def write_pgn_CLI_package(pgn_output_filepath, nodedict):
+    """
+    Writes the tree nodedict as PGN (see write_pgn()) to the file at pgn_output_filepath, or to standard output if
+    pgn_output_filepath is “-”.
+    """
+    if pgn_output_filepath == "-":
+        write_pgn(nodedict, sys.stdout)
+        return
+    try:
+        pgn_output_file = open(pgn_output_filepath, "w", encoding="utf-8")
+    except OSError as err:
+        fatal_error_exit_without_traceback(f"Could not write the PGN to “{pgn_output_filepath}”.\n{err}")
+    with pgn_output_file:
+        write_pgn(nodedict, pgn_output_file)
+    print(f"Wrote the tree ({len(nodedict)} positions) as PGN to {pgn_output_filepath}.")